@@ -0,0 +1,56 @@
+"""
+Micro-benchmark: filenames/second of parse_filename_stems_bulk (columnar, NumPy) versus
+extract_datetime_from_filename called once per name.
+
+    python benchmarks/bench_bulk_parser.py --count 1000000
+
+Both runs parse the same synthetic corpus and the results are compared name by name.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metadata_editor
+from synthetic_names import generate_stems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of synthetic filename stems (default: 1,000,000)")
+    parser.add_argument("--outlier-share", type=float, default=0.1, help="Share of names without any date (default: 0.1)")
+    args = parser.parse_args()
+
+    if metadata_editor.np is None:
+        print("NumPy is not installed: parse_filename_stems_bulk falls back to the scalar parser.")
+    date_patterns = metadata_editor.load_date_patterns()
+    format_strings = [pattern_info["original_format"] for pattern_info in date_patterns]
+
+    print(f"Generating {args.count:,} synthetic filename stems...")
+    stems = list(generate_stems(format_strings, args.count, metadata_editor.SORTED_DATE_TOKENS, args.outlier_share))
+
+    start = time.perf_counter()
+    scalar_results = [metadata_editor.extract_datetime_from_filename(stem, date_patterns) for stem in stems]
+    scalar_seconds = time.perf_counter() - start
+    print(f"Scalar parser: {scalar_seconds:8.2f}s  {len(stems) / scalar_seconds:12,.0f} filenames/s")
+
+    start = time.perf_counter()
+    bulk_results = metadata_editor.parse_filename_stems_bulk(stems, date_patterns)
+    bulk_seconds = time.perf_counter() - start
+    print(f"Bulk parser:   {bulk_seconds:8.2f}s  {len(stems) / bulk_seconds:12,.0f} filenames/s")
+    print(f"Speed-up: {scalar_seconds / bulk_seconds:.2f}x")
+
+    mismatches = 0
+    for row, dt_info in enumerate(scalar_results):
+        if dt_info is None:
+            mismatches += bool(bulk_results['valid'][row])
+            continue
+        same_values = all(int(dt_info[name]) == bulk_results[name][row] for name in metadata_editor.BULK_RESULT_COLUMNS)
+        same_format = date_patterns[bulk_results['format_index'][row]]["original_format"] == dt_info['matched_format']
+        mismatches += not (bulk_results['valid'][row] and same_values and same_format)
+    print(f"Result mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark: filenames/second of extract_datetime_from_filename with the plain
+sequential pattern list versus the DatePatternMatcher (shape prefilter + filename-shape cache).
+
+    python benchmarks/bench_date_matcher.py --count 1000000
+
+Both runs parse the same synthetic corpus and the results are compared name by name.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metadata_editor
+from synthetic_names import generate_stems
+
+def time_parser(stems, date_patterns):
+    start = time.perf_counter()
+    results = [metadata_editor.extract_datetime_from_filename(stem, date_patterns) for stem in stems]
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of synthetic filename stems (default: 1,000,000)")
+    parser.add_argument("--outlier-share", type=float, default=0.1, help="Share of names without any date (default: 0.1)")
+    args = parser.parse_args()
+
+    matcher = metadata_editor.load_date_patterns()
+    sequential_patterns = list(matcher) # Same patterns, without the prefilter
+    format_strings = [pattern_info["original_format"] for pattern_info in matcher]
+
+    print(f"Generating {args.count:,} synthetic filename stems...")
+    stems = list(generate_stems(format_strings, args.count, metadata_editor.SORTED_DATE_TOKENS, args.outlier_share))
+
+    sequential_seconds, sequential_results = time_parser(stems, sequential_patterns)
+    print(f"Sequential regex loop: {sequential_seconds:8.2f}s  {len(stems) / sequential_seconds:12,.0f} filenames/s")
+    matcher_seconds, matcher_results = time_parser(stems, matcher)
+    print(f"DatePatternMatcher:    {matcher_seconds:8.2f}s  {len(stems) / matcher_seconds:12,.0f} filenames/s")
+    shape_stats = matcher.shape_cache_stats()
+    print(f"Speed-up: {sequential_seconds / matcher_seconds:.2f}x  (shape cache hit rate {shape_stats['hit_rate']:.1%}, {shape_stats['cached_shapes']} shapes cached)")
+
+    mismatches = sum(1 for a, b in zip(sequential_results, matcher_results) if a != b)
+    print(f"Result mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
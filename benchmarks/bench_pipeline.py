@@ -0,0 +1,215 @@
+"""
+Pipeline benchmark: times each phase of metadata_editor (scan, parse, copy, ExifTool write,
+move) separately on synthetic corpora of tiny JPEG/PNG/MP4 files, and writes the results as JSON
+so runs can be compared.
+
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 100000
+    python benchmarks/bench_pipeline.py --sizes 1000 --compare benchmarks/results/pipeline_20250101-120000.json
+
+Each phase runs with the stage worker counts and batch sizes configured in metadata_editor.py,
+one phase after another, so a phase's time is not hidden behind the others as it is in a real
+(overlapped) run. Without ExifTool the write phase is skipped and matched files are treated
+as updated, so the move phase still exercises output naming and collisions.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import functools
+import threading
+import contextlib
+import subprocess
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metadata_editor
+from file_scanner import SUPPORTED_EXTENSIONS, scan_media_files
+from exiftool_session import ExifToolPool
+from exiftool_locator import ExifToolNotFoundError, locate_exiftool
+from job_state import JobState
+from run_metrics import RunMetrics
+from run_report import NoteLog
+from synthetic_corpus import write_corpus
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def run_stage(name, handler, records, workers, batch_size=1):
+    """Runs one pipeline stage on its own and returns (seconds, records it forwarded)."""
+    forwarded_records = []
+    stage = metadata_editor.PipelineStage(name, lambda batch: forwarded_records.extend(handler(batch)) or [], workers=workers, batch_size=batch_size)
+    start = time.perf_counter()
+    metadata_editor.run_pipeline(records, [stage])
+    return time.perf_counter() - start, forwarded_records
+
+def _phase_result(seconds, files, **extra):
+    return dict({'seconds': round(seconds, 6), 'files': files, 'files_per_second': round(files / seconds, 1) if seconds > 0 else None}, **extra)
+
+def benchmark_size(size, date_patterns, pool, work_dir, args):
+    """Generates one corpus of 'size' files and times every phase on it. Returns the result dict."""
+    corpus_dir = os.path.join(work_dir, f"corpus_{size}")
+    temp_dir = os.path.join(corpus_dir, "_temp_metadata_editor")
+    format_strings = [pattern_info["original_format"] for pattern_info in date_patterns]
+    phases = {}
+    metrics = RunMetrics()
+
+    start = time.perf_counter()
+    corpus = write_corpus(corpus_dir, size, format_strings, metadata_editor.SORTED_DATE_TOKENS, args.outlier_share, args.collision_share)
+    phases['generate'] = _phase_result(time.perf_counter() - start, corpus['files'])
+
+    start = time.perf_counter()
+    relative_paths = [relative_path for _, relative_path in scan_media_files(corpus_dir, SUPPORTED_EXTENSIONS, skip_dir_names=metadata_editor.EDITOR_OWN_DIR_NAMES)]
+    phases['scan'] = _phase_result(time.perf_counter() - start, len(relative_paths))
+
+    start = time.perf_counter()
+    records = [
+        metadata_editor.FileRecord(relative_path, relative_path, os.path.join(corpus_dir, relative_path), os.path.join(temp_dir, relative_path), datetime_info)
+        for relative_path, datetime_info in metadata_editor.iter_parsed_filenames(relative_paths, date_patterns, metadata_editor.PARSE_WORKERS, metrics)
+    ]
+    matched_count = sum(1 for record in records if record.datetime_info)
+    phases['parse'] = _phase_result(time.perf_counter() - start, len(records), matched=matched_count)
+
+    os.makedirs(temp_dir, exist_ok=True)
+    job = JobState(temp_dir)
+    context = {
+        'src_dir': corpus_dir,
+        'dst_dir': os.path.join(corpus_dir, "_output_metadata_edited"),
+        'outliers_dir': os.path.join(corpus_dir, "_output_outliers"),
+        'transfer_mode': metadata_editor.TRANSFER_MODE,
+        'manifest': None,
+        'job': job,
+        'resuming': False,
+        'pool': pool,
+        'metrics': metrics,
+        'lock': threading.Lock(),
+        'destination_index': metadata_editor.DestinationNameIndex(),
+        'report': None,
+        'notes': NoteLog(0),
+        'stats': metadata_editor._new_stats()
+    }
+    os.makedirs(context['dst_dir'], exist_ok=True)
+    os.makedirs(context['outliers_dir'], exist_ok=True)
+    try:
+        seconds, records = run_stage("copy", functools.partial(metadata_editor._copy_stage, context), records, metadata_editor.COPY_WORKERS)
+        phases['copy'] = _phase_result(seconds, len(records), transfer_mode=context['transfer_mode'])
+
+        if pool is not None:
+            seconds, records = run_stage("exiftool", functools.partial(metadata_editor._exiftool_write_stage, context), records,
+                                         metadata_editor.EXIFTOOL_WRITE_WORKERS, metadata_editor.EXIFTOOL_WRITE_CHUNK_SIZE)
+            phases['exiftool_write'] = _phase_result(seconds, context['stats']['exiftool_attempted'], updated=context['stats']['exiftool_updated'])
+        else:
+            for record in records:
+                if record.datetime_info:
+                    record.write_result = {'status': 'updated', 'message': "simulated (no ExifTool)"}
+            phases['exiftool_write'] = {'skipped': "ExifTool not found"}
+
+        seconds, _ = run_stage("move", functools.partial(metadata_editor._placement_stage, context), records,
+                               metadata_editor.PLACE_WORKERS, metadata_editor.PLACE_BATCH_SIZE)
+        renamed_outputs = sum(1 for name in os.listdir(context['dst_dir']) if not os.path.splitext(name)[0].isdigit())
+        phases['move'] = _phase_result(seconds, len(records), to_output=context['stats']['moved_to_output'],
+                                       to_outliers=context['stats']['moved_to_outliers'], collision_renames=renamed_outputs)
+    finally:
+        job.close()
+    # Per-operation histograms (parse, copy, exiftool_request, move, destination_lookup) from the editor's instrumentation
+    return {'size': size, 'corpus': corpus, 'phases': phases, 'timings': metrics.snapshot()['timings']}
+
+def compare_results(results, baseline):
+    """Prints each phase's time relative to the same size and phase in 'baseline'."""
+    baseline_by_size = {entry['size']: entry for entry in baseline.get('runs', [])}
+    print(f"\nCompared with {baseline.get('started_at')} (commit {baseline.get('git_commit')}):")
+    for entry in results['runs']:
+        baseline_entry = baseline_by_size.get(entry['size'])
+        if baseline_entry is None:
+            continue
+        for phase, phase_result in entry['phases'].items():
+            baseline_seconds = baseline_entry['phases'].get(phase, {}).get('seconds')
+            if phase_result.get('seconds') and baseline_seconds:
+                print(f"  {entry['size']:>7,} files  {phase:<15} {phase_result['seconds']:9.3f}s  vs {baseline_seconds:9.3f}s  ({phase_result['seconds'] / baseline_seconds:5.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Corpus sizes to benchmark (default: 1000 10000 100000)")
+    parser.add_argument("--outlier-share", type=float, default=0.1, help="Share of files without a date in the name (default: 0.1)")
+    parser.add_argument("--collision-share", type=float, default=0.05, help="Share of dated files reusing an earlier date (default: 0.05)")
+    parser.add_argument("--work-dir", help="Where corpora are generated (default: a temporary folder)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpora and outputs")
+    parser.add_argument("--exiftool", metavar="PATH", help="ExifTool executable (default: the editor's lookup)")
+    parser.add_argument("--no-exiftool", action="store_true", help="Skip the ExifTool write phase")
+    parser.add_argument("--output", help=f"Results file (default: {RESULTS_DIR}/pipeline_<timestamp>.json)")
+    parser.add_argument("--compare", metavar="RESULTS_JSON", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        date_patterns = metadata_editor.load_date_patterns()
+
+    exiftool_path, exiftool_version = None, None
+    if not args.no_exiftool:
+        try:
+            exiftool_path, exiftool_version, _ = locate_exiftool(args.exiftool, os.path.dirname(os.path.abspath(metadata_editor.__file__)))
+        except ExifToolNotFoundError as e:
+            print(f"{e} The ExifTool write phase is skipped.")
+    pool = ExifToolPool(exiftool_path, metadata_editor.EXIFTOOL_POOL_SIZE) if exiftool_path else None
+
+    results = {
+        'benchmark': "pipeline",
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'exiftool_version': exiftool_version,
+        'config': {
+            'transfer_mode': metadata_editor.TRANSFER_MODE,
+            'parse_workers': metadata_editor.PARSE_WORKERS,
+            'copy_workers': metadata_editor.COPY_WORKERS,
+            'exiftool_pool_size': metadata_editor.EXIFTOOL_POOL_SIZE if pool else 0,
+            'exiftool_write_chunk_size': metadata_editor.EXIFTOOL_WRITE_CHUNK_SIZE,
+            'place_workers': metadata_editor.PLACE_WORKERS,
+            'outlier_share': args.outlier_share,
+            'collision_share': args.collision_share
+        },
+        'runs': []
+    }
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="metadata_editor_bench_")
+    try:
+        for size in args.sizes:
+            print(f"Benchmarking {size:,} files...")
+            with contextlib.redirect_stdout(open(os.devnull, 'w')): # The stages log every file
+                entry = benchmark_size(size, date_patterns, pool, work_dir, args)
+            results['runs'].append(entry)
+            for phase, phase_result in entry['phases'].items():
+                if 'seconds' in phase_result:
+                    print(f"  {phase:<15} {phase_result['seconds']:9.3f}s  {phase_result['files_per_second'] or 0:12,.0f} files/s")
+                else:
+                    print(f"  {phase:<15} skipped ({phase_result['skipped']})")
+    finally:
+        if pool is not None:
+            pool.close()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f"pipeline_{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output_path}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
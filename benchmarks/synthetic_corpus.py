@@ -0,0 +1,113 @@
+"""
+Synthetic media corpus generator shared by the benchmarks.
+Writes tiny but structurally valid JPEG, PNG and MP4 files whose names are rendered from every
+format in date_formats_source.json (see synthetic_names.py), plus a share of outliers (names
+without a date) and of collisions (files whose date, and thus output name, repeats an earlier one).
+
+    python benchmarks/synthetic_corpus.py /tmp/corpus --count 10000
+"""
+import os
+import sys
+import zlib
+import random
+import struct
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_names import NAME_TEMPLATES, OUTLIER_NAMES, render_format_string
+
+# --- Minimal Files ---
+def _jpeg_segment(marker, payload):
+    return struct.pack(">BBH", 0xFF, marker, len(payload) + 2) + payload
+
+def tiny_jpeg():
+    """A 1x1 grayscale baseline JPEG: one DC and one AC Huffman code, a single all-zero block."""
+    app0 = b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    quant_table = b"\x00" + b"\x01" * 64
+    frame = struct.pack(">BHHB", 8, 1, 1, 1) + b"\x01\x11\x00"
+    dc_table = b"\x00" + b"\x01" + b"\x00" * 15 + b"\x00" # Class 0, id 0: one code of length 1 for category 0
+    ac_table = b"\x10" + b"\x01" + b"\x00" * 15 + b"\x00" # Class 1, id 0: one code of length 1 for EOB
+    scan_header = b"\x01\x01\x00\x00\x3f\x00"
+    return (b"\xff\xd8" + _jpeg_segment(0xE0, app0) + _jpeg_segment(0xDB, quant_table) + _jpeg_segment(0xC0, frame)
+            + _jpeg_segment(0xC4, dc_table) + _jpeg_segment(0xC4, ac_table) + _jpeg_segment(0xDA, scan_header)
+            + b"\x3f" + b"\xff\xd9")
+
+def _png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+def tiny_png():
+    """A 1x1 8-bit grayscale PNG."""
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", zlib.compress(b"\x00\x00")) + _png_chunk(b"IEND", b"")
+
+def _mp4_box(box_type, payload):
+    return struct.pack(">I", len(payload) + 8) + box_type + payload
+
+def tiny_mp4():
+    """An MP4 with an ftyp box, a movie header (mvhd, where QuickTime dates live) and an empty mdat."""
+    file_type = _mp4_box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2mp41")
+    identity_matrix = struct.pack(">9I", 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+    movie_header = _mp4_box(b"mvhd", struct.pack(">IIIIIIH", 0, 0, 0, 1000, 0, 0x00010000, 0x0100) + b"\x00" * 10
+                            + identity_matrix + b"\x00" * 24 + struct.pack(">I", 2))
+    return file_type + _mp4_box(b"moov", movie_header) + _mp4_box(b"mdat", b"")
+
+FILE_CONTENTS = {'.jpg': tiny_jpeg(), '.png': tiny_png(), '.mp4': tiny_mp4()}
+
+# --- Corpus ---
+def write_corpus(target_dir, count, format_strings, sorted_tokens, outlier_share=0.1, collision_share=0.05, seed=1234):
+    """
+    Writes 'count' files into 'target_dir'. Dated names cycle through 'format_strings' so
+    every format is represented; 'collision_share' of the dated files reuse the date of an
+    earlier file under another name template, so they compete for the same output name.
+    Returns {'files', 'outliers', 'collisions', 'formats', 'bytes'}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(target_dir, exist_ok=True)
+    start = datetime(2005, 1, 1)
+    span_seconds = int((datetime(2025, 12, 31) - start).total_seconds())
+    extensions = list(FILE_CONTENTS)
+    used_names = set()
+    used_dates = []
+    summary = {'files': 0, 'outliers': 0, 'collisions': 0, 'formats': len(format_strings), 'bytes': 0}
+    for seq in range(count):
+        ext = extensions[seq % len(extensions)]
+        if not format_strings or rng.random() < outlier_share:
+            stem = rng.choice(OUTLIER_NAMES).format(seq=seq)
+            summary['outliers'] += 1
+        else:
+            if used_dates and rng.random() < collision_share:
+                dt = rng.choice(used_dates)
+                summary['collisions'] += 1
+            else:
+                dt = start + timedelta(seconds=rng.randrange(span_seconds), milliseconds=rng.randrange(1000))
+                used_dates.append(dt)
+            date_text = render_format_string(format_strings[seq % len(format_strings)], dt, sorted_tokens)
+            stem = rng.choice(NAME_TEMPLATES).format(date=date_text, seq=seq % 10000)
+        if stem + ext in used_names:
+            stem = f"{stem}_{seq}"
+        used_names.add(stem + ext)
+        with open(os.path.join(target_dir, stem + ext), 'wb') as f:
+            f.write(FILE_CONTENTS[ext])
+        summary['files'] += 1
+        summary['bytes'] += len(FILE_CONTENTS[ext])
+    return summary
+
+def main():
+    import metadata_editor
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("target_dir", help="Folder to write the corpus into")
+    parser.add_argument("--count", type=int, default=1000, help="Number of files (default: 1000)")
+    parser.add_argument("--outlier-share", type=float, default=0.1, help="Share of names without any date (default: 0.1)")
+    parser.add_argument("--collision-share", type=float, default=0.05, help="Share of dated files reusing an earlier date (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+    format_strings = [pattern_info["original_format"] for pattern_info in metadata_editor.load_date_patterns()]
+    summary = write_corpus(args.target_dir, args.count, format_strings, metadata_editor.SORTED_DATE_TOKENS,
+                           args.outlier_share, args.collision_share, args.seed)
+    print(f"Wrote {summary['files']:,} files ({summary['outliers']:,} outliers, {summary['collisions']:,} collisions, "
+          f"{summary['formats']} formats) to {args.target_dir}")
+
+if __name__ == "__main__":
+    main()
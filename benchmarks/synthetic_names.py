@@ -0,0 +1,45 @@
+"""
+Synthetic filename generator shared by the benchmarks.
+Names are rendered from the format strings in date_formats_source.json and wrapped in the
+prefixes/suffixes seen in real exports (WhatsApp, Pixel, screenshots, ...).
+"""
+import os
+import sys
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_matcher import tokenize_format_string
+
+NAME_TEMPLATES = [
+    "{date}", "IMG_{date}", "IMG-{date}-WA{seq:04d}", "PXL_{date}", "VID_{date}",
+    "Screenshot_{date}", "photo {date}", "{date}_{seq}", "DSC_{date}_edit",
+]
+OUTLIER_NAMES = ["DSC{seq:05d}", "holiday photo {seq}", "scan-{seq:03d}", "IMG_{seq:04d}", "family_pic", "Untitled {seq}"]
+
+def render_format_string(format_str, dt, sorted_tokens):
+    """Renders a JSON format_string (e.g. "YYYYMMDD_HHmmss") for the datetime 'dt'."""
+    hour12 = dt.hour % 12 or 12
+    values = {
+        "YYYY": f"{dt.year:04d}", "YY": f"{dt.year % 100:02d}",
+        "MM": f"{dt.month:02d}", "M": str(dt.month),
+        "DDD": f"{dt.timetuple().tm_yday:03d}", "DD": f"{dt.day:02d}", "D": str(dt.day),
+        "HH": f"{dt.hour:02d}", "hh": f"{hour12:02d}", "mm": f"{dt.minute:02d}", "SS": f"{dt.second:02d}",
+        "fff": f"{dt.microsecond // 1000:03d}", "AMPM": "AM" if dt.hour < 12 else "PM", "Z": "Z",
+        "TZ_SIGN": "+", "TZ_HH": "02", "TZ_MM": "00",
+    }
+    return "".join(values.get(text, text) if is_token else text for is_token, text in tokenize_format_string(format_str, sorted_tokens))
+
+def generate_stems(format_strings, count, sorted_tokens, outlier_share=0.1, seed=1234):
+    """Yields 'count' filename stems; roughly 'outlier_share' of them carry no date at all."""
+    rng = random.Random(seed)
+    start = datetime(2005, 1, 1)
+    span_seconds = int((datetime(2025, 12, 31) - start).total_seconds())
+    for seq in range(count):
+        if rng.random() < outlier_share:
+            yield rng.choice(OUTLIER_NAMES).format(seq=seq)
+            continue
+        dt = start + timedelta(seconds=rng.randrange(span_seconds), milliseconds=rng.randrange(1000))
+        date_text = render_format_string(rng.choice(format_strings), dt, sorted_tokens)
+        yield rng.choice(NAME_TEMPLATES).format(date=date_text, seq=seq % 10000)
@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import hashlib
+from collections import OrderedDict
+
+# --- Format String Tokenizing ---
+def tokenize_format_string(format_str, sorted_tokens):
+    """
+    Splits a format_string such as "YYYY-MM-DD_HHmmss" into (is_token, text) pairs.
+    'sorted_tokens' must be ordered longest first so e.g. "YYYY" wins over "YY".
+    Characters that do not start a known token are returned one by one as literals.
+    """
+    parts = []
+    i = 0
+    while i < len(format_str):
+        for token in sorted_tokens:
+            if format_str.startswith(token, i):
+                parts.append((True, token))
+                i += len(token)
+                break
+        else:
+            parts.append((False, format_str[i]))
+            i += 1
+    return parts
+
+# --- Filename Shapes ---
+DIGIT_CHAR_REGEX = re.compile(r"\d")
+SHAPE_DIGIT_MASK = "\x00" # Cannot occur in a filename, so masked digits never collide with real characters
+ASCII_DIGIT_MASK_TABLE = str.maketrans("0123456789", SHAPE_DIGIT_MASK * 10)
+DEFAULT_SHAPE_CACHE_SIZE = 4096
+
+def filename_shape(filename_stem):
+    """
+    Returns the stem with every digit masked and everything else kept, e.g. "IMG-20240101-WA0001"
+    and "IMG-20231224-WA0815" share one shape. The date regexes only distinguish digits (\\d) from
+    literal characters (case-insensitively), so all stems of one shape match the same patterns
+    at the same positions; only the digit values, and thus date validation, can differ.
+    """
+    if filename_stem.isascii():
+        return filename_stem.translate(ASCII_DIGIT_MASK_TABLE).lower()
+    return DIGIT_CHAR_REGEX.sub(SHAPE_DIGIT_MASK, filename_stem)
+
+# --- Candidate Prefilter ---
+DIGIT_RUN_REGEX = re.compile(r"\d+")
+# Minimum digit count of a token regex like (?P<year>\d{4}) or (?P<day>\d{1,2})
+DIGIT_TOKEN_REGEX = re.compile(r"^\(\?P<\w+>\\d\{(\d+)(?:,\d+)?\}\)$")
+
+def _pattern_requirements(format_str, token_regex_map, sorted_tokens):
+    """
+    Derives cheap necessary conditions for a format to match anywhere in a stem:
+    the literal characters it contains, the longest unbroken run of digits it needs and
+    the total number of digits it needs. A stem failing any of them cannot match the regex.
+    """
+    required_chars = set()
+    longest_digit_run = 0
+    total_digits = 0
+    current_run = 0
+    for is_token, text in tokenize_format_string(format_str, sorted_tokens):
+        if is_token:
+            digit_match = DIGIT_TOKEN_REGEX.match(token_regex_map[text])
+            digits = int(digit_match.group(1)) if digit_match else 0
+        else:
+            digits = 1 if text.isdigit() else 0
+            if not digits:
+                required_chars.add(text.lower())
+        if digits:
+            current_run += digits
+            total_digits += digits
+            longest_digit_run = max(longest_digit_run, current_run)
+        else:
+            current_run = 0
+    return frozenset(required_chars), longest_digit_run, total_digits
+
+def yields_full_date(compiled_regex):
+    """True if a match of this regex can carry a year, a month and a day."""
+    groups = compiled_regex.groupindex
+    return ('year' in groups or 'shortyear' in groups) and 'month' in groups and 'day' in groups
+
+# --- Patterns ---
+class DatePattern(dict):
+    """
+    One loaded date pattern: {"regex", "regex_source", "original_format", "type"}.
+    A pattern restored from the pattern cache only has "regex_source"; its regex is compiled
+    the first time "regex" is looked up, so formats no filename ever reaches are never compiled.
+    """
+
+    def __missing__(self, key):
+        if key != "regex":
+            raise KeyError(key)
+        compiled_regex = re.compile(self["regex_source"], re.IGNORECASE)
+        self["regex"] = compiled_regex
+        return compiled_regex
+
+class DatePatternMatcher(list):
+    """
+    The loaded date patterns (a plain list of pattern dicts, in JSON priority order) plus a
+    prefilter that narrows them down per filename stem.
+
+    On top of that, an LRU cache keyed by filename_shape() remembers which patterns actually
+    matched each shape. Exports are dominated by a few naming templates, so most stems hit the
+    cache and only re-run the patterns that matched their shape before - normally just the
+    format that won last time. Earlier formats that matched the shape but failed date
+    validation stay in front of it, so JSON-order priority is preserved exactly.
+
+    Formats that cannot produce a full date (no day or month group, e.g. "YYYY-MM" or
+    "YYYY-Www") never pass the year/month/day validation and are dropped up front.
+    A stem is reduced to a shape signature in one pass: the separator/literal characters it
+    contains that any format cares about, its longest digit run and its total digit count.
+    Formats whose requirements that signature cannot satisfy are skipped without running
+    their regex. The candidate list per signature is computed once and reused, and is always
+    a subsequence of the JSON order, so the first valid match is the same one the full
+    sequential scan would find.
+    """
+
+    def __init__(self, patterns, token_regex_map, shape_cache_size=DEFAULT_SHAPE_CACHE_SIZE, requirements=None):
+        super().__init__(patterns)
+        if requirements is None:
+            sorted_tokens = sorted(token_regex_map.keys(), key=len, reverse=True)
+            requirements = [
+                _pattern_requirements(pattern_info["original_format"], token_regex_map, sorted_tokens)
+                if yields_full_date(pattern_info["regex"]) else None
+                for pattern_info in self
+            ]
+        self.requirements = requirements
+        usable_requirements = [requirement for requirement in self.requirements if requirement is not None]
+        self.relevant_chars = frozenset().union(*(chars for chars, _, _ in usable_requirements))
+        # Digit counts above what any format needs do not change the outcome, so they are capped
+        self.max_run_needed = max((run for _, run, _ in usable_requirements), default=0)
+        self.max_digits_needed = max((digits for _, _, digits in usable_requirements), default=0)
+        self._full_date_patterns = tuple(pattern_info for pattern_info, requirement in zip(self, self.requirements) if requirement is not None)
+        self._candidates_by_signature = {}
+        self.shape_cache_size = shape_cache_size
+        self._patterns_by_shape = OrderedDict()
+        self.shape_cache_hits = 0
+        self.shape_cache_misses = 0
+
+    def signature(self, filename_stem):
+        digit_runs = DIGIT_RUN_REGEX.findall(filename_stem)
+        longest_run = max(map(len, digit_runs), default=0)
+        total_digits = sum(map(len, digit_runs))
+        return (
+            self.relevant_chars.intersection(filename_stem.lower()),
+            min(longest_run, self.max_run_needed),
+            min(total_digits, self.max_digits_needed)
+        )
+
+    def candidates_for(self, filename_stem):
+        """Returns the patterns (in JSON order) that can possibly match 'filename_stem'."""
+        if not filename_stem.isascii():
+            # Case-insensitive regexes treat some non-ASCII letters as equal to ASCII ones
+            # (e.g. KELVIN SIGN and 'k'); keep the character prefilter exact by not using it here.
+            return self._full_date_patterns
+        signature = self.signature(filename_stem)
+        candidates = self._candidates_by_signature.get(signature)
+        if candidates is None:
+            stem_chars, longest_run, total_digits = signature
+            candidates = tuple(
+                pattern_info for pattern_info, requirement in zip(self, self.requirements)
+                if requirement is not None
+                and requirement[1] <= longest_run and requirement[2] <= total_digits and requirement[0] <= stem_chars
+            )
+            self._candidates_by_signature[signature] = candidates
+        return candidates
+
+    def patterns_for(self, filename_stem):
+        """
+        Returns the patterns (in JSON order) whose regex matches 'filename_stem', using the
+        filename-shape cache. The caller still validates each match in order.
+        """
+        if self.shape_cache_size <= 0:
+            return self.candidates_for(filename_stem)
+        shape = filename_shape(filename_stem)
+        matching_patterns = self._patterns_by_shape.get(shape)
+        if matching_patterns is not None:
+            self.shape_cache_hits += 1
+            try:
+                self._patterns_by_shape.move_to_end(shape)
+            except KeyError:
+                pass # Evicted by another thread in the meantime
+            return matching_patterns
+        self.shape_cache_misses += 1
+        matching_patterns = tuple(
+            pattern_info for pattern_info in self.candidates_for(filename_stem)
+            if pattern_info["regex"].search(filename_stem)
+        )
+        self._patterns_by_shape[shape] = matching_patterns
+        while len(self._patterns_by_shape) > self.shape_cache_size:
+            try:
+                self._patterns_by_shape.popitem(last=False) # Least recently used shape
+            except KeyError:
+                break
+        return matching_patterns
+
+    def to_cache_data(self):
+        """The patterns and their prefilter requirements as JSON-serializable data (no compiled regexes)."""
+        return {
+            'patterns': [
+                {key: pattern_info[key] for key in ("regex_source", "original_format", "type")}
+                for pattern_info in self
+            ],
+            'requirements': [
+                [sorted(requirement[0]), requirement[1], requirement[2]] if requirement is not None else None
+                for requirement in self.requirements
+            ]
+        }
+
+    @classmethod
+    def from_cache_data(cls, cache_data, token_regex_map, shape_cache_size=DEFAULT_SHAPE_CACHE_SIZE):
+        """Rebuilds a matcher from to_cache_data() output without tokenizing or compiling anything."""
+        requirements = [
+            (frozenset(requirement[0]), requirement[1], requirement[2]) if requirement is not None else None
+            for requirement in cache_data['requirements']
+        ]
+        return cls([DatePattern(pattern_data) for pattern_data in cache_data['patterns']], token_regex_map, shape_cache_size, requirements)
+
+    def shape_cache_stats(self):
+        lookups = self.shape_cache_hits + self.shape_cache_misses
+        return {
+            'hits': self.shape_cache_hits,
+            'misses': self.shape_cache_misses,
+            'hit_rate': self.shape_cache_hits / lookups if lookups else 0.0,
+            'cached_shapes': len(self._patterns_by_shape)
+        }
+
+# --- Pattern Cache ---
+PATTERN_CACHE_FORMAT_VERSION = 1
+
+def pattern_cache_key(format_file_bytes, token_regex_map):
+    """Changes whenever the formats file, the token regexes or the cache layout change."""
+    digest = hashlib.sha256()
+    digest.update(str(PATTERN_CACHE_FORMAT_VERSION).encode())
+    digest.update(json.dumps(token_regex_map, sort_keys=True).encode())
+    digest.update(format_file_bytes)
+    return digest.hexdigest()
+
+def load_cached_matcher(cache_path, cache_key, token_regex_map, shape_cache_size=DEFAULT_SHAPE_CACHE_SIZE):
+    """Returns the cached DatePatternMatcher for 'cache_key', or None if the cache is missing or stale."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache_data = json.load(f)
+        if cache_data.get('key') != cache_key:
+            return None
+        return DatePatternMatcher.from_cache_data(cache_data, token_regex_map, shape_cache_size)
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        return None
+
+def save_cached_matcher(cache_path, cache_key, matcher):
+    """Best effort: writes the cache atomically and ignores failures (e.g. a read-only home)."""
+    cache_data = matcher.to_cache_data()
+    cache_data['key'] = cache_key
+    temp_path = cache_path + ".tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache_data, f)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
@@ -0,0 +1,89 @@
+import hashlib
+import threading
+
+from run_manifest import hash_file_contents
+
+# --- Configuration ---
+SAMPLE_BLOCK_SIZE = 64 * 1024 # Bytes read from the start and from the end of a file for the quick hash
+
+def hash_file_sample(file_path, size):
+    """SHA-256 of the first and last SAMPLE_BLOCK_SIZE bytes; equal samples are then confirmed with a full hash."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file_obj:
+        digest.update(file_obj.read(SAMPLE_BLOCK_SIZE))
+        if size > SAMPLE_BLOCK_SIZE:
+            file_obj.seek(max(SAMPLE_BLOCK_SIZE, size - SAMPLE_BLOCK_SIZE))
+            digest.update(file_obj.read(SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+class _ContentCandidate:
+    __slots__ = ('path', 'size', 'item', 'sample_hash', 'full_hash')
+
+    def __init__(self, path, size, item):
+        self.path = path
+        self.size = size
+        self.item = item
+        self.sample_hash = None
+        self.full_hash = None
+
+class ContentDedupIndex:
+    """
+    Finds files with identical content among the files seen so far, in three steps that each
+    run only when the previous one found a match: equal size, then an equal hash of the first
+    and last 64 KiB, then an equal full SHA-256. Hashes are computed lazily and at most once per
+    file, so a file whose size is unique is never read at all.
+    With hash_eagerly, every file is fully hashed when it is registered; use it when registered
+    files may be modified or moved before later files are compared with them ("inplace" mode).
+    Safe to use from several threads; lookups are serialized so the first file of each content
+    is always the one kept.
+    """
+
+    def __init__(self, hash_eagerly=False):
+        self.hash_eagerly = hash_eagerly
+        self._lock = threading.Lock()
+        self._candidates_by_size = {}
+        self.sample_hashes = 0
+        self.full_hashes = 0
+
+    def _sample_hash(self, candidate):
+        if candidate.sample_hash is None:
+            candidate.sample_hash = hash_file_sample(candidate.path, candidate.size)
+            self.sample_hashes += 1
+        return candidate.sample_hash
+
+    def _full_hash(self, candidate):
+        if candidate.full_hash is None:
+            candidate.full_hash = hash_file_contents(candidate.path)
+            self.full_hashes += 1
+        return candidate.full_hash
+
+    def find_duplicate(self, path, size, item):
+        """
+        Returns the 'item' registered by an earlier call whose file has the same content as
+        'path', or None after registering this file as the first of its content.
+        Empty files are never considered duplicates. Raises OSError if 'path' cannot be read;
+        earlier files that have become unreadable are skipped.
+        """
+        if size == 0:
+            return None
+        new_candidate = _ContentCandidate(path, size, item)
+        with self._lock:
+            if self.hash_eagerly:
+                self._sample_hash(new_candidate)
+                self._full_hash(new_candidate)
+            candidates = self._candidates_by_size.setdefault(size, [])
+            for candidate in candidates:
+                try:
+                    candidate_sample_hash = self._sample_hash(candidate)
+                except OSError:
+                    continue
+                if candidate_sample_hash != self._sample_hash(new_candidate):
+                    continue
+                try:
+                    candidate_full_hash = self._full_hash(candidate)
+                except OSError:
+                    continue
+                if candidate_full_hash == self._full_hash(new_candidate):
+                    return candidate.item
+            candidates.append(new_candidate)
+        return None
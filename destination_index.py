@@ -0,0 +1,97 @@
+import os
+import heapq
+import threading
+
+class DestinationNameIndex:
+    """
+    In-memory index of the names in the output folders, used to pick collision-free
+    destination names without probing the filesystem name by name.
+
+    Each folder is listed once, on first use. Names are assigned per family: a base name and
+    extension plus a naming function 'naming(base, ext, n)' giving the plain name for n == 0
+    and the suffixed variants (e.g. "_1", "_copy1") for n >= 1. The index remembers the next
+    untried n of every family, so the 3,000th "20240101.jpg" costs one set lookup instead of
+    3,000 stat calls. Names are compared with os.path.normcase.
+
+    The index only covers names this process knows about. Callers still create the file
+    exclusively (see metadata_editor.place_file) and call mark_taken() if that fails because
+    the name appeared on disk since the folder was listed.
+    Safe to use from several placement threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._taken_names = {} # target_dir -> set of normcased names present or reserved
+        self._next_numbers = {} # (target_dir, naming, base, ext) -> next untried n
+        self._released_numbers = {} # same key -> heap of n released after a failed placement
+        self._reservations = {} # path -> (key, n) until commit() or release()
+
+    def _names_in(self, target_dir):
+        taken_names = self._taken_names.get(target_dir)
+        if taken_names is None:
+            try:
+                with os.scandir(target_dir) as dir_entries:
+                    taken_names = {os.path.normcase(entry.name) for entry in dir_entries}
+            except FileNotFoundError:
+                taken_names = set()
+            self._taken_names[target_dir] = taken_names
+        return taken_names
+
+    def reserve(self, target_dir, base, ext, naming):
+        """
+        Reserves the first free name of the family and returns (path, number_of_names_skipped).
+        Call commit() once the file is in place, or release() if the placement failed.
+        """
+        key = (target_dir, naming, os.path.normcase(base), os.path.normcase(ext))
+        skipped = 0
+        with self._lock:
+            taken_names = self._names_in(target_dir)
+            released_numbers = self._released_numbers.get(key)
+            while True:
+                if released_numbers:
+                    number = heapq.heappop(released_numbers)
+                else:
+                    number = self._next_numbers.get(key, 0)
+                    self._next_numbers[key] = number + 1
+                name = naming(base, ext, number)
+                if os.path.normcase(name) not in taken_names:
+                    taken_names.add(os.path.normcase(name))
+                    path = os.path.join(target_dir, name)
+                    self._reservations[path] = (key, number)
+                    return path, skipped
+                skipped += 1
+
+    def claim(self, path):
+        """
+        Reserves exactly 'path' (e.g. a name chosen by an earlier plan) if its name is free.
+        Returns False if it is taken. Call commit() or release() as after reserve().
+        """
+        target_dir, name = os.path.split(path)
+        with self._lock:
+            taken_names = self._names_in(target_dir)
+            if os.path.normcase(name) in taken_names:
+                return False
+            taken_names.add(os.path.normcase(name))
+            self._reservations[path] = (None, None)
+            return True
+
+    def commit(self, path):
+        """The file is in place: its name stays taken for good."""
+        with self._lock:
+            self._reservations.pop(path, None)
+
+    def release(self, path):
+        """Makes a reserved name available again (its placement failed)."""
+        with self._lock:
+            key, number = self._reservations.pop(path)
+            self._names_in(key[0] if key is not None else os.path.dirname(path)).discard(os.path.normcase(os.path.basename(path)))
+            if key is not None: # Claimed names belong to no family
+                heapq.heappush(self._released_numbers.setdefault(key, []), number)
+
+    def mark_taken(self, path):
+        """
+        Records that a reserved name turned out to exist on disk (created outside this index
+        since the folder was listed). It stays taken; reserve again for the next free name.
+        """
+        with self._lock:
+            self._reservations.pop(path, None)
@@ -0,0 +1,199 @@
+import os
+import re
+import mmap
+import struct
+
+# --- Configuration ---
+# Containers the native reader understands; everything else (HEIC, RAW, video, ...) goes to ExifTool
+NATIVE_READER_EXTENSIONS = ('.jpg', '.jpeg', '.tif', '.tiff')
+
+# The date tags the checker verifies and the editor writes: tags as ExifTool expects them on the
+# command line and their human-readable form for output/checking
+TAGS_TO_CHECK_CONFIG = {
+    "DateTimeOriginal": "Date/Time Original",
+    "CreateDate": "Create Date",
+    "ModifyDate": "Modify Date"
+}
+
+# EXIF tag IDs of the date tags, keyed by the names ExifTool uses for them
+EXIF_DATE_TAG_IDS = {
+    0x9003: "DateTimeOriginal",
+    0x9004: "CreateDate", # EXIF "DateTimeDigitized"
+    0x0132: "ModifyDate" # EXIF "DateTime"
+}
+EXIF_IFD_POINTER_TAG = 0x8769
+XMP_PACKET_TAG = 0x02BC
+EXIF_ASCII_TYPE = 2
+EXIF_UNDEFINED_TYPE = 7
+EXIF_BYTE_TYPE = 1
+MAX_IFD_ENTRIES = 1000 # Anything larger is a corrupt offset, not a real IFD
+
+JPEG_EXIF_HEADER = b"Exif\x00\x00"
+JPEG_XMP_HEADER = b"http://ns.adobe.com/xap/1.0/\x00"
+# Standalone markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
+JPEG_SOS_MARKER = 0xDA
+JPEG_EOI_MARKER = 0xD9
+JPEG_APP1_MARKER = 0xE1
+
+# XMP properties ExifTool reports under the same tag names, as attributes or as elements
+XMP_DATE_PROPERTY_REGEX = re.compile(
+    rb"[\s<](exif:DateTimeOriginal|xmp:CreateDate|xmp:ModifyDate)(?:\s*=\s*[\"']([^\"']*)[\"']|>([^<]*)<)"
+)
+XMP_PROPERTY_TAG_NAMES = {
+    b"exif:DateTimeOriginal": "DateTimeOriginal",
+    b"xmp:CreateDate": "CreateDate",
+    b"xmp:ModifyDate": "ModifyDate"
+}
+
+class UnsupportedFileError(Exception):
+    """Raised when a file is not a JPEG/TIFF the native reader can parse; use ExifTool instead."""
+
+# --- TIFF / EXIF Structures ---
+def _read_ifd_dates(buffer, tiff_start, byte_order, ifd_offset, found_tags, xmp_packets, visited_offsets):
+    """
+    Reads one IFD (offsets are relative to 'tiff_start') and collects the date tags it holds.
+    Returns (next_ifd_offset, exif_ifd_offset); either is 0 when absent.
+    """
+    if ifd_offset in visited_offsets:
+        raise UnsupportedFileError("IFD loop")
+    visited_offsets.add(ifd_offset)
+    entries_start = tiff_start + ifd_offset
+    entry_count, = struct.unpack_from(byte_order + "H", buffer, entries_start)
+    if entry_count > MAX_IFD_ENTRIES:
+        raise UnsupportedFileError("implausible IFD size")
+    exif_ifd_offset = 0
+    for entry_index in range(entry_count):
+        tag_id, value_type, value_count, value_field = struct.unpack_from(
+            byte_order + "HHI4s", buffer, entries_start + 2 + entry_index * 12
+        )
+        if tag_id == EXIF_IFD_POINTER_TAG:
+            exif_ifd_offset, = struct.unpack(byte_order + "I", value_field)
+            continue
+        is_date_tag = tag_id in EXIF_DATE_TAG_IDS and value_type == EXIF_ASCII_TYPE
+        is_xmp_packet = tag_id == XMP_PACKET_TAG and value_type in (EXIF_BYTE_TYPE, EXIF_UNDEFINED_TYPE)
+        if not (is_date_tag or is_xmp_packet):
+            continue
+        if value_count <= 4:
+            value = value_field[:value_count]
+        else:
+            value_offset = tiff_start + struct.unpack(byte_order + "I", value_field)[0]
+            if value_offset + value_count > len(buffer):
+                raise UnsupportedFileError("value outside of file")
+            value = bytes(buffer[value_offset:value_offset + value_count])
+        if is_xmp_packet:
+            xmp_packets.append(value)
+            continue
+        text = value.split(b"\x00", 1)[0].decode('latin-1')
+        if text:
+            # First occurrence wins, as IFD0 is read before the thumbnail IFD
+            found_tags.setdefault(EXIF_DATE_TAG_IDS[tag_id], text)
+    next_ifd_offset, = struct.unpack_from(byte_order + "I", buffer, entries_start + 2 + entry_count * 12)
+    return next_ifd_offset, exif_ifd_offset
+
+def read_tiff_dates(buffer, tiff_start=0):
+    """
+    Parses the TIFF structure starting at 'tiff_start' in 'buffer' (bytes or mmap) and returns
+    {tag_name: value} for the date tags found in IFD0, the following IFDs and the EXIF IFD,
+    including any XMP packet embedded in IFD0. Raises UnsupportedFileError on malformed data.
+    """
+    header = bytes(buffer[tiff_start:tiff_start + 8])
+    if header[:4] == b"II*\x00":
+        byte_order = "<"
+    elif header[:4] == b"MM\x00*":
+        byte_order = ">"
+    else:
+        raise UnsupportedFileError("not a TIFF header")
+    found_tags = {}
+    xmp_packets = []
+    visited_offsets = set()
+    try:
+        exif_ifd_offsets = []
+        ifd_offset, = struct.unpack_from(byte_order + "I", header, 4)
+        while ifd_offset:
+            ifd_offset, exif_ifd_offset = _read_ifd_dates(buffer, tiff_start, byte_order, ifd_offset, found_tags, xmp_packets, visited_offsets)
+            if exif_ifd_offset:
+                exif_ifd_offsets.append(exif_ifd_offset)
+        for exif_ifd_offset in exif_ifd_offsets:
+            _read_ifd_dates(buffer, tiff_start, byte_order, exif_ifd_offset, found_tags, xmp_packets, visited_offsets)
+    except struct.error:
+        raise UnsupportedFileError("truncated TIFF structure")
+    for xmp_packet in xmp_packets:
+        for tag_name, value in read_xmp_dates(xmp_packet).items():
+            found_tags.setdefault(tag_name, value)
+    return found_tags
+
+def read_xmp_dates(xmp_packet):
+    """Returns {tag_name: value} for the date properties in an XMP packet (bytes)."""
+    found_tags = {}
+    for match in XMP_DATE_PROPERTY_REGEX.finditer(xmp_packet):
+        value = (match.group(2) if match.group(2) is not None else match.group(3)).strip()
+        if value:
+            found_tags.setdefault(XMP_PROPERTY_TAG_NAMES[match.group(1)], value.decode('utf-8', 'replace'))
+    return found_tags
+
+# --- Containers ---
+def _read_jpeg_dates(file_obj):
+    """
+    Walks the JPEG segment headers up to the start of the image data and reads only the
+    APP1 (EXIF / XMP) segments; all other segments are skipped with a seek.
+    """
+    if file_obj.read(2) != b"\xff\xd8":
+        raise UnsupportedFileError("not a JPEG")
+    found_tags = {}
+    xmp_tags = {}
+    while True:
+        marker_bytes = file_obj.read(2)
+        if len(marker_bytes) < 2 or marker_bytes[0] != 0xFF:
+            raise UnsupportedFileError("corrupt JPEG segment marker")
+        marker = marker_bytes[1]
+        while marker == 0xFF: # Fill bytes before a marker
+            next_byte = file_obj.read(1)
+            if not next_byte:
+                raise UnsupportedFileError("truncated JPEG")
+            marker = next_byte[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (JPEG_SOS_MARKER, JPEG_EOI_MARKER):
+            break # Metadata segments all come before the image data
+        length_bytes = file_obj.read(2)
+        if len(length_bytes) < 2:
+            raise UnsupportedFileError("truncated JPEG segment")
+        segment_length = struct.unpack(">H", length_bytes)[0] - 2
+        if segment_length < 0:
+            raise UnsupportedFileError("corrupt JPEG segment length")
+        if marker != JPEG_APP1_MARKER:
+            file_obj.seek(segment_length, os.SEEK_CUR)
+            continue
+        segment = file_obj.read(segment_length)
+        if segment.startswith(JPEG_EXIF_HEADER) and not found_tags:
+            found_tags = read_tiff_dates(segment, len(JPEG_EXIF_HEADER))
+        elif segment.startswith(JPEG_XMP_HEADER) and not xmp_tags:
+            xmp_tags = read_xmp_dates(segment[len(JPEG_XMP_HEADER):])
+    for tag_name, value in xmp_tags.items():
+        found_tags.setdefault(tag_name, value)
+    return found_tags
+
+def _read_tiff_file_dates(file_obj):
+    """Memory-maps a TIFF file so only the pages holding its IFDs are actually read."""
+    try:
+        with mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            return read_tiff_dates(mapped_file)
+    except ValueError: # Empty file: nothing to map
+        raise UnsupportedFileError("empty file")
+
+def read_date_tags(file_path):
+    """
+    Reads DateTimeOriginal / CreateDate / ModifyDate straight from a JPEG or TIFF file
+    (EXIF IFD0 + EXIF IFD, then XMP) without starting ExifTool.
+    Returns {tag_name: value} for the tags that are present.
+    Raises UnsupportedFileError for other formats or files it cannot parse, and OSError if
+    the file cannot be read; callers fall back to ExifTool in both cases.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in NATIVE_READER_EXTENSIONS:
+        raise UnsupportedFileError(f"no native reader for '{extension}' files")
+    with open(file_path, 'rb') as file_obj:
+        if extension in ('.jpg', '.jpeg'):
+            return _read_jpeg_dates(file_obj)
+        return _read_tiff_file_dates(file_obj)
@@ -0,0 +1,412 @@
+import os
+import atexit
+import asyncio
+import itertools
+import threading
+
+from exiftool_session import DEFAULT_POOL_SIZE, WORKER_RESPONSE_TIMEOUT, WORKER_SHUTDOWN_TIMEOUT, ExifToolError, iter_json_array_objects
+
+# --- Configuration ---
+DEFAULT_MAX_IN_FLIGHT = 64 # Requests admitted at once (running on a worker or waiting for one)
+STREAM_LINE_LIMIT = 16 * 1024 * 1024 # Longest single output line accepted from ExifTool (asyncio's default is 64 KiB)
+SCAN_PULL_SIZE = 64 # Items taken from a blocking iterator (e.g. a directory scan) per thread hop
+STREAM_BATCH_LINES = 256 # Output lines handed from the event loop to a synchronous iter_json() consumer per thread hop
+
+# --- Single Long-Lived ExifTool Process ---
+class AsyncExifToolWorker:
+    """
+    asyncio counterpart of exiftool_session.ExifToolWorker: one ExifTool process started with
+    '-stay_open True -@ -' through asyncio.create_subprocess_exec. Both output streams are read
+    concurrently until the request's '{readyN}' sentinel, so no reader threads are needed and
+    a chatty stderr can never block stdout.
+    """
+
+    def __init__(self, executable, worker_id=0):
+        self.executable = executable
+        self.worker_id = worker_id
+        self.process = None
+        self.restart_count = 0
+        self._sequence = itertools.count(1)
+        self._interrupted = False # A request was cancelled mid-way: its output is still pending, so the process must be replaced
+
+    async def start(self):
+        self._interrupted = False
+        self.process = await asyncio.create_subprocess_exec(
+            self.executable, '-stay_open', 'True', '-@', '-',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=os.path.dirname(self.executable) or None, # Crucial for standalone Windows ExifTool to find its DLLs
+            limit=STREAM_LINE_LIMIT
+        )
+
+    def is_alive(self):
+        return self.process is not None and self.process.returncode is None and not self._interrupted
+
+    async def restart(self):
+        await self.stop()
+        self.restart_count += 1
+        await self.start()
+
+    async def _read_until(self, stream, sentinel):
+        collected = []
+        while True:
+            line = await stream.readline()
+            if not line:
+                raise ExifToolError(f"ExifTool worker {self.worker_id} exited unexpectedly.")
+            text = line.decode('utf-8', 'replace').replace('\r\n', '\n')
+            stripped = text.rstrip('\r\n')
+            if stripped.endswith(sentinel):
+                remainder = stripped[:-len(sentinel)]
+                if remainder:
+                    collected.append(remainder + '\n')
+                return ''.join(collected)
+            collected.append(text)
+
+    async def _send_request(self, args):
+        """Writes one request to ExifTool and returns the sentinel that ends its output."""
+        if not self.is_alive():
+            raise ExifToolError(f"ExifTool worker {self.worker_id} is not running.")
+        sequence = next(self._sequence)
+        sentinel = f"{{ready{sequence}}}"
+        request_lines = [str(arg) for arg in args] + ['-echo4', sentinel, f'-execute{sequence}']
+        try:
+            self.process.stdin.write(('\n'.join(request_lines) + '\n').encode('utf-8'))
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            raise ExifToolError(f"Could not send request to ExifTool worker {self.worker_id}: {e}")
+        return sentinel
+
+    async def execute(self, args, timeout=WORKER_RESPONSE_TIMEOUT):
+        """Runs one ExifTool request and returns {'stdout': str, 'stderr': str}."""
+        sentinel = await self._send_request(args)
+        readers = [asyncio.ensure_future(self._read_until(stream, sentinel)) for stream in (self.process.stdout, self.process.stderr)]
+        try:
+            _, unfinished = await asyncio.wait(readers, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+        except asyncio.CancelledError:
+            self._interrupted = True
+            for reader in readers:
+                reader.cancel()
+            raise
+        for reader in unfinished:
+            reader.cancel()
+        for reader in readers:
+            if reader not in unfinished and reader.exception() is not None:
+                raise reader.exception()
+        if unfinished:
+            raise ExifToolError(f"ExifTool worker {self.worker_id} did not answer within {timeout}s.")
+        stdout, stderr = (reader.result() for reader in readers)
+        return {'stdout': stdout, 'stderr': stderr}
+
+    async def iter_stdout_lines(self, args, stderr_lines=None, timeout=WORKER_RESPONSE_TIMEOUT):
+        """
+        Async counterpart of ExifToolWorker.iter_stdout_lines: yields the request's stdout line by
+        line as ExifTool produces it. stderr is read alongside, so it can never block stdout, and
+        appended to 'stderr_lines' (if given) once stdout is complete. If the consumer stops early
+        the rest of the output is still pending, so the worker is replaced before its next request.
+        """
+        sentinel = await self._send_request(args)
+        stderr_reader = asyncio.ensure_future(self._read_until(self.process.stderr, sentinel))
+        request_finished = False
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+                except asyncio.TimeoutError:
+                    raise ExifToolError(f"ExifTool worker {self.worker_id} did not answer within {timeout}s.")
+                if not line:
+                    raise ExifToolError(f"ExifTool worker {self.worker_id} exited unexpectedly.")
+                text = line.decode('utf-8', 'replace').replace('\r\n', '\n')
+                stripped = text.rstrip('\r\n')
+                if stripped.endswith(sentinel):
+                    if stripped[:-len(sentinel)]:
+                        yield stripped[:-len(sentinel)] + '\n'
+                    break
+                yield text
+            try:
+                stderr = await asyncio.wait_for(stderr_reader, timeout)
+            except asyncio.TimeoutError:
+                raise ExifToolError(f"ExifTool worker {self.worker_id} did not answer within {timeout}s.")
+            request_finished = True
+        finally:
+            if not request_finished:
+                self._interrupted = True
+                if stderr_reader.done() and not stderr_reader.cancelled():
+                    stderr_reader.exception() # Retrieved, so asyncio does not warn about it
+                stderr_reader.cancel()
+        if stderr_lines is not None:
+            stderr_lines.extend(stderr.splitlines())
+
+    async def stop(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.returncode is None:
+                self.process.stdin.write(b'-stay_open\nFalse\n')
+                await self.process.stdin.drain()
+                await asyncio.wait_for(self.process.wait(), WORKER_SHUTDOWN_TIMEOUT)
+        except (BrokenPipeError, ConnectionResetError, OSError, asyncio.TimeoutError):
+            self.process.kill()
+            await self.process.wait()
+        finally:
+            self.process = None
+
+# --- Worker Pool ---
+class AsyncExifToolPool:
+    """
+    A fixed-size pool of AsyncExifToolWorker processes for use inside one event loop.
+    At most 'max_in_flight' requests are admitted at once (semaphore); further callers wait,
+    which is the backpressure that keeps a fast producer (e.g. a folder scan) from queueing
+    an unbounded number of requests. Workers are started on first use; a worker that crashes
+    or hangs is restarted and the request is retried once, as in ExifToolPool.
+    """
+
+    def __init__(self, executable, size=DEFAULT_POOL_SIZE, max_in_flight=DEFAULT_MAX_IN_FLIGHT, retries=1):
+        self.executable = executable
+        self.size = max(1, int(size))
+        self.max_in_flight = max(self.size, int(max_in_flight))
+        self.retries = retries
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._idle_workers = asyncio.Queue()
+        self._all_workers = []
+        self._closed = False
+        for worker_id in range(self.size):
+            worker = AsyncExifToolWorker(executable, worker_id)
+            self._all_workers.append(worker)
+            self._idle_workers.put_nowait(worker)
+
+    async def execute(self, args, timeout=WORKER_RESPONSE_TIMEOUT):
+        """Runs one request on the next free worker. Returns {'stdout': str, 'stderr': str}."""
+        if self._closed:
+            raise ExifToolError("ExifTool pool has been closed.")
+        async with self._in_flight:
+            worker = await self._idle_workers.get()
+            try:
+                for attempt in range(self.retries + 1):
+                    try:
+                        if not worker.is_alive():
+                            if worker.process is None:
+                                await worker.start()
+                            else:
+                                print(f"  Warning: ExifTool worker {worker.worker_id} has stopped; restarting it.")
+                                await worker.restart()
+                        return await worker.execute(args, timeout=timeout)
+                    except ExifToolError as e:
+                        print(f"  Warning: {e}")
+                        await worker.restart()
+                        if attempt == self.retries:
+                            raise
+            finally:
+                self._idle_workers.put_nowait(worker)
+
+    async def iter_stdout_lines(self, args, stderr_lines=None, timeout=WORKER_RESPONSE_TIMEOUT):
+        """
+        Runs one request on the next free worker and yields its stdout lines as they arrive. The
+        request keeps its in-flight slot and worker until the generator is exhausted or closed.
+        As in ExifToolPool.iter_json, a request that fails mid-stream is not retried (lines may
+        already have been consumed); the worker is restarted and ExifToolError is raised.
+        """
+        if self._closed:
+            raise ExifToolError("ExifTool pool has been closed.")
+        async with self._in_flight:
+            worker = await self._idle_workers.get()
+            try:
+                if not worker.is_alive():
+                    if worker.process is None:
+                        await worker.start()
+                    else:
+                        await worker.restart()
+                lines = worker.iter_stdout_lines(args, stderr_lines, timeout)
+                try:
+                    async for line in lines:
+                        yield line
+                except ExifToolError:
+                    await worker.restart()
+                    raise
+                finally:
+                    await lines.aclose() # Marks the worker interrupted before it is handed out again
+            finally:
+                self._idle_workers.put_nowait(worker)
+
+    async def _execute_keyed(self, key, args, timeout):
+        try:
+            return key, await self.execute(args, timeout)
+        except ExifToolError as e:
+            return key, e
+
+    async def iter_completed(self, keyed_requests, timeout=WORKER_RESPONSE_TIMEOUT, pull_size=SCAN_PULL_SIZE):
+        """
+        Runs (key, args) requests from 'keyed_requests' and yields (key, result) as each
+        completes; 'result' is the execute() dict, or the ExifToolError the request failed with.
+        'keyed_requests' may be a plain (blocking) iterable such as a directory scan or a
+        pipeline queue: up to 'pull_size' items at a time are taken from it in a worker thread,
+        only while fewer than max_in_flight requests are pending, and completed requests are
+        yielded while that thread is still waiting. Slow producers overlap with ExifTool and
+        never run far ahead.
+        """
+        requests_iterator = iter(keyed_requests)
+        pending = set()
+        pull = None # The running thread hop that takes the next requests, if any
+        exhausted = False
+        try:
+            while pending or pull is not None or not exhausted:
+                if pull is None and not exhausted and len(pending) < self.max_in_flight:
+                    take_count = min(max(1, pull_size), self.max_in_flight - len(pending))
+                    pull = asyncio.ensure_future(asyncio.to_thread(lambda: list(itertools.islice(requests_iterator, take_count))))
+                done, _ = await asyncio.wait(pending | {pull} if pull is not None else pending, return_when=asyncio.FIRST_COMPLETED)
+                if pull in done:
+                    pulled = pull.result()
+                    pull = None
+                    exhausted = not pulled
+                    for key, args in pulled:
+                        pending.add(asyncio.ensure_future(self._execute_keyed(key, args, timeout)))
+                finished = done & pending
+                pending -= finished
+                for task in finished:
+                    yield task.result()
+        finally:
+            for task in pending: # The consumer stopped early
+                task.cancel()
+            if pull is not None:
+                pull.cancel() # The thread finishes its pull; the items are dropped
+
+    @property
+    def restart_count(self):
+        return sum(worker.restart_count for worker in self._all_workers)
+
+    async def close(self):
+        self._closed = True
+        await asyncio.gather(*(worker.stop() for worker in self._all_workers))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+# --- Synchronous Bridge ---
+class AsyncExifToolBridge:
+    """
+    Thin synchronous wrapper with the ExifToolPool interface (execute, iter_json, size, close),
+    backed by an AsyncExifToolPool running on its own event loop thread. Existing sync code and
+    pipeline threads use it unchanged: each call is handed to the loop and waited for, so many
+    threads can keep requests in flight while the loop drives all ExifTool processes without
+    per-process reader threads.
+    """
+
+    def __init__(self, executable, size=DEFAULT_POOL_SIZE, max_in_flight=DEFAULT_MAX_IN_FLIGHT, retries=1):
+        self.executable = executable
+        self.size = max(1, int(size))
+        self.max_in_flight = max_in_flight
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="exiftool-asyncio", daemon=True)
+        self._thread.start()
+        self._pool = self.run(self._create_pool(executable, self.size, max_in_flight, retries))
+        self._closed = False
+
+    @staticmethod
+    async def _create_pool(executable, size, max_in_flight, retries):
+        return AsyncExifToolPool(executable, size, max_in_flight, retries) # Created inside the loop it will run on
+
+    @property
+    def pool(self):
+        """The AsyncExifToolPool, for coroutines passed to run()."""
+        return self._pool
+
+    def run(self, coroutine):
+        """Runs a coroutine on the bridge's event loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def execute(self, args, timeout=WORKER_RESPONSE_TIMEOUT):
+        """Runs one request on the next free worker. Returns {'stdout': str, 'stderr': str}."""
+        if self._closed:
+            raise ExifToolError("ExifTool pool has been closed.")
+        return self.run(self._pool.execute(args, timeout))
+
+    def iter_json(self, args, stderr_lines=None, timeout=WORKER_RESPONSE_TIMEOUT):
+        """
+        Runs one '-json' request and yields each JSON object as soon as it has been read, like
+        ExifToolPool.iter_json. Output lines are handed over from the event loop in batches of
+        STREAM_BATCH_LINES, so only one batch and the current object are held in memory.
+        """
+        if self._closed:
+            raise ExifToolError("ExifTool pool has been closed.")
+        line_batches = _iter_line_batches(self._pool.iter_stdout_lines(args, stderr_lines, timeout))
+        try:
+            yield from iter_json_array_objects(self._iter_batched_lines(line_batches))
+        finally:
+            if not self._closed:
+                self.run(line_batches.aclose())
+
+    def _iter_batched_lines(self, line_batches):
+        while True:
+            batch = self.run(_next_or_none(line_batches))
+            if batch is None:
+                return
+            yield from batch
+
+    @property
+    def restart_count(self):
+        return self._pool.restart_count
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.run(self._pool.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+async def _iter_line_batches(lines):
+    """Groups an async iterator of lines into lists of up to STREAM_BATCH_LINES."""
+    batch = []
+    try:
+        async for line in lines:
+            batch.append(line)
+            if len(batch) >= STREAM_BATCH_LINES:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        await lines.aclose()
+
+async def _next_or_none(async_iterator):
+    try:
+        return await async_iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+# --- Shared Bridge ---
+_shared_bridge = None
+_shared_bridge_lock = threading.Lock()
+
+def get_shared_bridge(executable, size=DEFAULT_POOL_SIZE, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+    """
+    Returns the process-wide AsyncExifToolBridge, creating it on first call; the asyncio
+    counterpart of exiftool_session.get_shared_pool. Closed automatically at interpreter exit.
+    """
+    global _shared_bridge
+    with _shared_bridge_lock:
+        if (_shared_bridge is None or _shared_bridge._closed or _shared_bridge.executable != executable
+                or _shared_bridge.max_in_flight != max_in_flight):
+            if _shared_bridge is not None:
+                _shared_bridge.close()
+            _shared_bridge = AsyncExifToolBridge(executable, size, max_in_flight)
+        return _shared_bridge
+
+def close_shared_bridge():
+    global _shared_bridge
+    with _shared_bridge_lock:
+        if _shared_bridge is not None:
+            _shared_bridge.close()
+            _shared_bridge = None
+
+atexit.register(close_shared_bridge)
@@ -0,0 +1,138 @@
+import os
+import json
+import shutil
+import subprocess
+
+# --- Configuration ---
+EXIFTOOL_ENV_VAR = "EXIFTOOL_PATH" # Explicit location of the ExifTool executable
+EXIFTOOL_NAME = "exiftool.exe" if os.name == 'nt' else "exiftool"
+VERSION_CHECK_TIMEOUT = 30 # Seconds allowed for 'exiftool -ver'
+# Directory levels the last-resort search descends below the project's parent folder. The old
+# unbounded os.walk could take tens of seconds when that folder is a large home directory.
+SEARCH_MAX_DEPTH = 3
+LOCATOR_CACHE_FILENAME = "exiftool_location.json"
+
+class ExifToolNotFoundError(Exception):
+    """Raised when no working ExifTool executable can be found."""
+
+def user_cache_dir():
+    """Per-user cache folder shared by the scripts (ExifTool location, compiled date patterns)."""
+    if os.name == 'nt':
+        base_dir = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_dir, "metadata_editor")
+
+def _cache_path():
+    return os.path.join(user_cache_dir(), LOCATOR_CACHE_FILENAME)
+
+def _file_signature(path):
+    """(size, mtime_ns) of 'path', or None if it is not an executable file."""
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path) or not os.access(path, os.X_OK):
+        return None
+    return [stat_result.st_size, stat_result.st_mtime_ns]
+
+def _load_cache():
+    try:
+        with open(_cache_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(entry):
+    """Best effort: a read-only home directory only costs the next run a fresh lookup."""
+    try:
+        os.makedirs(user_cache_dir(), exist_ok=True)
+        temp_path = _cache_path() + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, _cache_path())
+    except OSError:
+        pass
+
+def read_exiftool_version(executable):
+    """Runs 'exiftool -ver' and returns the version string, or None if the executable does not work."""
+    try:
+        result = subprocess.run(
+            [executable, '-ver'],
+            capture_output=True,
+            text=True,
+            timeout=VERSION_CHECK_TIMEOUT,
+            cwd=os.path.dirname(executable) or None # Crucial for standalone Windows ExifTool to find its DLLs
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    version = result.stdout.strip()
+    return version if result.returncode == 0 and version else None
+
+def _search_below(root_dir, max_depth):
+    """Breadth-first search for the executable, at most 'max_depth' directory levels deep."""
+    current_level = [root_dir]
+    for _ in range(max_depth + 1):
+        next_level = []
+        for directory in current_level:
+            try:
+                with os.scandir(directory) as dir_entries:
+                    for entry in dir_entries:
+                        try:
+                            if entry.name == EXIFTOOL_NAME and entry.is_file() and os.access(entry.path, os.X_OK):
+                                return entry.path
+                            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                                next_level.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        current_level = next_level
+    return None
+
+def _candidate_paths(explicit_path, script_dir):
+    """Yields (path, source description) in search order; each is validated lazily by the caller."""
+    if explicit_path:
+        yield explicit_path, "command line"
+    env_path = os.environ.get(EXIFTOOL_ENV_VAR)
+    if env_path:
+        yield env_path, f"{EXIFTOOL_ENV_VAR} environment variable"
+    if script_dir:
+        yield os.path.join(script_dir, EXIFTOOL_NAME), "script directory"
+    path_from_which = shutil.which(EXIFTOOL_NAME)
+    if path_from_which:
+        yield path_from_which, "system PATH"
+    if script_dir:
+        found_path = _search_below(os.path.dirname(script_dir), SEARCH_MAX_DEPTH)
+        if found_path:
+            yield found_path, "project subfolder"
+
+def locate_exiftool(explicit_path=None, script_dir=None, use_cache=True):
+    """
+    Finds a working ExifTool executable and returns (path, version, source).
+
+    Search order: 'explicit_path' (e.g. a --exiftool flag), the EXIFTOOL_PATH environment
+    variable, the location cached by an earlier run, the script directory, the system PATH and
+    finally a depth-limited search below the script's parent folder. An explicit path or
+    environment variable that does not work is an error rather than silently skipped.
+    The cache stores the resolved path with its size, mtime and 'exiftool -ver' output, so
+    a warm start costs one stat call instead of a directory search and a process launch.
+    Raises ExifToolNotFoundError if nothing works.
+    """
+    cache = _load_cache() if use_cache else {}
+    if not explicit_path and not os.environ.get(EXIFTOOL_ENV_VAR):
+        cached_path = cache.get('path')
+        if cached_path and cache.get('signature') == _file_signature(cached_path) and cache.get('version'):
+            return cached_path, cache['version'], "cache"
+
+    for candidate_path, source in _candidate_paths(explicit_path, script_dir):
+        candidate_path = os.path.abspath(candidate_path)
+        signature = _file_signature(candidate_path)
+        version = read_exiftool_version(candidate_path) if signature else None
+        if version:
+            if use_cache:
+                _save_cache({'path': candidate_path, 'signature': signature, 'version': version})
+            return candidate_path, version, source
+        if source == "command line" or source.endswith("environment variable"):
+            raise ExifToolNotFoundError(f"ExifTool from the {source} does not work: {candidate_path}")
+    raise ExifToolNotFoundError(f"{EXIFTOOL_NAME} not found.")
@@ -0,0 +1,296 @@
+import os
+import json
+import queue
+import atexit
+import itertools
+import threading
+import subprocess
+
+# --- Configuration ---
+DEFAULT_POOL_SIZE = max(1, min(4, os.cpu_count() or 1))
+WORKER_RESPONSE_TIMEOUT = 600 # Seconds to wait for a single request before treating the worker as hung
+WORKER_SHUTDOWN_TIMEOUT = 10 # Seconds to wait for a worker to exit after '-stay_open False'
+
+class ExifToolError(Exception):
+    """Raised when an ExifTool worker dies or stops responding mid-request."""
+
+# --- Single Long-Lived ExifTool Process ---
+class ExifToolWorker:
+    """
+    Wraps one ExifTool process started with '-stay_open True -@ -'.
+    Arguments are streamed over stdin, one per line, and each request ends with
+    '-execute{N}'. ExifTool answers with '{readyN}' on stdout; '-echo4 {readyN}'
+    places the same sentinel on stderr so both streams can be split per request.
+    """
+
+    def __init__(self, executable, worker_id=0):
+        self.executable = executable
+        self.worker_id = worker_id
+        self.process = None
+        self.restart_count = 0
+        self._sequence = itertools.count(1)
+        self._stdout_lines = None
+        self._stderr_lines = None
+
+    def start(self):
+        exiftool_dir = os.path.dirname(self.executable) or None
+        self.process = subprocess.Popen(
+            [self.executable, '-stay_open', 'True', '-@', '-'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            cwd=exiftool_dir # Crucial for standalone Windows ExifTool to find its DLLs
+        )
+        # Each stream is drained by its own thread so a chatty stderr can never block stdout (or vice versa)
+        self._stdout_lines = queue.Queue()
+        self._stderr_lines = queue.Queue()
+        for stream, line_queue in ((self.process.stdout, self._stdout_lines), (self.process.stderr, self._stderr_lines)):
+            reader = threading.Thread(target=self._drain_stream, args=(stream, line_queue), daemon=True)
+            reader.start()
+
+    @staticmethod
+    def _drain_stream(stream, line_queue):
+        try:
+            for line in stream:
+                line_queue.put(line)
+        except (OSError, ValueError):
+            pass # Stream closed underneath us while the worker was being stopped
+        line_queue.put(None) # EOF marker: the process has exited
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def restart(self):
+        self.stop()
+        self.restart_count += 1
+        self.start()
+
+    def _collect_until(self, line_queue, sentinel, timeout):
+        collected = []
+        while True:
+            try:
+                line = line_queue.get(timeout=timeout)
+            except queue.Empty:
+                raise ExifToolError(f"ExifTool worker {self.worker_id} did not answer within {timeout}s.")
+            if line is None:
+                raise ExifToolError(f"ExifTool worker {self.worker_id} exited unexpectedly (exit code {self.process.poll()}).")
+            stripped = line.rstrip('\r\n')
+            if stripped.endswith(sentinel):
+                remainder = stripped[:-len(sentinel)]
+                if remainder:
+                    collected.append(remainder + '\n')
+                return ''.join(collected)
+            collected.append(line)
+
+    def _send_request(self, args):
+        """Writes one request to ExifTool's stdin and returns the sentinel that will end its output."""
+        if not self.is_alive():
+            raise ExifToolError(f"ExifTool worker {self.worker_id} is not running.")
+        sequence = next(self._sequence)
+        sentinel = f"{{ready{sequence}}}"
+        request_lines = [str(arg) for arg in args] + ['-echo4', sentinel, f'-execute{sequence}']
+        try:
+            self.process.stdin.write('\n'.join(request_lines) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ExifToolError(f"Could not send request to ExifTool worker {self.worker_id}: {e}")
+        return sentinel
+
+    def execute(self, args, timeout=WORKER_RESPONSE_TIMEOUT):
+        """
+        Runs one ExifTool request and returns {'stdout': str, 'stderr': str}.
+        'args' is the same list that would follow the executable on a normal command line.
+        """
+        sentinel = self._send_request(args)
+        stdout = self._collect_until(self._stdout_lines, sentinel, timeout)
+        stderr = self._collect_until(self._stderr_lines, sentinel, timeout)
+        return {'stdout': stdout, 'stderr': stderr}
+
+    def iter_stdout_lines(self, args, stderr_lines=None, timeout=WORKER_RESPONSE_TIMEOUT):
+        """
+        Runs one ExifTool request and yields its stdout line by line as ExifTool produces it,
+        so large outputs (e.g. '-json -r' over a whole tree) never have to be held in memory.
+        The request's stderr is appended to 'stderr_lines' (if given) once stdout is complete.
+        """
+        sentinel = self._send_request(args)
+        stdout_finished = False
+        try:
+            while True:
+                try:
+                    line = self._stdout_lines.get(timeout=timeout)
+                except queue.Empty:
+                    raise ExifToolError(f"ExifTool worker {self.worker_id} did not answer within {timeout}s.")
+                if line is None:
+                    raise ExifToolError(f"ExifTool worker {self.worker_id} exited unexpectedly (exit code {self.process.poll()}).")
+                stripped = line.rstrip('\r\n')
+                if stripped.endswith(sentinel):
+                    stdout_finished = True
+                    if stripped[:-len(sentinel)]:
+                        yield stripped[:-len(sentinel)] + '\n'
+                    break
+                yield line
+        finally:
+            if not stdout_finished and self.is_alive():
+                # The consumer stopped early: skip the rest of this request's output so the
+                # worker is back in sync before it serves the next request
+                self._collect_until(self._stdout_lines, sentinel, timeout)
+            if self.is_alive():
+                stderr = self._collect_until(self._stderr_lines, sentinel, timeout)
+                if stderr_lines is not None:
+                    stderr_lines.extend(stderr.splitlines())
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                self.process.stdin.write('-stay_open\nFalse\n')
+                self.process.stdin.flush()
+                self.process.wait(timeout=WORKER_SHUTDOWN_TIMEOUT)
+        except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        finally:
+            for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            self.process = None
+
+# --- Worker Pool ---
+class ExifToolPool:
+    """
+    A fixed-size pool of ExifToolWorker processes, safe to call from several threads.
+    Workers are started on first use; a worker that crashes or hangs is restarted and
+    the request is retried once on the fresh process.
+    """
+
+    def __init__(self, executable, size=DEFAULT_POOL_SIZE, retries=1):
+        self.executable = executable
+        self.size = max(1, int(size))
+        self.retries = retries
+        self._idle_workers = queue.Queue()
+        self._all_workers = []
+        self._closed = False
+        for worker_id in range(self.size):
+            worker = ExifToolWorker(executable, worker_id)
+            self._all_workers.append(worker)
+            self._idle_workers.put(worker)
+
+    def execute(self, args, timeout=WORKER_RESPONSE_TIMEOUT):
+        """Runs one request on the next free worker. Returns {'stdout': str, 'stderr': str}."""
+        if self._closed:
+            raise ExifToolError("ExifTool pool has been closed.")
+        worker = self._idle_workers.get()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    if not worker.is_alive():
+                        if worker.process is None:
+                            worker.start()
+                        else:
+                            print(f"  Warning: ExifTool worker {worker.worker_id} has stopped; restarting it.")
+                            worker.restart()
+                    return worker.execute(args, timeout=timeout)
+                except ExifToolError as e:
+                    print(f"  Warning: {e}")
+                    worker.restart()
+                    if attempt == self.retries:
+                        raise
+        finally:
+            self._idle_workers.put(worker)
+
+    def iter_json(self, args, stderr_lines=None, timeout=WORKER_RESPONSE_TIMEOUT):
+        """
+        Runs one '-json' request on the next free worker and yields each JSON object as soon as
+        it has been read, instead of parsing the whole array at the end. The worker stays
+        reserved until the generator is exhausted or closed. Unlike execute(), a request that
+        fails mid-stream is not retried (objects may already have been consumed); the worker is
+        restarted and ExifToolError is raised.
+        """
+        if self._closed:
+            raise ExifToolError("ExifTool pool has been closed.")
+        worker = self._idle_workers.get()
+        try:
+            if not worker.is_alive():
+                if worker.process is None:
+                    worker.start()
+                else:
+                    worker.restart()
+            try:
+                yield from iter_json_array_objects(worker.iter_stdout_lines(args, stderr_lines, timeout))
+            except ExifToolError:
+                worker.restart()
+                raise
+        finally:
+            self._idle_workers.put(worker)
+
+    @property
+    def restart_count(self):
+        return sum(worker.restart_count for worker in self._all_workers)
+
+    def close(self):
+        self._closed = True
+        for worker in self._all_workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+# --- Streaming JSON ---
+def iter_json_array_objects(lines):
+    """
+    Incrementally parses ExifTool '-json' output - a JSON array of objects spread over many
+    lines - and yields each object once it is complete. Only the current object is buffered.
+    Text outside of objects (the array brackets, commas, stray messages) is skipped.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    for line in lines:
+        buffer += line
+        while True:
+            object_start = buffer.find('{')
+            if object_start < 0:
+                buffer = ""
+                break
+            try:
+                parsed_object, object_end = decoder.raw_decode(buffer, object_start)
+            except json.JSONDecodeError:
+                buffer = buffer[object_start:] # Incomplete object: wait for more lines
+                break
+            yield parsed_object
+            buffer = buffer[object_end:]
+
+# --- Shared Pool ---
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def get_shared_pool(executable, size=DEFAULT_POOL_SIZE):
+    """
+    Returns the process-wide ExifToolPool, creating it on first call.
+    The editor and the checker both go through this so one set of ExifTool processes
+    serves all of their work; the pool is shut down automatically at interpreter exit.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or _shared_pool._closed or _shared_pool.executable != executable:
+            if _shared_pool is not None:
+                _shared_pool.close()
+            _shared_pool = ExifToolPool(executable, size)
+        return _shared_pool
+
+def close_shared_pool():
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            _shared_pool.close()
+            _shared_pool = None
+
+atexit.register(close_shared_pool)
@@ -0,0 +1,56 @@
+import os
+import fnmatch
+
+# Media file types handled by the editor and the checker
+SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.heic', '.heif', '.tiff', '.tif', '.mp4', '.mov', '.arw', '.cr2', '.nef', '.orf', '.raf', '.rw2', '.srw')
+
+def matches_any_glob(relative_path, name, globs):
+    """True if the '/'-separated relative path or the bare name matches one of 'globs'."""
+    return any(fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in globs)
+
+def scan_media_files(root_dir, extensions, recursive=False, include_globs=(), exclude_globs=(), skip_dir_names=()):
+    """
+    Lazily yields (dir_entry, relative_path) for every file under 'root_dir' whose name ends
+    with one of 'extensions' (case-insensitive).
+
+    Built on os.scandir, so the file/directory type comes from the directory listing itself
+    instead of an extra stat call per entry, and results are produced while the scan is still
+    running. 'relative_path' uses '/' separators on every platform.
+
+    - recursive: descend into subdirectories (symlinked directories are not followed).
+    - include_globs: if given, a file must match at least one (against its relative path or name).
+    - exclude_globs: files and whole directories matching any of these are skipped.
+    - skip_dir_names: directory names that are never entered (e.g. the script's own output folders).
+    """
+    extensions = tuple(extension.lower() for extension in extensions)
+    pending_dirs = [(root_dir, "")]
+    while pending_dirs:
+        current_dir, relative_dir = pending_dirs.pop()
+        try:
+            with os.scandir(current_dir) as dir_entries:
+                subdirs = []
+                for entry in dir_entries:
+                    relative_path = f"{relative_dir}{entry.name}"
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if not recursive or entry.name in skip_dir_names or entry.is_symlink():
+                            continue
+                        if exclude_globs and matches_any_glob(relative_path, entry.name, exclude_globs):
+                            continue
+                        subdirs.append((entry.path, f"{relative_path}/"))
+                        continue
+                    if not entry.name.lower().endswith(extensions):
+                        continue
+                    if include_globs and not matches_any_glob(relative_path, entry.name, include_globs):
+                        continue
+                    if exclude_globs and matches_any_glob(relative_path, entry.name, exclude_globs):
+                        continue
+                    yield entry, relative_path
+        except OSError as e:
+            print(f"Warning: Could not scan directory {current_dir}: {e}")
+            continue
+        # Depth-first in listing order: reversed so the first subdirectory is popped next
+        pending_dirs.extend(reversed(subdirs))
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# --- Configuration ---
+JOB_STATE_FILENAME = "job_state.sqlite"
+
+# Per-file states, in order. Each transition is committed only after the file operation
+# it describes has completed, so a crash at any point leaves every file in a state from
+# which the step can simply be redone.
+FILE_STATE_COPIED = "copied" # Staged for processing (temp copy/link exists, or inplace/outlier source)
+FILE_STATE_WRITTEN = "written" # ExifTool result recorded
+FILE_STATE_PLACED = "placed" # Moved into the output or outliers folder
+
+JOB_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    relative_path TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    src_path TEXT NOT NULL,
+    temp_path TEXT NOT NULL,
+    placement_method TEXT NOT NULL,
+    datetime_info TEXT,
+    write_args TEXT,
+    write_result TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    content_hash TEXT,
+    destination TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_by_state ON files (state);
+"""
+
+class JobState:
+    """
+    Checkpoint database of one editor run, kept in the job (temporary) directory next to the
+    staged files. It stores job-level phase flags (source folder, transfer mode, whether the
+    scan completed) and the state of every file that has been staged: copied -> written ->
+    placed. The placement destination is recorded before the move, so a file moved just before
+    a crash is recognised as placed on resume instead of being processed twice.
+    Safe to use from several pipeline threads.
+    """
+
+    def __init__(self, job_dir):
+        self.job_dir = job_dir
+        self.state_path = os.path.join(job_dir, JOB_STATE_FILENAME)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.state_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(JOB_STATE_SCHEMA)
+        file_columns = {row[1] for row in self._connection.execute("PRAGMA table_info(files)")}
+        if 'write_args' not in file_columns: # Job state left by an earlier version
+            self._connection.execute("ALTER TABLE files ADD COLUMN write_args TEXT")
+        self._connection.commit()
+
+    @staticmethod
+    def exists(job_dir):
+        return os.path.isfile(os.path.join(job_dir, JOB_STATE_FILENAME))
+
+    # --- Job-level phase checkpoints ---
+    def set_phase(self, key, value):
+        with self._lock:
+            with self._connection:
+                self._connection.execute("INSERT OR REPLACE INTO job VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_phase(self, key, default=None):
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM job WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    # --- Per-file state transitions ---
+    def mark_copied(self, entries):
+        """
+        Records staged files. 'entries' are dicts with relative_path, src_path, temp_path,
+        placement_method, datetime_info, size, mtime_ns and content_hash, and optionally
+        write_args (ExifTool arguments taken from an applied plan).
+        """
+        rows = [
+            (
+                entry['relative_path'], FILE_STATE_COPIED, entry['src_path'], entry['temp_path'], entry['placement_method'],
+                json.dumps(entry['datetime_info']) if entry.get('datetime_info') else None,
+                json.dumps(entry['write_args']) if entry.get('write_args') is not None else None,
+                entry.get('size'), entry.get('mtime_ns'), entry.get('content_hash'), time.time()
+            )
+            for entry in entries
+        ]
+        self._write_many(
+            "INSERT OR REPLACE INTO files (relative_path, state, src_path, temp_path, placement_method, datetime_info, "
+            "write_args, size, mtime_ns, content_hash, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+    def mark_written(self, results):
+        """Records ExifTool results; 'results' are (relative_path, write_result) pairs."""
+        rows = [(FILE_STATE_WRITTEN, json.dumps(write_result), time.time(), relative_path) for relative_path, write_result in results]
+        self._write_many("UPDATE files SET state = ?, write_result = ?, updated_at = ? WHERE relative_path = ?", rows)
+
+    def mark_placing(self, relative_path, destination):
+        """Records the destination a file is about to be moved to (state is unchanged)."""
+        self._write_many("UPDATE files SET destination = ?, updated_at = ? WHERE relative_path = ?", [(destination, time.time(), relative_path)])
+
+    def mark_placed(self, relative_paths):
+        rows = [(FILE_STATE_PLACED, time.time(), relative_path) for relative_path in relative_paths]
+        self._write_many("UPDATE files SET state = ?, updated_at = ? WHERE relative_path = ?", rows)
+
+    def forget(self, relative_path):
+        """Drops a file whose staged copy was lost, so it is staged again from the source."""
+        self._write_many("DELETE FROM files WHERE relative_path = ?", [(relative_path,)])
+
+    def _write_many(self, statement, rows):
+        if not rows:
+            return
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(statement, rows)
+
+    # --- Resume ---
+    def is_tracked(self, relative_path):
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM files WHERE relative_path = ?", (relative_path,)).fetchone() is not None
+
+    def iter_unfinished(self, fetch_size=1000):
+        """Yields every file that has not reached the 'placed' state, as a dict."""
+        last_path = ""
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT relative_path, state, src_path, temp_path, placement_method, datetime_info, write_result, "
+                    "size, mtime_ns, content_hash, destination, write_args FROM files "
+                    "WHERE state != ? AND relative_path > ? ORDER BY relative_path LIMIT ?",
+                    (FILE_STATE_PLACED, last_path, fetch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {
+                    'relative_path': row[0],
+                    'state': row[1],
+                    'src_path': row[2],
+                    'temp_path': row[3],
+                    'placement_method': row[4],
+                    'datetime_info': json.loads(row[5]) if row[5] else None,
+                    'write_result': json.loads(row[6]) if row[6] else None,
+                    'size': row[7],
+                    'mtime_ns': row[8],
+                    'content_hash': row[9],
+                    'destination': row[10],
+                    'write_args': json.loads(row[11]) if row[11] else None
+                }
+            last_path = rows[-1][0]
+
+    def count_by_state(self):
+        with self._lock:
+            return dict(self._connection.execute("SELECT state, COUNT(*) FROM files GROUP BY state").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
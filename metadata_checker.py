@@ -1,59 +1,63 @@
 import os
-import subprocess
-import shutil
+import sys
+import json
+import argparse
+import itertools
+import contextlib
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from file_scanner import SUPPORTED_EXTENSIONS, matches_any_glob, scan_media_files
+from exiftool_session import DEFAULT_POOL_SIZE, ExifToolError, get_shared_pool
+from exiftool_async import DEFAULT_MAX_IN_FLIGHT, get_shared_bridge
+from exiftool_locator import EXIFTOOL_ENV_VAR, ExifToolNotFoundError, locate_exiftool
+from exif_reader import NATIVE_READER_EXTENSIONS, TAGS_TO_CHECK_CONFIG, UnsupportedFileError, read_date_tags
 
 # --- Constants ---
-# Tags as ExifTool expects them on the command line and their human-readable form for output/checking
-TAGS_TO_CHECK_CONFIG = {
-    "DateTimeOriginal": "Date/Time Original",
-    "CreateDate": "Create Date",
-    "ModifyDate": "Modify Date"
-}
+# The tags to check (TAGS_TO_CHECK_CONFIG) are shared with the editor and defined in exif_reader.py
 EXIFTOOL_EXECUTABLE = None # Will store the full path to exiftool.exe
+EXIFTOOL_POOL_SIZE = DEFAULT_POOL_SIZE # Number of persistent ExifTool (-stay_open) processes
+# "native": JPEG/TIFF date tags are read directly from the file headers; other formats (HEIC, RAW,
+#           video) and files the built-in reader cannot parse are batched to ExifTool (fastest)
+# "bulk": one streamed ExifTool '-json -fast2' request per folder
+# "per_file": one pooled ExifTool request per file
+# "async": one ExifTool request per file, driven by asyncio with up to ASYNC_MAX_IN_FLIGHT requests
+#          outstanding; suits slow or network storage, where per-file latency dominates
+CHECK_MODE = "native"
+CHECK_MODES = ("native", "bulk", "per_file", "async")
+ASYNC_MAX_IN_FLIGHT = DEFAULT_MAX_IN_FLIGHT # Requests queued or running at once in async mode (backpressure on the scan)
+NATIVE_READER_THREADS = 8 # Header reads are I/O bound; threads keep several files in flight on slow storage
+FALLBACK_CHUNK_SIZE = 500 # Files per ExifTool request for formats the native reader hands over
+CHECK_EXTENSIONS = SUPPORTED_EXTENSIONS # Same media types the editor processes
+CHECK_RECURSIVE = False # Also check files in subfolders
+CHECK_INCLUDE_GLOBS = [] # If set, only files matching one of these globs (relative path or name) are checked
+CHECK_EXCLUDE_GLOBS = [] # Files and folders matching any of these globs are skipped (in bulk mode, applied to the results)
 
-def find_and_set_exiftool_path():
+def find_and_set_exiftool_path(explicit_path=None):
     """
     Finds ExifTool executable and sets the global EXIFTOOL_EXECUTABLE path.
-    Search order:
-    1. Script's directory.
-    2. Recursively in subfolders of the script's parent directory.
-    3. System PATH.
+    Search order (see exiftool_locator.locate_exiftool):
+    1. 'explicit_path' (--exiftool) or the EXIFTOOL_PATH environment variable.
+    2. The location cached by an earlier run (path and 'exiftool -ver' in the user cache folder).
+    3. Script's directory, then the system PATH.
+    4. Subfolders of the script's parent directory (depth-limited).
     Exits script if not found.
     """
     global EXIFTOOL_EXECUTABLE
-    script_path = os.path.abspath(__file__)
-    script_dir = os.path.dirname(script_path)
-    exiftool_name = "exiftool.exe" if os.name == 'nt' else "exiftool"
-
-    # 1. Check script's directory
-    local_path = os.path.join(script_dir, exiftool_name)
-    if os.path.isfile(local_path) and os.access(local_path, os.X_OK):
-        EXIFTOOL_EXECUTABLE = local_path
-        print(f"ExifTool found in script directory: {EXIFTOOL_EXECUTABLE}")
-        return
-
-    # 2. Check subfolders of the script's parent directory
-    parent_dir = os.path.dirname(script_dir) # e.g., metadata_updater directory
-    print(f"Searching for {exiftool_name} in subfolders of: {parent_dir}...")
-    for root, _, files in os.walk(parent_dir):
-        if exiftool_name in files:
-            found_path = os.path.join(root, exiftool_name)
-            if os.access(found_path, os.X_OK):
-                EXIFTOOL_EXECUTABLE = found_path
-                print(f"ExifTool found in subfolder: {EXIFTOOL_EXECUTABLE}")
-                return
-
-    # 3. Check system PATH
-    path_from_which = shutil.which(exiftool_name)
-    if path_from_which:
-        EXIFTOOL_EXECUTABLE = path_from_which
-        print(f"ExifTool found in system PATH: {EXIFTOOL_EXECUTABLE}")
-        return
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        EXIFTOOL_EXECUTABLE, version, source = locate_exiftool(explicit_path, script_dir)
+    except ExifToolNotFoundError as e:
+        print(f"Error: {e}")
+        print("Please ensure exiftool.exe is in the script's directory, a subfolder of the project, or in your system PATH,")
+        print(f"or point --exiftool / the {EXIFTOOL_ENV_VAR} environment variable at it.")
+        print("You can download it from https://exiftool.org/")
+        exit(1)
+    print(f"ExifTool {version} found ({source}): {EXIFTOOL_EXECUTABLE}")
 
-    print(f"Error: {exiftool_name} not found.")
-    print("Please ensure exiftool.exe is in the script's directory, a subfolder of the project, or in your system PATH.")
-    print("You can download it from https://exiftool.org/")
-    exit(1)
+def _per_file_read_args(file_path):
+    # -S for simple output ("TagName: Value")
+    return [f"-{tag_key}" for tag_key in TAGS_TO_CHECK_CONFIG.keys()] + ['-S', file_path]
 
 def get_file_metadata_status(file_path):
     """
@@ -64,60 +68,58 @@ def get_file_metadata_status(file_path):
         # This should not happen if find_and_set_exiftool_path() is called first
         return {'found_count': 0, 'missing_tags': list(TAGS_TO_CHECK_CONFIG.values()), 'error_message': "Critical: ExifTool executable path not set."}
 
-    exiftool_cli_tags = [f"-{tag_key}" for tag_key in TAGS_TO_CHECK_CONFIG.keys()]
+    try:
+        # The request runs on a persistent ExifTool worker instead of a new process
+        result = get_shared_pool(EXIFTOOL_EXECUTABLE, EXIFTOOL_POOL_SIZE).execute(_per_file_read_args(file_path))
+    except ExifToolError as e:
+        result = e
+    except FileNotFoundError:
+        return metadata_status_from_error("Critical: ExifTool command could not be executed. Ensure EXIFTOOL_EXECUTABLE path is correct.")
+    except Exception as e:
+        return metadata_status_from_error(f"Unexpected Python error: {str(e)}")
+    return metadata_status_from_result(result)
+
+def metadata_status_from_error(error_msg):
+    return {'found_count': 0, 'missing_tags': list(TAGS_TO_CHECK_CONFIG.values()), 'error_message': error_msg}
+
+def metadata_status_from_result(result):
+    """
+    Builds the get_file_metadata_status() result from one '-S' request's output
+    ({'stdout': str, 'stderr': str}, or the ExifToolError the request failed with).
+    """
+    if isinstance(result, ExifToolError):
+        return metadata_status_from_error(f"ExifTool worker error: {result}")
+
     human_readable_target_tags = list(TAGS_TO_CHECK_CONFIG.values())
-    
     present_tags_in_output = []
     error_msg = None
 
-    try:
-        # Use the full path to exiftool and -S for simple output
-        command = [EXIFTOOL_EXECUTABLE] + exiftool_cli_tags + ['-S', file_path] 
-        
-        # Set the current working directory for the subprocess to ExifTool's directory
-        exiftool_dir = os.path.dirname(EXIFTOOL_EXECUTABLE)
-        
-        process = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=False,
-            encoding='utf-8',
-            cwd=exiftool_dir # Crucial for standalone Windows ExifTool to find its DLLs
-        )
-
-        stdout_lines = process.stdout.strip().split('\n') if process.stdout else []
-        stderr_content = process.stderr.strip() if process.stderr else ""
-
-        for line in stdout_lines:
-            if not line.strip():
-                continue
-            # With -S, output is "TagName: Value"
-            tag_name_from_output = line.split(':', 1)[0].strip()
-            if tag_name_from_output in TAGS_TO_CHECK_CONFIG:
-                 present_tags_in_output.append(TAGS_TO_CHECK_CONFIG[tag_name_from_output])
-
-        if process.returncode != 0:
-            if "perl5" in stderr_content and ".dll" in stderr_content:
-                 error_msg = f"ExifTool runtime error (likely Perl DLL issue): {stderr_content.splitlines()[0] if stderr_content else 'Unknown Perl DLL error'}"
-            elif "Error: File not found" in stderr_content or "Error: File not found" in process.stdout:
-                error_msg = f"ExifTool error: File not found by ExifTool."
-            elif stderr_content and not any(hr_tag in process.stdout for hr_tag in human_readable_target_tags):
-                if not (stderr_content.lower().startswith("1 image files read") and len(stderr_content.splitlines()) == 1):
-                    error_msg = f"ExifTool processing error: {stderr_content.splitlines()[0] if stderr_content else 'Unknown error'}"
-        
-        if "perl5" in stderr_content and ".dll" in stderr_content: # Prioritize this error
-            error_msg = f"ExifTool runtime error: {stderr_content.splitlines()[0] if stderr_content else 'Unknown Perl DLL error'}"
-
-    except FileNotFoundError: 
-        error_msg = "Critical: ExifTool command could not be executed. Ensure EXIFTOOL_EXECUTABLE path is correct."
-    except Exception as e:
-        error_msg = f"Unexpected Python error: {str(e)}"
+    stdout_content = result['stdout']
+    stdout_lines = stdout_content.strip().split('\n') if stdout_content else []
+    stderr_content = result['stderr'].strip() if result['stderr'] else ""
+
+    for line in stdout_lines:
+        if not line.strip():
+            continue
+        # With -S, output is "TagName: Value"
+        tag_name_from_output = line.split(':', 1)[0].strip()
+        if tag_name_from_output in TAGS_TO_CHECK_CONFIG:
+             present_tags_in_output.append(TAGS_TO_CHECK_CONFIG[tag_name_from_output])
+
+    # A stay_open request has no exit code of its own; ExifTool reports failures on stderr
+    if any(line.lstrip().lower().startswith("error") for line in stderr_content.splitlines()):
+        if "Error: File not found" in stderr_content or "Error: File not found" in stdout_content:
+            error_msg = f"ExifTool error: File not found by ExifTool."
+        elif not present_tags_in_output:
+            error_msg = f"ExifTool processing error: {stderr_content.splitlines()[0]}"
+
+    if "perl5" in stderr_content and ".dll" in stderr_content: # Prioritize this error
+        error_msg = f"ExifTool runtime error: {stderr_content.splitlines()[0] if stderr_content else 'Unknown Perl DLL error'}"
 
     unique_present_tags = sorted(list(set(present_tags_in_output)))
     found_count = len(unique_present_tags)
     missing_tags_list = [tag for tag in human_readable_target_tags if tag not in unique_present_tags]
-    
+
     if error_msg and not unique_present_tags:
         found_count = 0
 
@@ -127,17 +129,242 @@ def get_file_metadata_status(file_path):
         'error_message': error_msg
     }
 
-def main():
-    find_and_set_exiftool_path() # Find and set ExifTool path at the start
-    print("ExifTool check passed, proceeding with metadata check...\n" if EXIFTOOL_EXECUTABLE else "")
+def metadata_status_from_json(record):
+    """
+    Builds the same result as get_file_metadata_status() from one ExifTool '-json' object.
+    Returns a dictionary: {'found_count': int, 'missing_tags': list, 'error_message': str|None}
+    """
+    present_tags = [human_readable for tag_key, human_readable in TAGS_TO_CHECK_CONFIG.items() if record.get(tag_key) not in (None, "")]
+    error_msg = f"ExifTool processing error: {record['Error']}" if record.get('Error') and not present_tags else None
+    return {
+        'found_count': len(present_tags),
+        'missing_tags': [tag for tag in TAGS_TO_CHECK_CONFIG.values() if tag not in present_tags],
+        'error_message': error_msg
+    }
 
+def native_metadata_status(file_path):
+    """
+    Checks a JPEG/TIFF file with the built-in header reader, without ExifTool.
+    Returns the same dictionary as get_file_metadata_status(), or None if the file has to
+    be checked by ExifTool instead (other formats, unusual or damaged structure, read errors).
+    """
+    try:
+        found_tags = read_date_tags(file_path)
+    except (UnsupportedFileError, OSError):
+        return None
+    present_tags = [human_readable for tag_key, human_readable in TAGS_TO_CHECK_CONFIG.items() if found_tags.get(tag_key)]
+    return {
+        'found_count': len(present_tags),
+        'missing_tags': [tag for tag in TAGS_TO_CHECK_CONFIG.values() if tag not in present_tags],
+        'error_message': None
+    }
 
-    folder_path = input("Enter folder path to check for JPEGs: ").strip()
+def _bulk_read_args():
+    return ['-json', '-fast2', '-q'] + [f"-{tag_key}" for tag_key in TAGS_TO_CHECK_CONFIG.keys()]
+
+def iter_files_metadata_status(file_paths, pool=None, stderr_lines=None):
+    """
+    Like iter_bulk_metadata_status(), but for an explicit list of files in one ExifTool request.
+    Yields (source_file, status); 'source_file' is the path exactly as passed in.
+    """
+    if pool is None:
+        pool = get_shared_pool(EXIFTOOL_EXECUTABLE, EXIFTOOL_POOL_SIZE)
+    for record in pool.iter_json(_bulk_read_args() + list(file_paths), stderr_lines=stderr_lines):
+        yield record.get('SourceFile', ''), metadata_status_from_json(record)
+
+def iter_bulk_metadata_status(folder_path, extensions=CHECK_EXTENSIONS, recursive=False, pool=None, stderr_lines=None):
+    """
+    Reads the configured tags for every matching file under 'folder_path' with a single
+    ExifTool '-json -fast2' request (recursive with '-r') and yields (source_file, status)
+    as the JSON array streams in, so memory use does not grow with the number of files.
+    ExifTool's error lines for unreadable files are appended to 'stderr_lines' at the end.
+    """
+    if pool is None:
+        pool = get_shared_pool(EXIFTOOL_EXECUTABLE, EXIFTOOL_POOL_SIZE)
+    args = _bulk_read_args()
+    for extension in extensions:
+        args += ['-ext', extension.lstrip('.')]
+    if recursive:
+        args.append('-r')
+    args.append(folder_path)
+    for record in pool.iter_json(args, stderr_lines=stderr_lines):
+        yield record.get('SourceFile', ''), metadata_status_from_json(record)
+
+def check_folder_bulk(folder_path, stats):
+    """Checks a whole folder (tree) with one streamed ExifTool request and reports every file."""
+    stderr_lines = []
+    try:
+        for source_file, status in iter_bulk_metadata_status(folder_path, CHECK_EXTENSIONS, CHECK_RECURSIVE, stderr_lines=stderr_lines):
+            relative_path = os.path.relpath(source_file, folder_path).replace(os.sep, '/')
+            name = os.path.basename(relative_path)
+            if CHECK_INCLUDE_GLOBS and not matches_any_glob(relative_path, name, CHECK_INCLUDE_GLOBS):
+                continue
+            if CHECK_EXCLUDE_GLOBS and (matches_any_glob(relative_path, name, CHECK_EXCLUDE_GLOBS) or
+                                        any(matches_any_glob(parent, parent.rsplit('/', 1)[-1], CHECK_EXCLUDE_GLOBS)
+                                            for parent in itertools.accumulate(relative_path.split('/')[:-1], lambda a, b: f"{a}/{b}"))):
+                continue
+            report_file_status(stats, relative_path, status)
+    except ExifToolError as e:
+        print(f"Error: Bulk ExifTool request failed: {e}")
+        stats["files_with_errors"] += 1
+    report_exiftool_errors(stats, stderr_lines)
+
+def report_exiftool_errors(stats, stderr_lines):
+    for line in stderr_lines:
+        if line.lstrip().lower().startswith("error"):
+            # Files ExifTool could not read at all are reported here rather than in the JSON
+            print(f"-> ERROR - {line.strip()}")
+            stats["total_files_scanned"] += 1
+            stats["files_with_errors"] += 1
+
+def _check_with_exiftool(file_paths):
+    """Runs one fallback ExifTool request and returns ([(source_file, status), ...], stderr_lines)."""
+    stderr_lines = []
+    try:
+        results = list(iter_files_metadata_status(file_paths, stderr_lines=stderr_lines))
+    except ExifToolError as e:
+        error_status = {'found_count': 0, 'missing_tags': list(TAGS_TO_CHECK_CONFIG.values()), 'error_message': f"ExifTool worker error: {e}"}
+        results = [(file_path, error_status) for file_path in file_paths]
+    return results, stderr_lines
+
+def check_folder_native(folder_path, stats):
+    """
+    Reads JPEG/TIFF dates with the built-in reader on a thread pool and sends everything else
+    to ExifTool in chunks of FALLBACK_CHUNK_SIZE files, so ExifTool only sees the files that need it.
+    """
+    media_entries = scan_media_files(folder_path, CHECK_EXTENSIONS, recursive=CHECK_RECURSIVE,
+                                     include_globs=CHECK_INCLUDE_GLOBS, exclude_globs=CHECK_EXCLUDE_GLOBS)
+    # Normalized fallback file path -> relative path, only for files waiting on ExifTool. Keys are
+    # normcase(abspath()) because ExifTool's SourceFile may differ in form (e.g. '/' on Windows)
+    relative_paths = {}
+    fallback_paths = []
+
+    with ThreadPoolExecutor(max_workers=NATIVE_READER_THREADS + EXIFTOOL_POOL_SIZE) as executor:
+        pending = collections.deque()
+
+        def queue_for_exiftool(file_path, relative_path, flush=False):
+            if file_path is not None:
+                relative_paths[os.path.normcase(os.path.abspath(file_path))] = relative_path
+                fallback_paths.append(file_path)
+            if fallback_paths and (flush or len(fallback_paths) >= FALLBACK_CHUNK_SIZE):
+                chunk = list(fallback_paths)
+                pending.append(("exiftool", chunk, executor.submit(_check_with_exiftool, chunk)))
+                fallback_paths.clear()
+
+        def report_next():
+            kind, payload, future = pending.popleft()
+            if kind == "native":
+                file_path, relative_path = payload
+                status = future.result()
+                if status is None:
+                    queue_for_exiftool(file_path, relative_path)
+                else:
+                    report_file_status(stats, relative_path, status)
+                return
+            results, stderr_lines = future.result()
+            for source_file, status in results:
+                report_file_status(stats, relative_paths.get(os.path.normcase(os.path.abspath(source_file)), source_file), status)
+            report_exiftool_errors(stats, stderr_lines)
+            for file_path in payload:
+                relative_paths.pop(os.path.normcase(os.path.abspath(file_path)), None)
+
+        for entry, relative_path in media_entries:
+            if entry.name.lower().endswith(NATIVE_READER_EXTENSIONS):
+                pending.append(("native", (entry.path, relative_path), executor.submit(native_metadata_status, entry.path)))
+            else:
+                queue_for_exiftool(entry.path, relative_path)
+            while len(pending) > (NATIVE_READER_THREADS + EXIFTOOL_POOL_SIZE) * 4:
+                report_next()
+        while pending or fallback_paths:
+            if not pending:
+                queue_for_exiftool(None, None, flush=True)
+            report_next()
+
+def check_folder_per_file(folder_path, stats):
+    """Checks each file with its own pooled ExifTool request, spread over the worker pool."""
+    media_entries = scan_media_files(folder_path, CHECK_EXTENSIONS, recursive=CHECK_RECURSIVE,
+                                     include_globs=CHECK_INCLUDE_GLOBS, exclude_globs=CHECK_EXCLUDE_GLOBS)
+
+    # Files are spread across the persistent ExifTool workers as the scan streams them in;
+    # only a few requests per worker are queued at a time and results keep listing order
+    with ThreadPoolExecutor(max_workers=EXIFTOOL_POOL_SIZE) as executor:
+        pending = collections.deque()
+        for entry, relative_path in media_entries:
+            pending.append((relative_path, executor.submit(get_file_metadata_status, entry.path)))
+            if len(pending) > EXIFTOOL_POOL_SIZE * 4:
+                filename, status_future = pending.popleft()
+                report_file_status(stats, filename, status_future.result())
+        while pending:
+            filename, status_future = pending.popleft()
+            report_file_status(stats, filename, status_future.result())
+
+async def _check_media_entries_async(pool, media_entries, stats):
+    keyed_requests = ((relative_path, _per_file_read_args(entry.path)) for entry, relative_path in media_entries)
+    async for filename, result in pool.iter_completed(keyed_requests):
+        report_file_status(stats, filename, metadata_status_from_result(result))
+
+def check_folder_async(folder_path, stats):
+    """
+    Checks each file with its own ExifTool request on the asyncio driver. The scan runs in a
+    helper thread and is only advanced while fewer than ASYNC_MAX_IN_FLIGHT requests are
+    outstanding; results are reported in completion order, not listing order.
+    """
+    media_entries = scan_media_files(folder_path, CHECK_EXTENSIONS, recursive=CHECK_RECURSIVE,
+                                     include_globs=CHECK_INCLUDE_GLOBS, exclude_globs=CHECK_EXCLUDE_GLOBS)
+    bridge = get_shared_bridge(EXIFTOOL_EXECUTABLE, EXIFTOOL_POOL_SIZE, ASYNC_MAX_IN_FLIGHT)
+    bridge.run(_check_media_entries_async(bridge.pool, media_entries, stats))
+
+def report_file_status(stats, filename, status):
+    """Prints the result of one file and adds it to the summary counters."""
+    stats["total_files_scanned"] += 1
+    if status['error_message']:
+        print(f"-> {filename}: ERROR - {status['error_message']}")
+        stats["files_with_errors"] += 1
+    else:
+        found_count = status['found_count']
+        stats["tags_found_counts"][found_count] += 1
+        if status['missing_tags']:
+            print(f"-> {filename}: Found {found_count}/{len(TAGS_TO_CHECK_CONFIG)} tags. Missing: {', '.join(status['missing_tags'])}")
+        else:
+            print(f"-> {filename}: All {len(TAGS_TO_CHECK_CONFIG)} required tags present.")
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Reports which photo/video files have the date metadata tags set.",
+        epilog="Without folders the script asks for one interactively. Several folders share one ExifTool pool."
+    )
+    parser.add_argument("folders", nargs="*", metavar="FOLDER", help="folder(s) to check")
+    parser.add_argument("--mode", choices=CHECK_MODES, default=CHECK_MODE, help=f"how tags are read (default: {CHECK_MODE})")
+    parser.add_argument("--recursive", action="store_true", default=CHECK_RECURSIVE, help="also check files in subfolders")
+    parser.add_argument("--include", action="append", default=list(CHECK_INCLUDE_GLOBS), metavar="GLOB", help="only check files matching this glob (repeatable)")
+    parser.add_argument("--exclude", action="append", default=list(CHECK_EXCLUDE_GLOBS), metavar="GLOB", help="skip files and folders matching this glob (repeatable)")
+    parser.add_argument("--exiftool", metavar="PATH", help=f"ExifTool executable (default: ${EXIFTOOL_ENV_VAR}, cached location, PATH)")
+    parser.add_argument("--pool-size", type=int, default=EXIFTOOL_POOL_SIZE, help=f"persistent ExifTool processes (default: {EXIFTOOL_POOL_SIZE})")
+    parser.add_argument("--max-in-flight", type=int, default=ASYNC_MAX_IN_FLIGHT, help=f"outstanding ExifTool requests in async mode (default: {ASYNC_MAX_IN_FLIGHT})")
+    parser.add_argument("--reader-threads", type=int, default=NATIVE_READER_THREADS, help=f"threads for the native reader (default: {NATIVE_READER_THREADS})")
+    parser.add_argument("--batch-size", type=int, default=FALLBACK_CHUNK_SIZE, help=f"files per ExifTool request in native mode (default: {FALLBACK_CHUNK_SIZE})")
+    parser.add_argument("--output-format", choices=("text", "json"), default="text", help="format of the final summary (default: text)")
+    return parser.parse_args(argv)
+
+def apply_arguments(args):
+    """Overrides the module configuration with the command-line options."""
+    global CHECK_MODE, CHECK_RECURSIVE, CHECK_INCLUDE_GLOBS, CHECK_EXCLUDE_GLOBS, EXIFTOOL_POOL_SIZE, ASYNC_MAX_IN_FLIGHT, NATIVE_READER_THREADS, FALLBACK_CHUNK_SIZE
+    CHECK_MODE = args.mode
+    CHECK_RECURSIVE = args.recursive
+    CHECK_INCLUDE_GLOBS = args.include
+    CHECK_EXCLUDE_GLOBS = args.exclude
+    EXIFTOOL_POOL_SIZE = max(1, args.pool_size)
+    ASYNC_MAX_IN_FLIGHT = max(1, args.max_in_flight)
+    NATIVE_READER_THREADS = max(1, args.reader_threads)
+    FALLBACK_CHUNK_SIZE = max(1, args.batch_size)
+
+def check_folder(folder_path, output_format="text"):
+    """Checks one folder with the configured CHECK_MODE. Returns the stats dictionary, or None on error."""
     if not os.path.isdir(folder_path):
         print(f"Error: Folder not found at '{folder_path}'")
-        return
+        return None
 
-    print(f"\nChecking JPEG files in '{folder_path}' for metadata fields: {', '.join(TAGS_TO_CHECK_CONFIG.values())}...")
+    print(f"\nChecking media files in '{folder_path}' ({CHECK_MODE} mode) for metadata fields: {', '.join(TAGS_TO_CHECK_CONFIG.values())}...")
     
     stats = {
         "total_files_scanned": 0,
@@ -145,40 +372,55 @@ def main():
         "tags_found_counts": {i: 0 for i in range(len(TAGS_TO_CHECK_CONFIG) + 1)} # Counts for 0, 1, 2, 3 tags
     }
 
-    jpeg_files_found = 0
-    for filename in os.listdir(folder_path):
-        if filename.lower().endswith(('.jpg', '.jpeg')):
-            jpeg_files_found +=1
-            stats["total_files_scanned"] += 1
-            file_path = os.path.join(folder_path, filename)
-            
-            status = get_file_metadata_status(file_path)
-            
-            if status['error_message']:
-                print(f"-> {filename}: ERROR - {status['error_message']}")
-                stats["files_with_errors"] += 1
-            else:
-                found_count = status['found_count']
-                stats["tags_found_counts"][found_count] += 1
-                if status['missing_tags']:
-                    print(f"-> {filename}: Found {found_count}/{len(TAGS_TO_CHECK_CONFIG)} tags. Missing: {', '.join(status['missing_tags'])}")
-                else:
-                    print(f"-> {filename}: All {len(TAGS_TO_CHECK_CONFIG)} required tags present.")
+    if CHECK_MODE == "native":
+        check_folder_native(folder_path, stats)
+    elif CHECK_MODE == "bulk":
+        check_folder_bulk(folder_path, stats)
+    elif CHECK_MODE == "async":
+        check_folder_async(folder_path, stats)
+    else:
+        check_folder_per_file(folder_path, stats)
+    files_found = stats["total_files_scanned"]
     
-    if jpeg_files_found == 0:
-        print("\nNo JPEG files found in the specified directory.")
-        return
+    if output_format == "json":
+        return stats
+    if files_found == 0:
+        print("\nNo supported media files found in the specified directory.")
+        return stats
 
     print("\n--- Metadata Check Summary ---")
-    print(f"Total JPEG files scanned: {stats['total_files_scanned']}")
+    print(f"Total media files scanned: {stats['total_files_scanned']}")
     print(f"Files with all {len(TAGS_TO_CHECK_CONFIG)} required tags: {stats['tags_found_counts'][len(TAGS_TO_CHECK_CONFIG)]}")
     for i in range(len(TAGS_TO_CHECK_CONFIG) -1, -1, -1): # Print for 2, 1, 0 tags found
         print(f"Files with exactly {i} required tag(s): {stats['tags_found_counts'][i]}")
     if stats["files_with_errors"] > 0:
         print(f"Files that encountered processing errors: {stats['files_with_errors']}")
-    
-    # For very large numbers of files, ExifTool's -stay_open option can significantly speed up processing.
-    # This script calls ExifTool once per file for simplicity.
+    return stats
+
+def run(args):
+    """Checks the folders of parsed command-line arguments. Returns the stats per folder (None for folders that failed)."""
+    find_and_set_exiftool_path(args.exiftool) # Find and set ExifTool path at the start
+    print("ExifTool check passed, proceeding with metadata check...\n" if EXIFTOOL_EXECUTABLE else "")
+
+    folder_paths = args.folders or [input("Enter folder path to check for photos/videos: ").strip()]
+    results = {}
+    for folder_path in folder_paths:
+        results[folder_path] = check_folder(folder_path, args.output_format)
+    return results
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    apply_arguments(args)
+
+    if args.output_format == "json":
+        # stdout carries only the JSON document; the per-file lines and messages go to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run(args)
+        print(json.dumps({'mode': CHECK_MODE, 'tags': list(TAGS_TO_CHECK_CONFIG.values()), 'folders': results}, indent=2))
+    else:
+        results = run(args)
+    if any(stats is None for stats in results.values()):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,10 +1,39 @@
 import os
 import re
 import shutil
-import subprocess
-import tempfile
 import json
+import sys
+import time
+import argparse
+import queue
+import asyncio
+import functools
+import itertools
+import contextlib
+import collections
+import threading
+import multiprocessing
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np # Optional: vectorized bulk filename parsing
+except ImportError:
+    np = None
+
+from date_matcher import DatePattern, DatePatternMatcher, load_cached_matcher, pattern_cache_key, save_cached_matcher, tokenize_format_string
+from file_scanner import SUPPORTED_EXTENSIONS, scan_media_files
+from exif_reader import TAGS_TO_CHECK_CONFIG, UnsupportedFileError, read_date_tags
+from exiftool_session import DEFAULT_POOL_SIZE, ExifToolError, get_shared_pool
+from exiftool_async import DEFAULT_MAX_IN_FLIGHT, get_shared_bridge
+from exiftool_locator import EXIFTOOL_ENV_VAR, ExifToolNotFoundError, locate_exiftool, user_cache_dir
+from run_manifest import MANIFEST_FILENAME, hash_file_contents, open_run_manifest
+from job_state import FILE_STATE_COPIED, FILE_STATE_WRITTEN, JobState
+from destination_index import DestinationNameIndex
+from dedup_index import ContentDedupIndex
+from run_metrics import ProgressReporter, RunMetrics, console_print
+from run_report import REPORT_FORMATS, NoteLog, RunReport
+from run_plan import PlanError, PlanWriter, iter_plan_sources, read_plan_settings
 
 # --- Configuration ---
 EXIFTOOL_EXECUTABLE = None # Will store the full path to exiftool.exe
@@ -12,55 +41,98 @@ DATE_FORMATS_FILE_PATHS = [
     os.path.join("Insights", "date_formats_source.json"), # Primary location
     "date_formats_source.json" # Fallback location
 ]
-SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.heic', '.heif', '.tiff', '.tif', '.mp4', '.mov', '.arw', '.cr2', '.nef', '.orf', '.raf', '.rw2', '.srw')
 DEFAULT_TIME_IF_ONLY_DATE_FOUND = "20:00:00"
+FILENAME_SHAPE_CACHE_SIZE = 4096 # Filename shapes (digits masked) whose matching patterns are remembered (LRU)
+USE_PATTERN_CACHE = True # Cache the tokenized date patterns in the user cache folder (rebuilt when the JSON changes)
+PATTERN_CACHE_FILENAME = "date_patterns_cache.json"
+EXIFTOOL_POOL_SIZE = DEFAULT_POOL_SIZE # Number of persistent ExifTool (-stay_open) processes
+EXIFTOOL_WRITE_CHUNK_SIZE = 500 # Files per ExifTool request when writing dates (one -execute per file)
+EXIFTOOL_WRITE_RETRIES = 1 # Extra passes for files whose write failed (failed files only, one per request)
+RETRY_LOG_FILE_NAMES = 5 # Retried files named in the retry message; the rest are counted
+# How the ExifTool processes are driven:
+#   "threads" - two reader threads per process (exiftool_session.ExifToolPool; default)
+#   "asyncio" - one event loop drives all processes (exiftool_async); cheap with large pool
+#               sizes, e.g. to keep many small requests in flight against network storage.
+#               The write stage submits its batches from the event loop, so up to
+#               EXIFTOOL_MAX_IN_FLIGHT requests are outstanding, independent of thread counts.
+EXIFTOOL_DRIVER = "threads"
+EXIFTOOL_DRIVERS = ("threads", "asyncio")
+EXIFTOOL_MAX_IN_FLIGHT = DEFAULT_MAX_IN_FLIGHT # Write requests outstanding at once with the asyncio driver
+# Source folder scanning
+SCAN_RECURSIVE = False # Also process files in subfolders of the source folder
+SCAN_INCLUDE_GLOBS = [] # If set, only files matching one of these globs (relative path or name) are processed
+SCAN_EXCLUDE_GLOBS = [] # Files and folders matching any of these globs are skipped, e.g. ["*/.thumbnails", "*.tmp.jpg"]
+EDITOR_OWN_DIR_NAMES = ("_output_metadata_edited", "_output_outliers", "_temp_metadata_editor")
+# How files reach ExifTool and the output folders:
+#   "copy"     - copy to the temp folder, rewrite the copy, move it (originals untouched; default)
+#   "reflink"  - copy-on-write clone (Linux FICLONE) instead of a byte copy; falls back to "copy"
+#   "hardlink" - hardlink into the temp folder; ExifTool's rewrite replaces the link, so the
+#                original stays untouched; falls back to "copy" where links are not supported
+#   "inplace"  - no temp copy: ExifTool rewrites the source file (keeping its '<name>_original'
+#                backup) and the file is renamed into the output folder
+# Outside "copy" mode, files without a date match skip the temp folder and go straight to
+# the outliers folder (linked/cloned, or renamed in "inplace" mode).
+TRANSFER_MODE = "copy"
+TRANSFER_MODES = ("copy", "reflink", "hardlink", "inplace")
+# Pipeline stage concurrency: each stage runs in its own workers, connected by bounded queues
+PARSE_WORKERS = 1 # Filename parsing processes (1 = parse inline in the scanning thread)
+PARSE_CHUNK_SIZE = 256 # Filenames handed to a parse process at a time
+COPY_WORKERS = 4 # Threads copying files into the temporary directory
+EXIFTOOL_WRITE_WORKERS = EXIFTOOL_POOL_SIZE # Threads feeding write batches to the ExifTool pool
+PLACE_WORKERS = 2 # Threads moving finished files into the output/outlier folders
+PIPELINE_QUEUE_SIZE = 1000 # Maximum records waiting in front of each stage
+PIPELINE_BATCH_WAIT_SECONDS = 0.5 # Longest a batch waits for more records after its first one arrived
+PLACE_BATCH_SIZE = 50 # Files placed per batch (finished files are recorded in the manifest per batch)
+# Incremental runs: finished files are recorded in a manifest in the output folder and skipped
+# next time as long as their path, size and modification time are unchanged
+USE_RUN_MANIFEST = True
+MANIFEST_HASH_CONTENT = False # Also store a SHA-256 so files whose mtime changed but content did not are still skipped
+# Duplicate content (e.g. "IMG-20240101-WA0001.jpg" and "IMG-20240101-WA0001 (1).jpg"): files are compared
+# by size, then a hash of their first/last 64 KiB, then a full SHA-256; only the first file of each
+# content is copied, written by ExifTool and placed. Later copies are handled per DEDUP_MODE:
+#   None       - no deduplication; every file is processed (default)
+#   "report"   - duplicates are listed and left in the source folder
+#   "hardlink" - duplicates get their own output name as a hardlink to the first file's output
+DEDUP_MODE = None
+DEDUP_MODES = ("report", "hardlink")
+# Files whose date tags (the TAGS_TO_CHECK_CONFIG set of exif_reader.py) already hold the
+# filename's date are not rewritten: before each write batch the current tags are read (JPEG/TIFF
+# natively, other formats with one ExifTool request) and matching files skip ExifTool
+SKIP_IF_CORRECT = False
+DATE_MATCH_TOLERANCE_SECONDS = 1 # Largest difference between a tag and the filename date that still counts as correct
+# Console output and instrumentation
+QUIET = False # Only warnings, errors and the final summary: no per-file or per-chunk lines
+SHOW_PROGRESS = False # Live progress/throughput line on stderr (also shown with QUIET on a terminal)
+METRICS_JSON_PATH = None # If set, counters and timing histograms of the run are written to this JSON file
+REPORT_PATH = None # If set, one row per file (outcome, destination, matched format, ExifTool status) is streamed to this file
+REPORT_FORMAT = None # "jsonl" or "csv"; None picks it from REPORT_PATH's extension
+PLAN_PATH = None # If set, a dry run also writes its plan (destinations, ExifTool arguments, outlier reasons) to this JSONL file
+PLAN_FORMATS_SHOWN = 15 # Matched formats listed in the dry-run summary (all of them are in the plan file)
+NOTES_SHOWN_IN_SUMMARY = 200 # Files with notes/errors listed in the final summary (all of them are counted and in the report)
+PROGRESS_COUNTERS = [('files_found', "found"), ('files_parsed', "parsed"), ('files_staged', "staged"), ('files_written', "written"), ('files_placed', "placed")]
 
 # --- ExifTool Check ---
-def find_and_set_exiftool_path():
+def find_and_set_exiftool_path(explicit_path=None):
     """
     Finds ExifTool executable and sets the global EXIFTOOL_EXECUTABLE path.
-    Search order:
-    1. Script's directory.
-    2. Recursively in subfolders of the script's parent directory.
-    3. System PATH.
+    Search order (see exiftool_locator.locate_exiftool):
+    1. 'explicit_path' (--exiftool) or the EXIFTOOL_PATH environment variable.
+    2. The location cached by an earlier run (path and 'exiftool -ver' in the user cache folder).
+    3. Script's directory, then the system PATH.
+    4. Subfolders of the script's parent directory (depth-limited).
     Exits script if not found.
     """
     global EXIFTOOL_EXECUTABLE
-    script_path = os.path.abspath(__file__)
-    script_dir = os.path.dirname(script_path)
-    exiftool_name = "exiftool.exe" if os.name == 'nt' else "exiftool"
-
-    # 1. Check script's directory
-    local_path_script_dir = os.path.join(script_dir, exiftool_name)
-    if os.path.isfile(local_path_script_dir) and os.access(local_path_script_dir, os.X_OK):
-        EXIFTOOL_EXECUTABLE = local_path_script_dir
-        print(f"ExifTool found in script directory: {EXIFTOOL_EXECUTABLE}")
-        return
-
-    # 2. Check subfolders of the script's parent directory
-    parent_dir = os.path.dirname(script_dir)
-    print(f"Searching for {exiftool_name} in subfolders of: {parent_dir}...")
-    for root, _, files in os.walk(parent_dir):
-        if exiftool_name in files:
-            found_path = os.path.join(root, exiftool_name)
-            if os.access(found_path, os.X_OK):
-                EXIFTOOL_EXECUTABLE = found_path
-                print(f"ExifTool found in subfolder: {EXIFTOOL_EXECUTABLE}")
-                return
-
-    # 3. Check system PATH
-    path_from_which = shutil.which(exiftool_name)
-    if path_from_which:
-        EXIFTOOL_EXECUTABLE = path_from_which
-        print(f"ExifTool found in system PATH: {EXIFTOOL_EXECUTABLE}")
-        return
-
-    print(f"Error: {exiftool_name} not found.")
-    print("Please ensure exiftool.exe is in the script's directory, a subfolder of the project, or in your system PATH.")
-    print("You can download it from https://exiftool.org/")
-    exit(1)
-
-find_and_set_exiftool_path() # Call the function to set the path
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        EXIFTOOL_EXECUTABLE, version, source = locate_exiftool(explicit_path, script_dir)
+    except ExifToolNotFoundError as e:
+        print(f"Error: {e}")
+        print("Please ensure exiftool.exe is in the script's directory, a subfolder of the project, or in your system PATH,")
+        print(f"or point --exiftool / the {EXIFTOOL_ENV_VAR} environment variable at it.")
+        print("You can download it from https://exiftool.org/")
+        exit(1)
+    print(f"ExifTool {version} found ({source}): {EXIFTOOL_EXECUTABLE}")
 
 # --- Date Format Parsing Logic ---
 DATE_COMPONENT_REGEX_MAP = {
@@ -95,20 +167,9 @@ def compile_pattern_from_format_string(format_entry):
     """
     format_str = format_entry.get("format_string", "")
     regex_str_parts = []
-    i = 0
-    while i < len(format_str):
-        matched_token = False
-        for token in SORTED_DATE_TOKENS:
-            if format_str.startswith(token, i):
-                regex_str_parts.append(DATE_COMPONENT_REGEX_MAP[token])
-                i += len(token)
-                matched_token = True
-                break
-        if not matched_token:
-            # Character is not a known token, treat as literal
-            char = format_str[i]
-            regex_str_parts.append(re.escape(char))
-            i += 1
+    for is_token, text in tokenize_format_string(format_str, SORTED_DATE_TOKENS):
+        # Characters that are not a known token are treated as literals
+        regex_str_parts.append(DATE_COMPONENT_REGEX_MAP[text] if is_token else re.escape(text))
     final_regex_str = "".join(regex_str_parts)
     # We want to find this pattern anywhere in the filename stem
     # Add word boundaries or common delimiters if needed, or make it more flexible
@@ -119,8 +180,17 @@ def compile_pattern_from_format_string(format_entry):
         print(f"Warning: Could not compile regex for format '{format_str}': {e}")
         return None
 
+def _date_patterns_cache_path():
+    return os.path.join(user_cache_dir(), PATTERN_CACHE_FILENAME)
+
 def load_date_patterns():
-    """Loads date format patterns from the JSON file."""
+    """
+    Loads date format patterns from the JSON file.
+    Returns a DatePatternMatcher: the list of pattern dicts in JSON order, plus a per-stem prefilter.
+    The tokenized patterns and prefilter data are cached on disk, keyed by a hash of the JSON
+    file; while the file is unchanged, nothing is re-tokenized and each regex is only compiled
+    the first time a filename needs it.
+    """
     patterns = []
     loaded_path = None
     for file_path in DATE_FORMATS_FILE_PATHS:
@@ -133,15 +203,12 @@ def load_date_patterns():
                 abs_file_path = file_path
 
             if os.path.exists(abs_file_path):
-                with open(abs_file_path, 'r', encoding='utf-8') as f:
-                    format_entries = json.load(f)
+                with open(abs_file_path, 'rb') as f:
+                    format_file_bytes = f.read()
                 loaded_path = abs_file_path
                 break # Found and loaded a file
         except FileNotFoundError:
             continue
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from {abs_file_path}: {e}")
-            return [] # Critical error, return empty
         except Exception as e:
             print(f"Error loading date formats from {abs_file_path}: {e}")
             return []
@@ -150,17 +217,38 @@ def load_date_patterns():
         print(f"Warning: Date formats JSON file not found at expected locations: {DATE_FORMATS_FILE_PATHS}")
         return []
 
+    cache_key = pattern_cache_key(format_file_bytes, DATE_COMPONENT_REGEX_MAP)
+    if USE_PATTERN_CACHE:
+        cached_matcher = load_cached_matcher(_date_patterns_cache_path(), cache_key, DATE_COMPONENT_REGEX_MAP, FILENAME_SHAPE_CACHE_SIZE)
+        if cached_matcher is not None:
+            print(f"Loaded {len(cached_matcher)} date patterns from cache (source: {loaded_path}).")
+            return cached_matcher
+
+    try:
+        format_entries = json.loads(format_file_bytes.decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        print(f"Error decoding JSON from {loaded_path}: {e}")
+        return [] # Critical error, return empty
+
     print(f"Loading date patterns from: {loaded_path}")
     for entry in format_entries:
         compiled_regex = compile_pattern_from_format_string(entry)
         if compiled_regex:
-            patterns.append({
+            patterns.append(DatePattern({
                 "regex": compiled_regex,
+                "regex_source": compiled_regex.pattern,
                 "original_format": entry.get("format_string", "N/A"),
                 "type": entry.get("type", "N/A")
-            })
+            }))
     print(f"Loaded {len(patterns)} date patterns.")
-    return patterns
+    matcher = DatePatternMatcher(patterns, DATE_COMPONENT_REGEX_MAP, FILENAME_SHAPE_CACHE_SIZE)
+    if USE_PATTERN_CACHE:
+        try:
+            os.makedirs(user_cache_dir(), exist_ok=True)
+        except OSError:
+            pass
+        save_cached_matcher(_date_patterns_cache_path(), cache_key, matcher)
+    return matcher
 
 def extract_datetime_from_filename(filename_stem, date_patterns):
     """
@@ -168,7 +256,11 @@ def extract_datetime_from_filename(filename_stem, date_patterns):
     using the loaded date patterns.
     Returns a dictionary with 'year', 'month', 'day', 'hour', 'minute', 'second'
     or None if no pattern matches.
+    With a DatePatternMatcher, only the patterns that can match the stem's shape are tried
+    (remembered per filename shape); a plain list of patterns is scanned in full.
     """
+    if isinstance(date_patterns, DatePatternMatcher):
+        date_patterns = date_patterns.patterns_for(filename_stem)
     for pattern_info in date_patterns:
         match = pattern_info["regex"].search(filename_stem)
         if match:
@@ -224,320 +316,1747 @@ def extract_datetime_from_filename(filename_stem, date_patterns):
                     continue # Invalid date components, try next pattern
     return None
 
+# --- Bulk Filename Parsing ---
+BULK_RESULT_COLUMNS = ('year', 'month', 'day', 'hour', 'minute', 'second')
+DAYS_IN_MONTH_TABLE = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64) if np is not None else None
+
+def _parse_shape_group_vectorized(digit_values, representative, candidate_patterns, pattern_indexes):
+    """
+    Parses a group of stems that share one filename shape. 'digit_values' holds one row per stem:
+    its code points minus ord('0'), so digit characters are their values.
+    Every stem of a shape matches a pattern at the same positions as 'representative' (see
+    date_matcher.filename_shape), so each pattern is run once, on the representative, and its
+    group spans are sliced out of all rows at once. Rows that fail date validation fall through
+    to the next pattern, as in the scalar loop. Returns (columns, format_index, valid) arrays.
+    """
+    row_count = len(digit_values)
+    columns = {name: np.zeros(row_count, dtype=np.int32) for name in BULK_RESULT_COLUMNS}
+    format_index = np.full(row_count, -1, dtype=np.int32)
+    unresolved = np.ones(row_count, dtype=bool)
+    default_hour, default_minute, default_second = (int(part) for part in DEFAULT_TIME_IF_ONLY_DATE_FOUND.split(':'))
+
+    def digits(match, group_name):
+        start, end = match.span(group_name)
+        powers = 10 ** np.arange(end - start - 1, -1, -1, dtype=np.int64)
+        return digit_values[:, start:end] @ powers
+
+    for pattern_info in candidate_patterns:
+        match = pattern_info["regex"].search(representative)
+        if match is None:
+            continue
+        groups = pattern_info["regex"].groupindex
+        if 'year' in groups:
+            year = digits(match, 'year')
+        else:
+            short_year = digits(match, 'shortyear')
+            year = np.where(short_year < 70, 2000 + short_year, 1900 + short_year)
+        month = digits(match, 'month')
+        day = digits(match, 'day')
+        if 'hour12' in groups and 'ampm' in groups:
+            hour12 = digits(match, 'hour12')
+            if match.group('ampm').lower() == 'pm':
+                hour = np.where(hour12 != 12, hour12 + 12, hour12)
+            else:
+                hour = np.where(hour12 == 12, 0, hour12)
+        elif 'hour' in groups:
+            hour = digits(match, 'hour')
+        else:
+            hour = None
+        if hour is None: # No time in the name: the default time replaces minute and second as well
+            hour = np.full(row_count, default_hour, dtype=np.int64)
+            minute = np.full(row_count, default_minute, dtype=np.int64)
+            second = np.full(row_count, default_second, dtype=np.int64)
+        else:
+            minute = digits(match, 'minute') if 'minute' in groups else np.zeros(row_count, dtype=np.int64)
+            second = digits(match, 'second') if 'second' in groups else np.zeros(row_count, dtype=np.int64)
+
+        # The checks datetime() applies in the scalar parser, on whole columns
+        is_leap_year = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+        month_in_range = (month >= 1) & (month <= 12)
+        days_in_month = DAYS_IN_MONTH_TABLE[np.clip(month, 0, 12)] + ((month == 2) & is_leap_year)
+        valid = (unresolved & (year >= 1) & month_in_range & (day >= 1) & (day <= days_in_month)
+                 & (hour < 24) & (minute < 60) & (second < 60))
+        if valid.any():
+            for name, values in zip(BULK_RESULT_COLUMNS, (year, month, day, hour, minute, second)):
+                columns[name][valid] = values[valid]
+            format_index[valid] = pattern_indexes[id(pattern_info)]
+            unresolved &= ~valid
+            if not unresolved.any():
+                break
+    return columns, format_index, ~unresolved
+
+def parse_filename_stems_bulk(filename_stems, date_patterns):
+    """
+    Batch version of extract_datetime_from_filename() for large name lists (listings, CSVs).
+    Returns columnar results: {'year', 'month', 'day', 'hour', 'minute', 'second': int arrays,
+    'format_index': index into 'date_patterns' of the matched format (-1 if none), 'valid': bool mask}.
+    Values are those of the scalar function, as integers (e.g. month "07" -> 7).
+
+    With NumPy installed and a DatePatternMatcher, stems are grouped by length and by filename
+    shape with array operations, and every shape group is parsed and validated as a whole (see
+    _parse_shape_group_vectorized); the columns are NumPy arrays. Without NumPy the scalar parser
+    runs per stem and the columns are plain lists. Non-ASCII stems always use the scalar parser,
+    as int() accepts non-ASCII digits that code point arithmetic does not.
+    """
+    filename_stems = list(filename_stems)
+    row_count = len(filename_stems)
+    format_indexes = {}
+    for index, pattern_info in enumerate(date_patterns):
+        format_indexes.setdefault(pattern_info["original_format"], index)
+
+    vectorized = np is not None and isinstance(date_patterns, DatePatternMatcher)
+    if vectorized:
+        columns = {name: np.zeros(row_count, dtype=np.int32) for name in BULK_RESULT_COLUMNS}
+        format_index = np.full(row_count, -1, dtype=np.int32)
+        valid = np.zeros(row_count, dtype=bool)
+    else:
+        columns = {name: [0] * row_count for name in BULK_RESULT_COLUMNS}
+        format_index = [-1] * row_count
+        valid = [False] * row_count
+
+    def parse_scalar(rows):
+        for row in rows:
+            dt_info = extract_datetime_from_filename(filename_stems[row], date_patterns)
+            if dt_info:
+                for name in BULK_RESULT_COLUMNS:
+                    columns[name][row] = int(dt_info[name])
+                format_index[row] = format_indexes[dt_info['matched_format']]
+                valid[row] = True
+
+    if not vectorized:
+        parse_scalar(range(row_count))
+        return dict(columns, format_index=format_index, valid=valid)
+
+    pattern_indexes = {id(pattern_info): index for index, pattern_info in enumerate(date_patterns)}
+    rows_by_length = {}
+    for row, filename_stem in enumerate(filename_stems):
+        rows_by_length.setdefault(len(filename_stem), []).append(row)
+    for stem_length, length_rows in rows_by_length.items():
+        if stem_length == 0:
+            parse_scalar(length_rows)
+            continue
+        length_rows = np.array(length_rows, dtype=np.int64)
+        codes = np.array([filename_stems[row] for row in length_rows], dtype=f"<U{stem_length}").view(np.uint32).reshape(-1, stem_length)
+        non_ascii = (codes >= 128).any(axis=1)
+        if non_ascii.any():
+            parse_scalar(length_rows[non_ascii].tolist())
+            length_rows, codes = length_rows[~non_ascii], codes[~non_ascii]
+        # filename_shape() on whole arrays: digits masked, letters lower-cased
+        is_digit = (codes >= 48) & (codes <= 57)
+        is_upper = (codes >= 65) & (codes <= 90)
+        shapes = np.where(is_digit, 0, codes + 32 * is_upper).astype(np.uint32)
+        shape_keys = np.ascontiguousarray(shapes).view(np.dtype((np.void, 4 * stem_length))).ravel()
+        _, first_rows, shape_ids = np.unique(shape_keys, return_index=True, return_inverse=True)
+        shape_ids = shape_ids.ravel()
+        rows_in_shape_order = np.argsort(shape_ids, kind='stable')
+        shape_sizes = np.bincount(shape_ids)
+        shape_ends = np.cumsum(shape_sizes)
+        digit_values = codes.astype(np.int64) - 48
+        for shape_id, shape_end in enumerate(shape_ends):
+            representative = filename_stems[length_rows[first_rows[shape_id]]]
+            candidate_patterns = date_patterns.patterns_for(representative)
+            if not candidate_patterns:
+                continue
+            group = rows_in_shape_order[shape_end - shape_sizes[shape_id]:shape_end]
+            group_columns, group_format_index, group_valid = _parse_shape_group_vectorized(
+                digit_values[group], representative, candidate_patterns, pattern_indexes
+            )
+            target_rows = length_rows[group]
+            for name in BULK_RESULT_COLUMNS:
+                columns[name][target_rows] = group_columns[name]
+            format_index[target_rows] = group_format_index
+            valid[target_rows] = group_valid
+    return dict(columns, format_index=format_index, valid=valid)
+
 # --- ExifTool Runner (ENHANCED DIAGNOSTIC VERSION) ---
-def run_exiftool_batch(files_to_update_with_commands):
+# Matches "N image files updated", "N video files updated", "N files updated", ...
+EXIFTOOL_UPDATED_COUNT_REGEX = re.compile(r"(\d+)\s+(?:(?:image|video|media|file)(?:s)?(?:\s+file(?:s)?)?|files?)\s+updated", re.IGNORECASE)
+EXIFTOOL_UNCHANGED_COUNT_REGEX = re.compile(r"(\d+)\s+(?:image|video|media)?\s*files?\s+unchanged", re.IGNORECASE)
+# Per-file end marker echoed to stdout (-echo3) and stderr (-echo4) after each file's command
+EXIFTOOL_FILE_MARKER_PREFIX = "=== metadata_editor file"
+EXIFTOOL_FILE_MARKER_REGEX = re.compile(r"^=== metadata_editor file (\d+) ===[ \t]*\r?$", re.MULTILINE)
+
+def build_per_file_write_args(files_with_commands):
+    """
+    Builds one ExifTool argument stream that writes every file with its own arguments.
+    Files are separated by '-execute', so ExifTool handles each one as an independent
+    command inside the same process instead of needing one process (or one -@ list) per date.
+    Each command echoes a numbered marker to stdout and stderr once the file is done, so
+    both streams can be attributed to the exact file that produced them.
+    """
+    args = []
+    for index, (filepath, commands) in enumerate(files_with_commands):
+        if index:
+            args.append('-execute')
+        marker = f"{EXIFTOOL_FILE_MARKER_PREFIX} {index} ==="
+        args.append('-S')
+        args.extend(commands)
+        args.extend(['-echo3', marker, '-echo4', marker, filepath])
+    return args
+
+def _split_output_by_file_marker(output):
+    """Returns {file_index: output_text} using the markers placed by build_per_file_write_args."""
+    sections = {}
+    section_start = 0
+    for marker_match in EXIFTOOL_FILE_MARKER_REGEX.finditer(output):
+        # Drop the '{ready}' acknowledgement that precedes the next file's output on stdout
+        section = output[section_start:marker_match.start()]
+        sections[int(marker_match.group(1))] = re.sub(r"^\{ready\}[ \t]*\r?$", "", section, flags=re.MULTILINE).strip()
+        section_start = marker_match.end()
+    return sections
+
+def parse_exiftool_write_result(stdout_section, stderr_section):
+    """
+    Decides the outcome of one file's write command from its own stdout/stderr sections.
+    Returns {'status': 'updated'|'unchanged'|'failed', 'message': str|None}.
+    """
+    updated_match = EXIFTOOL_UPDATED_COUNT_REGEX.search(stdout_section)
+    error_lines = [line.strip() for line in stderr_section.splitlines() if line.lstrip().lower().startswith("error")]
+    if updated_match and int(updated_match.group(1)) > 0 and not error_lines:
+        return {'status': 'updated', 'message': None}
+    if error_lines:
+        return {'status': 'failed', 'message': error_lines[0]}
+    unchanged_match = EXIFTOOL_UNCHANGED_COUNT_REGEX.search(stdout_section)
+    if unchanged_match and int(unchanged_match.group(1)) > 0:
+        warning = next((line.strip() for line in stderr_section.splitlines() if line.strip()), None)
+        return {'status': 'unchanged', 'message': warning or "ExifTool left the file unchanged"}
+    details = " ".join((stdout_section + " " + stderr_section).split())
+    return {'status': 'failed', 'message': details or "No result reported by ExifTool"}
+
+_write_chunk_numbers = itertools.count(1) # Run-wide, so chunk logs from concurrent pipeline batches never share a number
+
+def _run_exiftool_write_chunk(pool, chunk_title, files_with_commands):
+    """
+    Sends one chunk of per-file write commands to the shared ExifTool pool as a single request.
+    Returns {filepath: {'status': ..., 'message': ...}} for every file in the chunk.
+    """
+    try:
+        result = pool.execute(build_per_file_write_args(files_with_commands))
+    except Exception as e:
+        result = e
+    return _chunk_write_results(chunk_title, files_with_commands, result)
+
+def _chunk_write_results(chunk_title, files_with_commands, result):
+    """
+    Splits the outcome of one chunk's request ('result': the pool's execute() dict, or the
+    exception the request failed with) into per-file results.
+    Output is collected into a single block and printed at the end so that
+    concurrently running chunks do not interleave their diagnostics.
+    """
+    log_lines = [f"\n--- Processing {chunk_title} ({len(files_with_commands)} file(s)) ---"]
+    file_results = {}
+    has_problems = False # Chunks with failures are logged even in QUIET mode
+    try:
+        if isinstance(result, Exception):
+            raise result
+        stdout_sections = _split_output_by_file_marker(result['stdout'])
+        stderr_sections = _split_output_by_file_marker(result['stderr'])
+
+        for index, (filepath, _) in enumerate(files_with_commands):
+            if index not in stdout_sections:
+                file_results[filepath] = {'status': 'failed', 'message': "No per-file result marker in ExifTool output"}
+            else:
+                file_results[filepath] = parse_exiftool_write_result(stdout_sections[index], stderr_sections.get(index, ""))
+            if file_results[filepath]['status'] != 'updated':
+                has_problems = True
+                log_lines.append(f"  Not updated: {os.path.basename(filepath)} ({file_results[filepath]['message']})")
+
+        # Check for specific Perl DLL error
+        if "perl5" in result['stderr'] and ".dll" in result['stderr']:
+            has_problems = True
+            log_lines.append(f"  Warning: Potential Perl DLL issue: {result['stderr'].strip().splitlines()[0]}")
+        updated_count = sum(1 for file_result in file_results.values() if file_result['status'] == 'updated')
+        log_lines.append(f"  ExifTool updated {updated_count}/{len(files_with_commands)} file(s) in this chunk.")
+
+    except ExifToolError as e:
+        has_problems = True
+        log_lines.append(f"  ExifTool worker failure during chunk processing: {e}")
+        file_results = {filepath: {'status': 'failed', 'message': f"ExifTool worker failure: {e}"} for filepath, _ in files_with_commands}
+    except Exception as e:
+        has_problems = True
+        log_lines.append(f"  An unexpected error occurred during ExifTool chunk processing: {e}")
+        file_results = {filepath: {'status': 'failed', 'message': f"Unexpected error: {e}"} for filepath, _ in files_with_commands}
+    log_lines.append("--- End Chunk ---")
+    if has_problems or not QUIET:
+        console_print("\n".join(log_lines))
+    return file_results
+
+_write_chunk_executor = None # Dispatches the chunks of multi-chunk writes; created once and kept for the run
+_write_chunk_executor_size = 0
+_write_chunk_executor_lock = threading.Lock()
+
+def _get_write_chunk_executor(size):
+    global _write_chunk_executor, _write_chunk_executor_size
+    with _write_chunk_executor_lock:
+        if _write_chunk_executor is None or _write_chunk_executor_size != size:
+            if _write_chunk_executor is not None:
+                _write_chunk_executor.shutdown(wait=False)
+            _write_chunk_executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="exiftool-write")
+            _write_chunk_executor_size = size
+        return _write_chunk_executor
+
+def _run_exiftool_write_chunks(pool, files_to_update_with_commands, chunk_size, retry_label=None):
+    chunks = [files_to_update_with_commands[i:i + chunk_size] for i in range(0, len(files_to_update_with_commands), chunk_size)]
+    chunk_titles = [f"Write Chunk {next(_write_chunk_numbers)}" + (f", {retry_label}" if retry_label else "") for _ in chunks]
+    if len(chunks) == 1: # The pipeline's write stage sends each batch as one chunk: run it on the calling thread
+        return _run_exiftool_write_chunk(pool, chunk_titles[0], chunks[0])
+    executor = _get_write_chunk_executor(pool.size)
+    futures = [executor.submit(_run_exiftool_write_chunk, pool, chunk_title, chunk) for chunk_title, chunk in zip(chunk_titles, chunks)]
+    file_results = {}
+    for future in futures:
+        file_results.update(future.result())
+    return file_results
+
+def get_exiftool_pool():
+    """The shared ExifTool pool of the configured EXIFTOOL_DRIVER; both offer the same execute() API."""
+    if EXIFTOOL_DRIVER == "asyncio":
+        return get_shared_bridge(EXIFTOOL_EXECUTABLE, EXIFTOOL_POOL_SIZE, EXIFTOOL_MAX_IN_FLIGHT)
+    return get_shared_pool(EXIFTOOL_EXECUTABLE, EXIFTOOL_POOL_SIZE)
+
+def write_metadata_per_file(files_to_update_with_commands, pool=None, chunk_size=None, retries=None):
+    """
+    Writes metadata with ExifTool and reports the outcome of every file individually.
+    files_to_update_with_commands is a list of tuples: (filepath, list_of_exiftool_args)
+    Every file keeps its own arguments (e.g. its own -DateTimeOriginal value); files are sent
+    in chunks of 'chunk_size' per ExifTool request, with one '-execute' per file, and chunks
+    are dispatched concurrently to the persistent ExifTool pool.
+    Files that failed are retried on their own ('retries' extra passes, one file per request),
+    so a partial failure never requires the whole set to be rewritten.
+    Returns {filepath: {'status': 'updated'|'unchanged'|'failed', 'message': str|None}}.
+    """
+    if not files_to_update_with_commands:
+        return {}
+    if EXIFTOOL_EXECUTABLE is None and pool is None:
+        print("Critical Error: EXIFTOOL_EXECUTABLE path not set before running batch (call find_and_set_exiftool_path() first).")
+        return {filepath: {'status': 'failed', 'message': "ExifTool path not set"} for filepath, _ in files_to_update_with_commands}
+    if pool is None:
+        pool = get_exiftool_pool()
+    chunk_size = max(1, chunk_size or EXIFTOOL_WRITE_CHUNK_SIZE)
+    retries = EXIFTOOL_WRITE_RETRIES if retries is None else retries
+
+    file_results = _run_exiftool_write_chunks(pool, files_to_update_with_commands, chunk_size)
+    _retry_failed_writes(pool, files_to_update_with_commands, file_results, retries)
+    return file_results
+
+def _retry_failed_writes(pool, files_to_update_with_commands, file_results, retries):
+    """Resends the files that failed in 'file_results' on their own, up to 'retries' passes, updating it in place."""
+    retried_paths = [filepath for filepath, _ in files_to_update_with_commands if file_results[filepath]['status'] == 'failed']
+    for retry_number in range(1, retries + 1):
+        failed_operations = [(filepath, commands) for filepath, commands in files_to_update_with_commands
+                             if file_results[filepath]['status'] == 'failed']
+        if not failed_operations:
+            break
+        file_results.update(_run_exiftool_write_chunks(pool, failed_operations, 1, retry_label=f"retry {retry_number}/{retries}"))
+    if retries and retried_paths:
+        # One message per call (i.e. per pipeline batch), naming the files it concerns
+        still_failed_count = sum(1 for filepath in retried_paths if file_results[filepath]['status'] == 'failed')
+        console_print(f"Retried {len(retried_paths)} failed file(s) on their own ({_file_names_text(retried_paths)}): "
+                      f"{len(retried_paths) - still_failed_count} recovered, {still_failed_count} still failed.")
+
+def _file_names_text(filepaths, limit=RETRY_LOG_FILE_NAMES):
+    names = ", ".join(os.path.basename(filepath) for filepath in filepaths[:limit])
+    return names + (f" and {len(filepaths) - limit} more" if len(filepaths) > limit else "")
+
+def run_exiftool_batch(files_to_update_with_commands, pool=None, chunk_size=None):
     """
     Run exiftool commands on batches of files.
     files_to_update_with_commands is a list of tuples: (filepath, list_of_exiftool_args)
-    This function tries to batch files that have the *exact same* set of commands.
     Returns a set of temporary file paths that were successfully updated by ExifTool.
+    See write_metadata_per_file() for the per-file outcome and failure reasons.
     """
-    if not files_to_update_with_commands:
-        return set() # Return empty set
-    if EXIFTOOL_EXECUTABLE is None:
-        print("Critical Error: EXIFTOOL_EXECUTABLE path not set before running batch.")
-        return set() # Return empty set
-
-    # Group files by their command list (as a tuple to be hashable)
-    command_groups = {}
-    for filepath, commands in files_to_update_with_commands:
-        command_tuple = tuple(commands)
-        if command_tuple not in command_groups:
-            command_groups[command_tuple] = []
-        command_groups[command_tuple].append(filepath)
-
-    successfully_updated_temp_paths = set() # Initialize set for successful updates
-    processed_batch_count = 0
-    exiftool_dir = os.path.dirname(EXIFTOOL_EXECUTABLE) # Get ExifTool's directory
-
-    for commands_tuple, filepaths_in_batch in command_groups.items(): # Renamed filepaths to filepaths_in_batch
-        processed_batch_count += 1
-        if not filepaths_in_batch:
+    file_results = write_metadata_per_file(files_to_update_with_commands, pool=pool, chunk_size=chunk_size)
+    return {filepath for filepath, file_result in file_results.items() if file_result['status'] == 'updated'}
+
+# --- File Transfer ---
+FICLONE = 0x40049409 # Linux ioctl request number for a copy-on-write clone (btrfs, XFS, ...)
+
+def reflink_file(src_path, dst_path):
+    """Creates dst_path as a copy-on-write clone of src_path. Raises OSError if unsupported."""
+    import fcntl # POSIX only; imported lazily so the module still loads on Windows
+    with open(src_path, 'rb') as src_file, open(dst_path, 'wb') as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        except OSError:
+            dst_file.close()
+            os.unlink(dst_path)
+            raise
+    shutil.copystat(src_path, dst_path)
+
+def transfer_file(src_path, dst_path, method):
+    """
+    Makes the file at src_path available at dst_path using 'method'
+    ("copy", "reflink", "hardlink", "move" or "rename").
+    Clone/link methods fall back to a plain copy where the filesystem does not support them,
+    and "rename" falls back to a move across filesystems.
+    Returns the method that was actually used.
+    """
+    if method == "reflink":
+        try:
+            reflink_file(src_path, dst_path)
+            return "reflink"
+        except (OSError, ImportError):
+            method = "copy"
+    elif method == "hardlink":
+        try:
+            os.link(src_path, dst_path)
+            return "hardlink"
+        except (OSError, NotImplementedError):
+            method = "copy"
+    elif method == "rename":
+        try:
+            os.rename(src_path, dst_path)
+            return "rename"
+        except OSError:
+            method = "move"
+    if method == "move":
+        shutil.move(src_path, dst_path)
+        return "move"
+    shutil.copy2(src_path, dst_path)
+    return "copy"
+
+def place_file(src_path, dst_path, method):
+    """
+    transfer_file() for the final placement: never replaces an existing file at dst_path, even
+    one created by another process a moment ago, and raises FileExistsError instead.
+    Moves are done as a hardlink followed by removing the source, which creates the name
+    atomically. Where that is not possible (another filesystem, no hardlink support), the name
+    is first claimed with an exclusive create (O_EXCL) and then filled.
+    Returns the method that was actually used.
+    """
+    if method in ("move", "rename", "hardlink"):
+        try:
+            os.link(src_path, dst_path)
+        except FileExistsError:
+            raise
+        except (OSError, NotImplementedError):
+            pass # Claim the name below instead
+        else:
+            if method != "hardlink":
+                os.unlink(src_path)
+            return method
+    os.close(os.open(dst_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)) # Raises FileExistsError if taken
+    try:
+        if method in ("move", "rename"):
+            try:
+                os.replace(src_path, dst_path) # Same filesystem: atomically replaces our empty placeholder
+                return "rename"
+            except OSError:
+                shutil.copy2(src_path, dst_path)
+                os.unlink(src_path)
+                return "move"
+        return transfer_file(src_path, dst_path, "copy" if method == "hardlink" else method)
+    except BaseException:
+        os.unlink(dst_path)
+        raise
+
+# --- Processing Pipeline ---
+_STAGE_DONE = object() # End-of-stream marker passed between pipeline stages
+
+class PipelineStage:
+    """
+    A group of worker threads between two bounded queues.
+    Each worker takes up to 'batch_size' records from the input queue, passes them to
+    'handler' and forwards the records the handler returns to the next stage.
+    Because every queue is bounded, a slow stage throttles the stages before it and the
+    number of in-flight records (and therefore memory use) stays constant.
+    """
+
+    def __init__(self, name, handler, workers=1, batch_size=1, queue_size=None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.input_queue = queue.Queue(maxsize=queue_size or PIPELINE_QUEUE_SIZE)
+        self.next_stage = None
+        self._threads = []
+        self._active_workers = self.workers
+        self._lock = threading.Lock()
+
+    def put(self, record):
+        self.input_queue.put(record)
+
+    def close_input(self):
+        for _ in range(self.workers):
+            self.input_queue.put(_STAGE_DONE)
+
+    def start(self):
+        for worker_number in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"{self.name}-{worker_number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _take_batch(self):
+        record = self.input_queue.get()
+        if record is _STAGE_DONE:
+            return None
+        batch = [record]
+        # One deadline for the whole batch, so a slow trickle of records (large files, network
+        # storage) cannot hold a partial batch back from the next stage for batch_size waits
+        deadline = time.monotonic() + PIPELINE_BATCH_WAIT_SECONDS
+        while len(batch) < self.batch_size:
+            remaining_seconds = deadline - time.monotonic()
+            if remaining_seconds <= 0:
+                break
+            try:
+                record = self.input_queue.get(timeout=remaining_seconds)
+            except queue.Empty:
+                break
+            if record is _STAGE_DONE:
+                self.input_queue.put(_STAGE_DONE) # Leave it for this (or another) worker's next round
+                break
+            batch.append(record)
+        return batch
+
+    def _worker_loop(self):
+        try:
+            while True:
+                batch = self._take_batch()
+                if batch is None:
+                    break
+                try:
+                    forwarded_records = self.handler(batch)
+                except Exception as e:
+                    console_print(f"Error in pipeline stage '{self.name}': {e}")
+                    forwarded_records = []
+                if self.next_stage is not None:
+                    for record in forwarded_records:
+                        self.next_stage.put(record)
+        finally:
+            with self._lock:
+                self._active_workers -= 1
+                is_last_worker = self._active_workers == 0
+            if is_last_worker and self.next_stage is not None:
+                self.next_stage.close_input()
+
+def run_pipeline(source_records, stages):
+    """Chains 'stages', feeds them every record from the 'source_records' iterable and waits for completion."""
+    for stage, next_stage in zip(stages, stages[1:]):
+        stage.next_stage = next_stage
+    for stage in stages:
+        stage.start()
+    try:
+        for record in source_records:
+            stages[0].put(record)
+    finally:
+        stages[0].close_input()
+        for stage in stages:
+            stage.join()
+
+_parse_worker_date_patterns = None # Set in each parse worker process by _init_parse_worker()
+
+def _init_parse_worker(date_patterns):
+    global _parse_worker_date_patterns
+    _parse_worker_date_patterns = date_patterns
+
+def _filename_stem(relative_path):
+    """Stem of the file name only; folder names are never parsed for dates."""
+    return os.path.splitext(relative_path.rsplit('/', 1)[-1])[0]
+
+def _parse_filename_in_worker(relative_path):
+    """Returns (datetime_info, shape cache hits, shape cache misses), so the parent can total the workers' cache statistics."""
+    date_patterns = _parse_worker_date_patterns
+    if not isinstance(date_patterns, DatePatternMatcher):
+        return extract_datetime_from_filename(_filename_stem(relative_path), date_patterns), 0, 0
+    hits, misses = date_patterns.shape_cache_hits, date_patterns.shape_cache_misses
+    datetime_info = extract_datetime_from_filename(_filename_stem(relative_path), date_patterns)
+    return datetime_info, date_patterns.shape_cache_hits - hits, date_patterns.shape_cache_misses - misses
+
+def iter_parsed_filenames(filenames, date_patterns, parse_workers=1, metrics=None):
+    """
+    Yields (filename, datetime_info) for every name in 'filenames', in order.
+    Names may be '/'-separated relative paths; only the last component is parsed.
+    With parse_workers > 1 the regex work is spread over a process pool; names are
+    submitted in fixed-size windows so only a bounded slice of the listing is in flight.
+    Inline parsing is timed per name in 'metrics' (RunMetrics) if given. The shape cache hits
+    and misses of the worker processes are added to the DatePatternMatcher's own counters.
+    """
+    if parse_workers <= 1:
+        for filename in filenames:
+            parse_started = time.perf_counter()
+            datetime_info = extract_datetime_from_filename(_filename_stem(filename), date_patterns)
+            if metrics is not None:
+                metrics.observe('parse', time.perf_counter() - parse_started)
+            yield filename, datetime_info
+        return
+
+    window_size = parse_workers * PARSE_CHUNK_SIZE * 4
+    filenames = iter(filenames)
+    with multiprocessing.Pool(parse_workers, initializer=_init_parse_worker, initargs=(date_patterns,)) as parse_pool:
+        while True:
+            window = list(itertools.islice(filenames, window_size))
+            if not window:
+                break
+            for filename, (datetime_info, hits, misses) in zip(window, parse_pool.imap(_parse_filename_in_worker, window, chunksize=PARSE_CHUNK_SIZE)):
+                if isinstance(date_patterns, DatePatternMatcher):
+                    date_patterns.shape_cache_hits += hits
+                    date_patterns.shape_cache_misses += misses
+                yield filename, datetime_info
+
+class FileRecord:
+    """
+    Per-file state carried through the pipeline stages.
+    __slots__ keeps each record small (no per-instance __dict__) since many are in flight at once.
+    """
+    __slots__ = ('original_filename', 'relative_path', 'src_path', 'temp_path', 'datetime_info', 'placement_method', 'write_result',
+                 'size', 'mtime_ns', 'content_hash', 'destination', 'job_state', 'duplicate_of', 'planned_destination', 'write_args')
+
+    def __init__(self, original_filename, relative_path, src_path, temp_path, datetime_info, size=None, mtime_ns=None):
+        self.original_filename = original_filename
+        self.relative_path = relative_path # '/'-separated path below the source folder, used in logs
+        self.src_path = src_path
+        self.temp_path = temp_path # Working path ExifTool writes to (the source itself in "inplace" mode)
+        self.datetime_info = datetime_info
+        self.placement_method = "move" # How the placement stage brings temp_path to its destination
+        self.write_result = None
+        self.size = size # Source size and mtime at scan time: the file's key in the run manifest
+        self.mtime_ns = mtime_ns
+        self.content_hash = None
+        self.destination = None # Final output/outlier path once placed
+        self.job_state = None # Last checkpointed state (job_state.FILE_STATE_*), None if not yet staged
+        self.duplicate_of = None # Record of the first file with the same content (DEDUP_MODE)
+        self.planned_destination = None # Destination chosen by the plan being applied (--apply-plan), used if still free
+        self.write_args = None # ExifTool arguments from the plan being applied; None = built from datetime_info
+
+    def __repr__(self):
+        return f"FileRecord({self.relative_path!r}, matched={bool(self.datetime_info)})"
+
+def log_file_event(message):
+    """Per-file or per-folder progress message, suppressed in QUIET mode."""
+    if not QUIET:
+        console_print(message)
+
+def _log_skipped(context, filename, reason):
+    context['notes'].add(filename, reason)
+
+def _report_row(context, relative_path, outcome, **fields):
+    """Writes a row for a file without a record (skipped before the pipeline) to the per-file report."""
+    if context['report'] is not None:
+        context['report'].write(dict({'source': context['src_dir'], 'relative_path': relative_path, 'outcome': outcome}, **fields))
+
+def _report_file(context, record, outcome, message=None):
+    """Writes the record's row to the per-file report (REPORT_PATH), if one is open."""
+    report = context['report']
+    if report is None:
+        return
+    dt_info = record.datetime_info
+    write_result = record.write_result
+    report.write({
+        'source': context['src_dir'],
+        'relative_path': record.relative_path,
+        'outcome': outcome,
+        'destination': record.destination,
+        'matched_format': dt_info['matched_format'] if dt_info else None,
+        'datetime': exif_datetime_value(dt_info) if dt_info else None,
+        'write_status': write_result['status'] if write_result else None,
+        'message': message if message is not None else (write_result['message'] if write_result else None)
+    })
+
+def _count(context, counter_name, amount=1):
+    with context['lock']:
+        context['stats'][counter_name] += amount
+
+def _dedup_stage(context, records):
+    """
+    Holds back files whose content equals a file seen earlier in the run (see ContentDedupIndex);
+    they are handled by _place_duplicates() once their first copy has been placed.
+    Files of a resumed job are already staged and are passed on unchanged.
+    """
+    unique_records = []
+    for record in records:
+        if record.job_state is not None:
+            unique_records.append(record)
+            continue
+        try:
+            size = record.size if record.size is not None else os.stat(record.src_path).st_size
+            with context['metrics'].timed('dedup'):
+                first_record = context['dedup_index'].find_duplicate(record.src_path, size, record)
+        except OSError as e:
+            console_print(f"Warning: Could not compare {record.relative_path} for duplicates: {e}")
+            first_record = None
+        if first_record is None:
+            unique_records.append(record)
             continue
-        
-        temp_filename = None
-        print(f"\n--- Processing Batch {processed_batch_count} ---")
-        print(f"Commands: {commands_tuple}")
-        print(f"Files in this batch ({len(filepaths_in_batch)}): {filepaths_in_batch[:3]}..." if len(filepaths_in_batch) > 3 else filepaths_in_batch)
+        record.duplicate_of = first_record
+        _count(context, 'duplicates_found')
+        context['metrics'].count('duplicates_found')
+        log_file_event(f"Duplicate content: {record.relative_path} (same as {first_record.relative_path})")
+        with context['lock']:
+            context['duplicates'].append(record)
+    return unique_records
 
+def _place_duplicates(context):
+    """
+    Handles the duplicates held back by _dedup_stage after the pipeline has finished:
+    reported, or hardlinked next to their first copy's output under a name of their own
+    (the date-based name in the output folder, the original name in the outliers folder).
+    Duplicates are recorded in the run manifest with the first copy's result, so later runs skip them.
+    """
+    for record in context['duplicates']:
+        first_record = record.duplicate_of
+        if first_record.destination is None:
+            _log_skipped(context, record.relative_path, f"Duplicate of {first_record.relative_path}, which was not placed; left in the source folder")
+            _report_file(context, record, "duplicate", f"same content as {first_record.relative_path}, which was not placed")
+            continue
+        record.write_result = first_record.write_result
+        if DEDUP_MODE == "report":
+            record.destination = first_record.destination
+            _log_skipped(context, record.relative_path, f"Duplicate of {first_record.relative_path} (content placed as {os.path.basename(first_record.destination)}); left in the source folder")
+            _report_file(context, record, "duplicate", f"same content as {first_record.relative_path}; left in the source folder")
+            continue
+        record.temp_path = first_record.destination
+        record.placement_method = "hardlink"
+        target_dir = os.path.dirname(first_record.destination)
+        if target_dir == context['dst_dir']:
+            dt_info = first_record.datetime_info
+            base, naming = f"{dt_info['year']}{dt_info['month']}{dt_info['day']}", output_name
+            ext = os.path.splitext(record.original_filename)[1]
+        else:
+            (base, ext), naming = os.path.splitext(record.original_filename), outlier_name
         try:
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as f:
-                f.write('\n'.join(filepaths_in_batch))
-                temp_filename = f.name
-            
-            cmd = [EXIFTOOL_EXECUTABLE, '-S', '-@', temp_filename] + list(commands_tuple)
-            
-            print(f"Running ExifTool command: {' '.join(cmd)}")
-            process = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=False,
-                encoding='utf-8',
-                cwd=exiftool_dir # Set current working directory for ExifTool
-            )
-            
-            print(f"  ExifTool Return Code: {process.returncode}")
-            print(f"  ExifTool STDOUT:\n{process.stdout.strip()}")
-            if process.stderr.strip():
-                print(f"  ExifTool STDERR:\n{process.stderr.strip()}")
-
-            if process.returncode == 0:
-                updated_in_this_batch = 0
-                stdout_lower = process.stdout.lower()
-                # Updated regex to be more robust for "N type files updated" or "N files updated"
-                match = re.search(r"(\d+)\s+(?:(?:image|video|media|file)(?:s)?(?:\s+file(?:s)?)?|files?)\s+updated", stdout_lower)
-
-                if match:
-                    updated_in_this_batch = int(match.group(1))
-                    # total_files_reported_updated_by_exiftool += updated_in_this_batch # No longer summing here
-                    print(f"  ExifTool reported {updated_in_this_batch} file(s) updated in this batch.")
-                    if updated_in_this_batch > 0:
-                        # Add all files from this successful batch to the set
-                        for fp_temp in filepaths_in_batch:
-                            successfully_updated_temp_paths.add(fp_temp)
-                elif "0 image files updated" in stdout_lower or \
-                     "0 files updated" in stdout_lower or \
-                     "files unchanged" in stdout_lower or \
-                     (not stdout_lower.strip() and len(filepaths_in_batch) > 0): # Check for empty output if files were processed
-                    print(f"  ExifTool reported 0 files updated or files unchanged in this batch (Return Code 0).")
-                else:
-                    # This case means return code was 0, but output didn't match known success patterns.
-                    print(f"  ExifTool return code 0, but specific 'updated' count not clearly parsed from STDOUT. Assuming 0 for this batch. STDOUT: '{stdout_lower.strip()}'")
+            record.destination = _place_record(context, record, target_dir, base, ext, naming)
+            _count(context, 'duplicates_linked')
+            log_file_event(f"Linked duplicate {record.relative_path} -> {os.path.basename(record.destination)}")
+            _report_file(context, record, "duplicate", f"hardlink to the output of {first_record.relative_path}")
+        except Exception as e:
+            console_print(f"Error linking duplicate {record.relative_path}: {e}")
+            _log_skipped(context, record.relative_path, f"Duplicate link error: {e}")
+            _report_file(context, record, "error", f"Duplicate link error: {e}")
+    if context['manifest'] is not None:
+        _record_finished_in_manifest(context, context['duplicates'])
+
+def _copy_stage(context, records):
+    """
+    Stages each source file for processing according to TRANSFER_MODE: copied, cloned or
+    hardlinked into the temporary directory, or left in place for "inplace" mode.
+    Outside "copy" mode, files without a date match are not staged at all; the placement
+    stage transfers them straight into the outliers folder. Files that fail are dropped.
+    """
+    transfer_mode = context['transfer_mode']
+    staged_records = []
+    for record in records:
+        filename = record.relative_path
+        if record.job_state is not None: # Staged by the interrupted run this job resumes
+            staged_records.append(record)
+            continue
+        if context['manifest'] is not None and MANIFEST_HASH_CONTENT:
+            # Hashed before staging: in "inplace" mode ExifTool rewrites the source itself
+            try:
+                record.content_hash = hash_file_contents(record.src_path)
+            except OSError as e:
+                console_print(f"Warning: Could not hash {filename}: {e}")
+        if not record.datetime_info and transfer_mode != "copy":
+            record.temp_path = record.src_path
+            record.placement_method = "rename" if transfer_mode == "inplace" else transfer_mode
+            _log_skipped(context, filename, "No matching date pattern (will be moved to outliers)")
+            staged_records.append(record)
+            continue
+        if transfer_mode == "inplace":
+            record.temp_path = record.src_path # ExifTool rewrites the source file itself
+            record.placement_method = "rename"
+            _count(context, 'staged_for_processing')
+            log_file_event(f"Queued for in-place processing: {filename} (Matched: {record.datetime_info['matched_format']})")
+            staged_records.append(record)
+            continue
+        try:
+            if record.relative_path != record.original_filename:
+                os.makedirs(os.path.dirname(record.temp_path), exist_ok=True)
+            with context['metrics'].timed('copy'):
+                method_used = transfer_file(record.src_path, record.temp_path, transfer_mode)
+        except Exception as e:
+            if record.datetime_info:
+                console_print(f"Error copying {filename}: {e}")
+                _log_skipped(context, filename, f"Copy error: {e}")
             else:
-                # Check for specific Perl DLL error
-                if "perl5" in process.stderr and ".dll" in process.stderr:
-                     print(f"  Warning: ExifTool returned error code {process.returncode}. Potential Perl DLL issue: {process.stderr.strip().splitlines()[0]}")
-                else:
-                    print(f"  Warning: ExifTool returned error code {process.returncode} for this batch.")
-                # Files in a failed batch are not added to successfully_updated_temp_paths
+                console_print(f"Error copying {filename} (for outlier processing): {e}")
+                _log_skipped(context, filename, f"Copy error (for outlier processing): {e}")
+            _report_file(context, record, "error", f"Copy error: {e}")
+            continue
+        record.placement_method = "move"
+        _count(context, 'staged_for_processing')
+        if record.datetime_info:
+            log_file_event(f"Staged for processing ({method_used}): {filename} (Matched: {record.datetime_info['matched_format']})")
+        else:
+            # File does not match date pattern, but is a supported extension.
+            # It is copied so it can be moved to outliers_dir by the placement stage.
+            log_file_event(f"Copied (no date match, for outlier processing): {filename}")
+            _log_skipped(context, filename, "No matching date pattern (will be moved to outliers)")
+        staged_records.append(record)
+    context['metrics'].count('files_staged', len(staged_records))
+    _checkpoint(context, context['job'].mark_copied, [_job_entry(record) for record in staged_records if record.job_state is None])
+    for record in staged_records:
+        record.job_state = record.job_state or FILE_STATE_COPIED
+    return staged_records
+
+def _job_entry(record):
+    return {
+        'relative_path': record.relative_path,
+        'src_path': record.src_path,
+        'temp_path': record.temp_path,
+        'placement_method': record.placement_method,
+        'datetime_info': record.datetime_info,
+        'size': record.size,
+        'mtime_ns': record.mtime_ns,
+        'content_hash': record.content_hash,
+        'write_args': record.write_args
+    }
 
+def _checkpoint(context, mark_function, entries):
+    """Commits a per-file state transition to the job state; a failure only costs redoing the step on resume."""
+    try:
+        mark_function(entries)
+    except Exception as e:
+        console_print(f"Warning: Could not update the job state: {e}")
+
+EXIF_DATE_VALUE_REGEX = re.compile(r"(\d{4})[:-](\d{2})[:-](\d{2})[ T](\d{2}):(\d{2}):(\d{2})")
+
+def exif_datetime_value(dt_info):
+    """The datetime_info as an EXIF date value, 'YYYY:MM:DD HH:MM:SS'."""
+    return f"{dt_info['year']}:{dt_info['month']}:{dt_info['day']} {dt_info['hour']}:{dt_info['minute']}:{dt_info['second']}"
+
+def parse_exif_date_value(value):
+    """
+    datetime of a date tag value: 'YYYY:MM:DD HH:MM:SS' (EXIF) or ISO 8601 (XMP).
+    Sub-seconds and time zones are ignored. Returns None for anything else.
+    """
+    match = EXIF_DATE_VALUE_REGEX.match(str(value).strip()) if value else None
+    if not match:
+        return None
+    try:
+        return datetime(*(int(part) for part in match.groups()))
+    except ValueError: # E.g. the "0000:00:00 00:00:00" placeholder
+        return None
+
+def date_tags_match(tag_values, expected_values, tolerance_seconds=None):
+    """True if every tag of 'expected_values' ({tag_key: date value}) is set and within the tolerance of its expected date."""
+    tolerance_seconds = DATE_MATCH_TOLERANCE_SECONDS if tolerance_seconds is None else tolerance_seconds
+    for tag_key, expected_value in expected_values.items():
+        expected_datetime = parse_exif_date_value(expected_value)
+        tag_datetime = parse_exif_date_value(tag_values.get(tag_key))
+        if expected_datetime is None or tag_datetime is None or abs((tag_datetime - expected_datetime).total_seconds()) > tolerance_seconds:
+            return False
+    return True
+
+def expected_date_tag_values(record):
+    """
+    {tag_key: date value} the record's write would set for the TAGS_TO_CHECK_CONFIG tags, or None
+    if its write does more than that (plan arguments edited by hand), so it can never be skipped.
+    """
+    if record.write_args is None:
+        return dict.fromkeys(TAGS_TO_CHECK_CONFIG, exif_datetime_value(record.datetime_info))
+    expected_values = {}
+    for arg in record.write_args:
+        tag_key, separator, value = str(arg).lstrip('-').partition('=')
+        if separator and tag_key in TAGS_TO_CHECK_CONFIG:
+            expected_values[tag_key] = value
+        elif arg != "-overwrite_original":
+            return None
+    return expected_values if len(expected_values) == len(TAGS_TO_CHECK_CONFIG) else None
+
+def record_write_args(context, record):
+    """The ExifTool arguments for a record: the applied plan's, or the ones built from its filename date."""
+    if record.write_args is not None:
+        return record.write_args
+    return build_date_write_commands(record.datetime_info, keep_backup=context['transfer_mode'] == "inplace")
+
+def read_current_date_tags(file_paths, pool):
+    """
+    Reads the TAGS_TO_CHECK_CONFIG tags of 'file_paths'. JPEG/TIFF files are read with the
+    built-in reader (exif_reader); the rest, and files it cannot parse, with one ExifTool
+    '-json -fast2' request. Returns {file_path: {tag_key: value}}; files that could not be
+    read are left out.
+    """
+    tag_values_by_path = {}
+    exiftool_paths = []
+    for file_path in file_paths:
+        try:
+            tag_values_by_path[file_path] = read_date_tags(file_path)
+        except (UnsupportedFileError, OSError):
+            exiftool_paths.append(file_path)
+    if exiftool_paths:
+        requested_paths = {os.path.normcase(os.path.abspath(file_path)): file_path for file_path in exiftool_paths}
+        read_args = ['-json', '-fast2', '-q'] + [f"-{tag_key}" for tag_key in TAGS_TO_CHECK_CONFIG] + exiftool_paths
+        for exiftool_record in pool.iter_json(read_args):
+            file_path = requested_paths.get(os.path.normcase(os.path.abspath(exiftool_record.get('SourceFile', ''))))
+            if file_path is not None:
+                tag_values_by_path[file_path] = exiftool_record
+    return tag_values_by_path
+
+def build_date_write_commands(dt_info, keep_backup=False):
+    """
+    Returns the ExifTool arguments that set all date tags from a datetime_info dict.
+    With keep_backup, ExifTool keeps the unmodified file as '<name>_original' (used in "inplace" mode).
+    """
+    date_value = exif_datetime_value(dt_info)
+    commands = [
+        f"-DateTimeOriginal={date_value}",
+        f"-CreateDate={date_value}",
+        f"-ModifyDate={date_value}"
+    ]
+    if not keep_backup:
+        # Operates on the staged copy. ExifTool writes a new file and renames it over the old
+        # one, so a hardlinked original is never modified.
+        commands.append("-overwrite_original")
+    return commands
+
+def _skip_already_correct(context, records_by_path):
+    """
+    Takes the records whose date tags already match their filename date out of
+    'records_by_path' and marks them written ('already_correct') without an ExifTool write.
+    """
+    try:
+        with context['metrics'].timed('date_tag_read'):
+            tag_values_by_path = read_current_date_tags(list(records_by_path), context['pool'])
+    except ExifToolError as e:
+        console_print(f"Warning: Could not read the current date tags, writing all files of this batch: {e}")
+        return
+    correct_records = []
+    for path, tag_values in tag_values_by_path.items():
+        expected_values = expected_date_tag_values(records_by_path[path])
+        if expected_values is not None and date_tags_match(tag_values, expected_values):
+            correct_records.append(records_by_path.pop(path))
+    for record in correct_records:
+        record.write_result = {'status': 'already_correct', 'message': "date tags already match the filename"}
+        record.job_state = FILE_STATE_WRITTEN
+        log_file_event(f"Date tags already correct, not rewritten: {record.relative_path}")
+    if correct_records:
+        _count(context, 'already_correct', len(correct_records))
+        context['metrics'].count('files_already_correct', len(correct_records))
+        _checkpoint(context, context['job'].mark_written, [(record.relative_path, record.write_result) for record in correct_records])
+
+def _prepare_write_batch(context, records):
+    """Returns {temp_path: record} for the records of this batch that still need an ExifTool write."""
+    # Only files with datetime_info that were not written before an interruption; results come back keyed by path
+    records_by_path = {record.temp_path: record for record in records if record.datetime_info and record.job_state != FILE_STATE_WRITTEN}
+    if records_by_path and SKIP_IF_CORRECT:
+        _skip_already_correct(context, records_by_path)
+    return records_by_path
+
+def _write_operations(context, records_by_path):
+    exiftool_operations = [(path, record_write_args(context, record)) for path, record in records_by_path.items()]
+    _count(context, 'exiftool_attempted', len(exiftool_operations))
+    return exiftool_operations
+
+def _record_write_results(context, records_by_path, write_results):
+    for path, write_result in write_results.items():
+        records_by_path[path].write_result = write_result
+        records_by_path[path].job_state = FILE_STATE_WRITTEN
+    updated_count = sum(1 for result in write_results.values() if result['status'] == 'updated')
+    _count(context, 'exiftool_updated', updated_count)
+    context['metrics'].count('exiftool_requests')
+    context['metrics'].count('files_written', updated_count)
+    _checkpoint(context, context['job'].mark_written, [(records_by_path[path].relative_path, write_result) for path, write_result in write_results.items()])
+
+def _exiftool_write_stage(context, records):
+    """Writes the date tags for the matched records in this batch with one pooled ExifTool request."""
+    records_by_path = _prepare_write_batch(context, records)
+    if records_by_path:
+        exiftool_operations = _write_operations(context, records_by_path)
+        with context['metrics'].timed('exiftool_request'): # One request per batch (plus retries of failed files)
+            write_results = write_metadata_per_file(exiftool_operations, pool=context['pool'], chunk_size=len(exiftool_operations))
+        _record_write_results(context, records_by_path, write_results)
+    return records
+
+class AsyncExifToolWriteStage(PipelineStage):
+    """
+    The ExifTool write stage on the asyncio driver. Rather than threads that each wait for
+    their own request, one thread hands the batches to AsyncExifToolPool.iter_completed, which
+    keeps up to EXIFTOOL_MAX_IN_FLIGHT requests outstanding whatever the number of threads.
+    Each batch is finished (retries, checkpoint) and forwarded as soon as its request completes.
+    """
+
+    def __init__(self, context, batch_size=1):
+        super().__init__("exiftool", None, workers=1, batch_size=batch_size)
+        self.context = context
+
+    def _worker_loop(self):
+        try:
+            self.context['pool'].run(self._drive())
         except Exception as e:
-            print(f"  An unexpected error occurred during ExifTool batch processing: {e}")
+            console_print(f"Error in pipeline stage '{self.name}': {e}")
+            while self._take_batch() is not None: # Keep the stages before this one from blocking on a full queue
+                pass
         finally:
-            if temp_filename and os.path.exists(temp_filename):
+            if self.next_stage is not None:
+                self.next_stage.close_input()
+
+    async def _drive(self):
+        async for request, result in self.context['pool'].pool.iter_completed(self._iter_requests(), pull_size=1):
+            await asyncio.to_thread(self._finish_request, request, result)
+
+    def _iter_requests(self):
+        """Takes batches from the input queue (in iter_completed's pull thread) and yields one write request per batch."""
+        while True:
+            records = self._take_batch()
+            if records is None:
+                return
+            try:
+                records_by_path = _prepare_write_batch(self.context, records)
+                exiftool_operations = _write_operations(self.context, records_by_path) if records_by_path else []
+            except Exception as e:
+                console_print(f"Error in pipeline stage '{self.name}': {e}")
+                continue
+            if not exiftool_operations:
+                self._forward(records)
+                continue
+            chunk_title = f"Write Chunk {next(_write_chunk_numbers)}"
+            request = (records, records_by_path, exiftool_operations, chunk_title, time.perf_counter())
+            yield request, build_per_file_write_args(exiftool_operations)
+
+    def _finish_request(self, request, result):
+        records, records_by_path, exiftool_operations, chunk_title, started = request
+        try:
+            write_results = _chunk_write_results(chunk_title, exiftool_operations, result)
+            _retry_failed_writes(self.context['pool'], exiftool_operations, write_results, EXIFTOOL_WRITE_RETRIES)
+            self.context['metrics'].observe('exiftool_request', time.perf_counter() - started)
+            _record_write_results(self.context, records_by_path, write_results)
+        except Exception as e:
+            console_print(f"Error in pipeline stage '{self.name}': {e}")
+            return
+        self._forward(records)
+
+    def _forward(self, records):
+        if self.next_stage is not None:
+            for record in records:
+                self.next_stage.put(record)
+
+def _reserve_destination_path(context, target_dir, base, ext, naming):
+    """
+    Reserves the first free name of the family naming(base, ext, n) in 'target_dir' (see
+    DestinationNameIndex) until it is committed or released.
+    """
+    lookup_started = time.perf_counter()
+    path, collision_count = context['destination_index'].reserve(target_dir, base, ext, naming)
+    context['metrics'].observe('destination_lookup', time.perf_counter() - lookup_started)
+    if collision_count:
+        context['metrics'].count('name_collisions', collision_count)
+    return path
+
+def output_name(base_new_name, ext, number):
+    return f"{base_new_name}{ext}" if number == 0 else f"{base_new_name}_{number}{ext}"
+
+def outlier_name(base, ext, number):
+    return f"{base}{ext}" if number == 0 else f"{base}_copy{number}{ext}" # Keep original name if free
+
+def _place_record(context, record, target_dir, base, ext, naming):
+    """
+    Moves the record's temp file to the first free name of the family in 'target_dir' and
+    returns the destination. The file is created exclusively (see place_file); if the name was
+    taken on disk behind the index's back, the next name is tried. Other errors are raised
+    after the reserved name has been released.
+    A planned destination in 'target_dir' is used instead of the family's first free name if it is still free.
+    """
+    dst_path = None
+    planned_destination = record.planned_destination
+    if planned_destination is not None and os.path.dirname(planned_destination) == target_dir:
+        if context['destination_index'].claim(planned_destination):
+            dst_path = planned_destination
+    while True:
+        if dst_path is None:
+            dst_path = _reserve_destination_path(context, target_dir, base, ext, naming)
+        try:
+            context['job'].mark_placing(record.relative_path, dst_path)
+            with context['metrics'].timed('move'):
+                place_file(record.temp_path, dst_path, record.placement_method)
+        except FileExistsError:
+            context['destination_index'].mark_taken(dst_path)
+            context['metrics'].count('name_collisions')
+            dst_path = None
+            continue
+        except BaseException:
+            context['destination_index'].release(dst_path)
+            raise
+        context['destination_index'].commit(dst_path)
+        return dst_path
+
+def _placement_stage(context, records):
+    """Moves each record's temp file into the output folder (renamed by date) or into the outliers folder."""
+    for record in records:
+        entry = record.original_filename
+        write_result = record.write_result
+        # Check if successfully updated AND had datetime_info for renaming
+        if record.datetime_info and write_result and write_result['status'] in ('updated', 'already_correct'):
+            dt_info = record.datetime_info
+            _, ext = os.path.splitext(entry)
+            try:
+                record.destination = _place_record(context, record, context['dst_dir'], f"{dt_info['year']}{dt_info['month']}{dt_info['day']}", ext, output_name)
+                _count(context, 'moved_to_output')
+                _report_file(context, record, "output")
+            except Exception as e:
+                console_print(f"Error moving {record.relative_path} to {context['dst_dir']}: {e}")
+                _log_skipped(context, record.relative_path, f"Move error to output: {e}")
+                _report_file(context, record, "error", f"Move error to output: {e}")
+        else:
+            # File is an outlier: not updated by ExifTool, or had no datetime_info initially.
+            base, ext = os.path.splitext(entry)
+            try:
+                record.destination = _place_record(context, record, context['outliers_dir'], base, ext, outlier_name)
+                if os.path.basename(record.destination) != entry: # Handle potential name collision in outliers
+                    log_file_event(f"Warning: Outlier file {record.relative_path} already exists. Saved as {os.path.basename(record.destination)}")
+                _count(context, 'moved_to_outliers')
+                if record.datetime_info: # Was intended for processing but failed/not updated
+                    reason = write_result['message'] if write_result else "no ExifTool result"
+                    _log_skipped(context, record.relative_path, f"Moved to outliers (ExifTool did not update: {reason})")
+                    _report_file(context, record, "outlier", f"ExifTool did not update: {reason}")
+                else: # Already logged as "No matching date pattern"
+                    _report_file(context, record, "outlier", "No matching date pattern")
+            except Exception as e:
+                console_print(f"Error moving {record.relative_path} to {context['outliers_dir']}: {e}")
+                _log_skipped(context, record.relative_path, f"Move error to outliers: {e}")
+                _report_file(context, record, "error", f"Move error to outliers: {e}")
+    placed_paths = [record.relative_path for record in records if record.destination is not None]
+    context['metrics'].count('files_placed', len(placed_paths))
+    _checkpoint(context, context['job'].mark_placed, placed_paths)
+    if context['manifest'] is not None:
+        _record_finished_in_manifest(context, records)
+    return []
+
+def _record_finished_in_manifest(context, records):
+    finished_entries = [
+        {
+            'relative_path': record.relative_path,
+            'size': record.size,
+            'mtime_ns': record.mtime_ns,
+            'content_hash': record.content_hash,
+            'datetime_info': record.datetime_info,
+            'write_result': record.write_result,
+            'destination': record.destination
+        }
+        for record in records if record.destination is not None and record.size is not None
+    ]
+    try:
+        context['manifest'].record_finished(finished_entries)
+    except Exception as e:
+        console_print(f"Warning: Could not update the run manifest: {e}")
+
+def iter_source_records(src_dir, temp_dir, date_patterns, context, parse_workers=1):
+    """
+    Streams supported files in 'src_dir' (see scan_media_files) and yields one record per file
+    with its parsed datetime_info. Records are produced while the scan is still running.
+    In recursive mode the temp copy mirrors the file's subfolder, so equal names in different
+    folders never collide. Files the run manifest lists as finished are skipped before parsing.
+    """
+    manifest = context['manifest']
+    metrics = context['metrics']
+    job = context['job'] if context['resuming'] else None # Files of the resumed job are already on their way
+    file_keys = {} # relative_path -> (size, mtime_ns) for names between the scan and record creation
+
+    def supported_relative_paths():
+        scan_started = time.perf_counter()
+        for entry, relative_path in scan_media_files(src_dir, SUPPORTED_EXTENSIONS, recursive=SCAN_RECURSIVE,
+                                                      include_globs=SCAN_INCLUDE_GLOBS, exclude_globs=SCAN_EXCLUDE_GLOBS,
+                                                      skip_dir_names=context['skip_dir_names']):
+            _count(context, 'supported_files_found')
+            metrics.count('files_found')
+            if job is not None and job.is_tracked(relative_path):
+                continue
+            if manifest is not None:
                 try:
-                    os.unlink(temp_filename)
-                except Exception as e_unlink:
-                    print(f"  Warning: Could not delete temp file {temp_filename}: {e_unlink}")
-        print("--- End Batch ---")
-    
-    return successfully_updated_temp_paths # Return the set of successfully updated temp file paths
+                    entry_stat = entry.stat()
+                except OSError as e:
+                    console_print(f"Warning: Could not stat {relative_path}: {e}")
+                    continue
+                if manifest.is_processed(relative_path, entry_stat.st_size, entry_stat.st_mtime_ns, entry.path if MANIFEST_HASH_CONTENT else None):
+                    _count(context, 'already_processed')
+                    _report_row(context, relative_path, "already_processed")
+                    continue
+                file_keys[relative_path] = (entry_stat.st_size, entry_stat.st_mtime_ns)
+            # Directory reading, filtering and the manifest check since the previous file handed on
+            metrics.observe('scan', time.perf_counter() - scan_started)
+            yield relative_path
+            scan_started = time.perf_counter()
+
+    for relative_path, datetime_info in iter_parsed_filenames(supported_relative_paths(), date_patterns, parse_workers, metrics):
+        metrics.count('files_parsed')
+        if datetime_info:
+            metrics.count('files_matched')
+        path_parts = relative_path.split('/')
+        size, mtime_ns = file_keys.pop(relative_path, (None, None))
+        yield FileRecord(
+            path_parts[-1],
+            relative_path,
+            os.path.join(src_dir, *path_parts),
+            os.path.join(temp_dir, *path_parts), # Use original filename (and subfolder) in temp_dir
+            datetime_info,
+            size,
+            mtime_ns
+        )
+    if context['job'] is not None:
+        context['job'].set_phase('scan_complete', True)
+
+def iter_planned_records(src_dir, temp_dir, file_rows, context):
+    """
+    Yields records for the "file" rows of a saved plan (see run_plan), in place of the scan and
+    the filename parser. Each record keeps the plan's date match and destination. Files that
+    are gone or whose size or modification time changed since the plan was made are skipped.
+    """
+    manifest = context['manifest']
+    job = context['job'] if context['resuming'] else None
+    metrics = context['metrics']
+    for row in file_rows:
+        relative_path = row['relative_path']
+        _count(context, 'supported_files_found')
+        metrics.count('files_found')
+        if job is not None and job.is_tracked(relative_path):
+            continue
+        path_parts = relative_path.split('/')
+        src_path = os.path.join(src_dir, *path_parts)
+        try:
+            source_stat = os.stat(src_path)
+        except OSError as e:
+            _log_skipped(context, relative_path, f"Not applied: the file is gone since the plan was made ({e})")
+            _report_row(context, relative_path, "not_applied", message=f"gone since the plan was made ({e})")
+            continue
+        if (source_stat.st_size, source_stat.st_mtime_ns) != (row['size'], row['mtime_ns']):
+            _log_skipped(context, relative_path, "Not applied: the file changed since the plan was made")
+            _report_row(context, relative_path, "not_applied", message="changed since the plan was made")
+            continue
+        if manifest is not None and manifest.is_processed(relative_path, source_stat.st_size, source_stat.st_mtime_ns, src_path if MANIFEST_HASH_CONTENT else None):
+            _count(context, 'already_processed')
+            _report_row(context, relative_path, "already_processed")
+            continue
+        metrics.count('files_parsed')
+        if row['datetime_info']:
+            metrics.count('files_matched')
+        record = FileRecord(path_parts[-1], relative_path, src_path, os.path.join(temp_dir, *path_parts), row['datetime_info'], source_stat.st_size, source_stat.st_mtime_ns)
+        record.planned_destination = row.get('destination')
+        record.write_args = row.get('exiftool_args')
+        yield record
+    if context['job'] is not None:
+        context['job'].set_phase('scan_complete', True)
+
+def iter_resumed_records(context):
+    """
+    Yields the records an interrupted run had staged but not placed, each resuming after its
+    last checkpointed state. Files that were already moved when the run stopped are only marked
+    as placed; files whose staged copy is missing are forgotten so the scan stages them again.
+    """
+    job = context['job']
+    for row in job.iter_unfinished():
+        temp_exists = os.path.exists(row['temp_path'])
+        already_placed = False
+        if row['destination'] and os.path.exists(row['destination']):
+            if not temp_exists:
+                already_placed = True
+            elif os.path.samefile(row['temp_path'], row['destination']):
+                # Hardlink placement, or place_file() stopped between linking and removing the temp file
+                if row['placement_method'] in ("move", "rename"):
+                    os.unlink(row['temp_path'])
+                already_placed = True
+            elif os.path.getsize(row['destination']) == 0:
+                os.remove(row['destination']) # Name claimed by place_file() but never filled
+        if already_placed:
+            job.mark_placed([row['relative_path']])
+            if context['manifest'] is not None and row['size'] is not None:
+                context['manifest'].record_finished([dict(row)])
+            _count(context, 'resumed_already_placed')
+            _report_row(context, row['relative_path'], "already_placed", destination=row['destination'], message="placed before the interrupted run stopped")
+            continue
+        if not temp_exists:
+            job.forget(row['relative_path'])
+            continue
+        path_parts = row['relative_path'].split('/')
+        record = FileRecord(path_parts[-1], row['relative_path'], row['src_path'], row['temp_path'], row['datetime_info'], row['size'], row['mtime_ns'])
+        record.placement_method = row['placement_method']
+        record.content_hash = row['content_hash']
+        record.write_result = row['write_result']
+        record.write_args = row['write_args']
+        record.job_state = row['state']
+        _count(context, 'resumed_from_job')
+        yield record
 
 # --- Main ---
-def main():
-    # find_and_set_exiftool_path() is called globally already
-    if EXIFTOOL_EXECUTABLE:
-        print(f"Using ExifTool at: {EXIFTOOL_EXECUTABLE}")
-    else:
-        # This case should be handled by exit() in find_and_set_exiftool_path()
-        print("Critical: ExifTool path not set. Exiting.") 
-        return
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sets photo/video date metadata from the date in each filename.",
+        epilog="Without source folders the script asks for one interactively. Several source folders are "
+               "processed one after another with a single ExifTool pool and one compiled pattern set."
+    )
+    parser.add_argument("sources", nargs="*", metavar="SOURCE", help="source folder(s) to process")
+    parser.add_argument("--output-dir", help="folder for processed files (default: SOURCE/_output_metadata_edited)")
+    parser.add_argument("--outliers-dir", help="folder for unmatched/failed files (default: SOURCE/_output_outliers)")
+    parser.add_argument("--patterns", metavar="JSON_FILE", help="date formats file (default: date_formats_source.json)")
+    parser.add_argument("--transfer-mode", choices=TRANSFER_MODES, default=TRANSFER_MODE, help=f"how files are staged (default: {TRANSFER_MODE})")
+    parser.add_argument("--recursive", action="store_true", default=SCAN_RECURSIVE, help="also process files in subfolders")
+    parser.add_argument("--include", action="append", default=list(SCAN_INCLUDE_GLOBS), metavar="GLOB", help="only process files matching this glob (repeatable)")
+    parser.add_argument("--exclude", action="append", default=list(SCAN_EXCLUDE_GLOBS), metavar="GLOB", help="skip files and folders matching this glob (repeatable)")
+    parser.add_argument("--exiftool", metavar="PATH", help=f"ExifTool executable (default: ${EXIFTOOL_ENV_VAR}, cached location, PATH)")
+    parser.add_argument("--pool-size", type=int, default=EXIFTOOL_POOL_SIZE, help=f"persistent ExifTool processes (default: {EXIFTOOL_POOL_SIZE})")
+    parser.add_argument("--exiftool-driver", choices=EXIFTOOL_DRIVERS, default=EXIFTOOL_DRIVER, help=f"how the ExifTool processes are driven (default: {EXIFTOOL_DRIVER})")
+    parser.add_argument("--max-in-flight", type=int, default=EXIFTOOL_MAX_IN_FLIGHT, help=f"write requests outstanding at once with the asyncio driver (default: {EXIFTOOL_MAX_IN_FLIGHT})")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS, help=f"filename parsing processes (default: {PARSE_WORKERS})")
+    parser.add_argument("--copy-workers", type=int, default=COPY_WORKERS, help=f"copy threads (default: {COPY_WORKERS})")
+    parser.add_argument("--place-workers", type=int, default=PLACE_WORKERS, help=f"move threads (default: {PLACE_WORKERS})")
+    parser.add_argument("--batch-size", type=int, default=EXIFTOOL_WRITE_CHUNK_SIZE, help=f"files per ExifTool write request (default: {EXIFTOOL_WRITE_CHUNK_SIZE})")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default=DEDUP_MODE,
+                        help="process each distinct file content once; later copies are only reported, or hardlinked to the first copy's output")
+    parser.add_argument("--skip-if-correct", action="store_true", default=SKIP_IF_CORRECT,
+                        help="read the current date tags first and do not rewrite files whose tags already match the filename date")
+    parser.add_argument("--date-tolerance", type=float, default=DATE_MATCH_TOLERANCE_SECONDS, metavar="SECONDS",
+                        help=f"largest difference that still counts as matching with --skip-if-correct (default: {DATE_MATCH_TOLERANCE_SECONDS})")
+    parser.add_argument("--no-manifest", action="store_true", help="process every file, ignoring the run manifest of earlier runs")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its job state instead of starting over")
+    parser.add_argument("--dry-run", action="store_true", help="only scan and parse; show where each file would go without touching anything")
+    parser.add_argument("--plan", metavar="PATH", default=PLAN_PATH, help="dry run that also writes the plan (destinations, ExifTool arguments, outlier reasons, parse statistics) to this JSONL file")
+    parser.add_argument("--apply-plan", metavar="PATH", help="process the files of a plan written by --plan, without scanning or parsing again")
+    parser.add_argument("--output-format", choices=("text", "json"), default="text", help="format of the final summary (default: text)")
+    parser.add_argument("--quiet", action="store_true", default=QUIET, help="no per-file or per-chunk lines; only warnings, errors and the summary")
+    parser.add_argument("--progress", action="store_true", default=SHOW_PROGRESS, help="show a live progress/throughput line on stderr (default with --quiet on a terminal)")
+    parser.add_argument("--report", metavar="PATH", default=REPORT_PATH, help="stream one row per file (outcome, destination, ExifTool status) to this .jsonl or .csv file")
+    parser.add_argument("--report-format", choices=REPORT_FORMATS, default=REPORT_FORMAT, help="format of --report (default: from its extension)")
+    parser.add_argument("--metrics-json", metavar="PATH", default=METRICS_JSON_PATH, help="write counters and timing histograms of the run to this JSON file")
+    return parser.parse_args(argv)
+
+def apply_arguments(args):
+    """Overrides the module configuration with the command-line options."""
+    global DATE_FORMATS_FILE_PATHS, TRANSFER_MODE, SCAN_RECURSIVE, SCAN_INCLUDE_GLOBS, SCAN_EXCLUDE_GLOBS
+    global EXIFTOOL_POOL_SIZE, EXIFTOOL_WRITE_WORKERS, PARSE_WORKERS, COPY_WORKERS, PLACE_WORKERS, EXIFTOOL_WRITE_CHUNK_SIZE
+    global QUIET, SHOW_PROGRESS, METRICS_JSON_PATH, REPORT_PATH, REPORT_FORMAT, PLAN_PATH, DEDUP_MODE, EXIFTOOL_DRIVER, EXIFTOOL_MAX_IN_FLIGHT
+    global SKIP_IF_CORRECT, DATE_MATCH_TOLERANCE_SECONDS
+    if args.patterns:
+        DATE_FORMATS_FILE_PATHS = [os.path.abspath(args.patterns)]
+    TRANSFER_MODE = args.transfer_mode
+    SCAN_RECURSIVE = args.recursive
+    SCAN_INCLUDE_GLOBS = args.include
+    SCAN_EXCLUDE_GLOBS = args.exclude
+    EXIFTOOL_POOL_SIZE = max(1, args.pool_size)
+    EXIFTOOL_WRITE_WORKERS = EXIFTOOL_POOL_SIZE
+    EXIFTOOL_DRIVER = args.exiftool_driver
+    EXIFTOOL_MAX_IN_FLIGHT = max(1, args.max_in_flight)
+    PARSE_WORKERS = max(1, args.parse_workers)
+    COPY_WORKERS = max(1, args.copy_workers)
+    PLACE_WORKERS = max(1, args.place_workers)
+    EXIFTOOL_WRITE_CHUNK_SIZE = max(1, args.batch_size)
+    DEDUP_MODE = args.dedup
+    SKIP_IF_CORRECT = args.skip_if_correct
+    DATE_MATCH_TOLERANCE_SECONDS = max(0.0, args.date_tolerance)
+    QUIET = args.quiet
+    SHOW_PROGRESS = args.progress or (QUIET and sys.stderr.isatty())
+    METRICS_JSON_PATH = args.metrics_json
+    REPORT_PATH = args.report
+    PLAN_PATH = args.plan
+    if PLAN_PATH:
+        args.dry_run = True
+    REPORT_FORMAT = args.report_format
+
+def _new_stats():
+    return {
+        'supported_files_found': 0,
+        'already_processed': 0,
+        'resumed_from_job': 0,
+        'resumed_already_placed': 0,
+        'staged_for_processing': 0,
+        'exiftool_attempted': 0,
+        'exiftool_updated': 0,
+        'already_correct': 0,
+        'moved_to_output': 0,
+        'moved_to_outliers': 0,
+        'duplicates_found': 0,
+        'duplicates_linked': 0
+    }
+
+def _skip_dir_names(dst_dir, outliers_dir):
+    """Folder names the scan never enters: the editor's own folders, including custom output folders."""
+    return EDITOR_OWN_DIR_NAMES + tuple(os.path.basename(os.path.normpath(path)) for path in (dst_dir, outliers_dir))
 
-    date_patterns = load_date_patterns()
-    if not date_patterns:
-        print("No date patterns loaded. Cannot proceed with filename parsing.")
+def use_run_manifest(args):
+    """True if this run reads and records the run manifest (USE_RUN_MANIFEST, unless --no-manifest)."""
+    return USE_RUN_MANIFEST and not args.no_manifest
+
+def plan_source_folder(src_dir, date_patterns, dst_dir, outliers_dir, metrics, plan_writer=None, use_manifest=USE_RUN_MANIFEST):
+    """
+    Dry run: scans and parses 'src_dir' and prints where each file would be placed, using the
+    same collision naming as a real run. Nothing is created, copied or written.
+    With a PlanWriter, every file's planned action, destination and ExifTool arguments (or
+    outlier reason) are also written to the plan, followed by the folder's parse statistics.
+    """
+    manifest = None
+    if use_manifest and os.path.exists(os.path.join(dst_dir, MANIFEST_FILENAME)):
+        manifest = open_run_manifest(dst_dir, src_dir)
+    context = {
+        'src_dir': src_dir,
+        'manifest': manifest,
+        'report': None,
+        'skip_dir_names': _skip_dir_names(dst_dir, outliers_dir),
+        'resuming': False,
+        'job': None,
+        'metrics': metrics,
+        'lock': threading.Lock(),
+        'destination_index': DestinationNameIndex(), # Never committed or released here, so later files see the names given to earlier ones
+        'dedup_index': ContentDedupIndex(),
+        'duplicates': [],
+        'stats': _new_stats()
+    }
+    stats = context['stats']
+    format_counts = collections.Counter()
+    if plan_writer is not None:
+        plan_writer.begin_source(src_dir, dst_dir, outliers_dir)
+    try:
+        for record in iter_source_records(src_dir, os.path.join(src_dir, "_temp_metadata_editor"), date_patterns, context, PARSE_WORKERS):
+            dt_info = record.datetime_info
+            format_counts[dt_info['matched_format'] if dt_info else None] += 1
+            plan_row = None
+            if DEDUP_MODE and not _dedup_stage(context, [record]):
+                log_file_event(f"Would {'link' if DEDUP_MODE == 'hardlink' else 'skip'} duplicate: {record.relative_path} (same content as {record.duplicate_of.relative_path})")
+                plan_row = {'action': "duplicate", 'duplicate_of': record.duplicate_of.relative_path}
+            elif dt_info:
+                _, ext = os.path.splitext(record.original_filename)
+                dst_path = _reserve_destination_path(context, dst_dir, f"{dt_info['year']}{dt_info['month']}{dt_info['day']}", ext, output_name)
+                log_file_event(f"Would process: {record.relative_path} -> {os.path.basename(dst_path)} (Matched: {dt_info['matched_format']})")
+                stats['moved_to_output'] += 1
+                plan_row = {'action': "write", 'destination': os.path.abspath(dst_path),
+                            'exiftool_args': build_date_write_commands(dt_info, keep_backup=TRANSFER_MODE == "inplace")}
+            else:
+                outlier_path = _reserve_destination_path(context, outliers_dir, *os.path.splitext(record.original_filename), outlier_name)
+                log_file_event(f"Would move to outliers: {record.relative_path} -> {os.path.basename(outlier_path)} (no matching date pattern)")
+                stats['moved_to_outliers'] += 1
+                plan_row = {'action': "outlier", 'destination': os.path.abspath(outlier_path), 'reason': "No matching date pattern"}
+            if plan_writer is not None:
+                if record.size is None: # Only known from the scan when a manifest is checked
+                    try:
+                        source_stat = os.stat(record.src_path)
+                        record.size, record.mtime_ns = source_stat.st_size, source_stat.st_mtime_ns
+                    except OSError as e:
+                        console_print(f"Warning: Could not stat {record.relative_path}: {e}")
+                plan_writer.add_file(dict({'relative_path': record.relative_path, 'size': record.size, 'mtime_ns': record.mtime_ns,
+                                           'datetime_info': dt_info}, **plan_row))
+    finally:
+        if manifest is not None:
+            manifest.close()
+    planned_files = sum(format_counts.values())
+    stats['matched_formats'] = {
+        matched_format: {'files': count, 'share': round(count / planned_files, 4)}
+        for matched_format, count in format_counts.most_common() if matched_format is not None
+    }
+    stats['unmatched'] = format_counts[None]
+    if plan_writer is not None:
+        plan_writer.end_source({'src_dir': os.path.abspath(src_dir), 'files': planned_files, 'to_output': stats['moved_to_output'],
+                                'to_outliers': stats['moved_to_outliers'], 'duplicates': stats['duplicates_found'],
+                                'already_processed': stats['already_processed'], 'unmatched': stats['unmatched'],
+                                'matched_formats': stats['matched_formats']})
+    return stats
 
-    src_dir = input("Enter source folder PATH: ").strip()
+def print_plan_summary(stats):
+    """Dry-run summary: where the files would go and how often each date format matched."""
+    planned_files = stats['moved_to_output'] + stats['moved_to_outliers'] + stats['duplicates_found']
+    print(f"\n--- Plan Summary ---")
+    print(f"Files that would be written and renamed: {stats['moved_to_output']}")
+    print(f"Files that would be moved to outliers: {stats['moved_to_outliers']}")
+    if DEDUP_MODE:
+        print(f"Duplicate files: {stats['duplicates_found']}")
+    if stats['already_processed']:
+        print(f"Already processed by an earlier run: {stats['already_processed']}")
+    if planned_files:
+        print(f"Filename parse rate: {(planned_files - stats['unmatched']) / planned_files:.1%} ({stats['unmatched']} files without a date match)")
+    for matched_format, format_stats in list(stats['matched_formats'].items())[:PLAN_FORMATS_SHOWN]:
+        print(f"  {format_stats['files']:>9,}  {format_stats['share']:6.1%}  {matched_format}")
+    if len(stats['matched_formats']) > PLAN_FORMATS_SHOWN:
+        print(f"  ... and {len(stats['matched_formats']) - PLAN_FORMATS_SHOWN} more formats")
+
+def process_source_folder(src_dir, date_patterns, pool, args, metrics, report=None, plan_writer=None, planned_source=None):
+    """
+    Runs the full parse -> copy -> ExifTool write -> move pipeline for one source folder.
+    Counters and timings are added to 'metrics' (RunMetrics, shared by all source folders),
+    and each file's outcome to 'report' (RunReport) if given.
+    A dry run writes its plan to 'plan_writer' if given. With 'planned_source' - a
+    (source_row, file_rows) pair from run_plan.iter_plan_sources - the folders and files come
+    from a saved plan instead of the scan and the filename parser.
+    Returns the stats dictionary, or None if the folder could not be processed.
+    """
     if not os.path.isdir(src_dir):
         print(f"Error: Source folder not found at '{src_dir}'")
-        return
+        return None
+
+    if planned_source is not None:
+        dst_dir, outliers_dir = planned_source[0]['dst_dir'], planned_source[0]['outliers_dir']
+    else:
+        dst_dir = args.output_dir or os.path.join(src_dir, "_output_metadata_edited")
+        outliers_dir = args.outliers_dir or os.path.join(src_dir, "_output_outliers") # New directory for outliers
+
+    if args.dry_run:
+        print(f"\nDry run for '{src_dir}' (no files are copied, written or moved)...")
+        stats = plan_source_folder(src_dir, date_patterns, dst_dir, outliers_dir, metrics, plan_writer, use_run_manifest(args))
+        if args.output_format == "text":
+            print_plan_summary(stats)
+        return stats
 
-    dst_dir = os.path.join(src_dir, "_output_metadata_edited")
-    outliers_dir = os.path.join(src_dir, "_output_outliers") # New directory for outliers
-    
     if not os.path.exists(dst_dir):
         os.makedirs(dst_dir, exist_ok=True)
     if not os.path.exists(outliers_dir): # Create outliers directory
         os.makedirs(outliers_dir, exist_ok=True)
 
+    if TRANSFER_MODE not in TRANSFER_MODES:
+        print(f"Error: Unknown TRANSFER_MODE '{TRANSFER_MODE}'. Expected one of: {', '.join(TRANSFER_MODES)}")
+        return None
+
+    # The temp dir doubles as the job directory: staged files plus the job state checkpoints
     temp_dir = os.path.join(src_dir, "_temp_metadata_editor")
-    if os.path.exists(temp_dir): # Clean up temp dir from previous runs
+    resuming = args.resume and JobState.exists(temp_dir)
+    if args.resume and not resuming:
+        print("No interrupted run to resume; starting a new run.")
+    if os.path.exists(temp_dir) and not resuming: # Clean up temp dir from previous runs
+        if JobState.exists(temp_dir):
+            print(f"Discarding the interrupted run in {temp_dir} (use --resume to continue it instead).")
         shutil.rmtree(temp_dir)
     os.makedirs(temp_dir, exist_ok=True)
-    
-    files_to_process_info = [] # Stores dicts for files copied to temp
-    skipped_files_log = [] # For files skipped before ExifTool or errors during copy/move
-    
-    print("\nSTEP 1: Analyzing files and copying to temporary directory...")
-    supported_files_found_in_src = 0
-
-    for filename in os.listdir(src_dir):
-        src_path = os.path.join(src_dir, filename)
-        
-        # Skip subdirectories in src_dir (including our own output/temp dirs if they are there)
-        if os.path.isdir(src_path):
-            if filename in ["_output_metadata_edited", "_output_outliers", "_temp_metadata_editor"]:
-                print(f"Skipping scan of script's own sub-directory: {filename}")
-            # else: print(f"Skipping other sub-directory: {filename}") # Optional
-            continue
+    job = JobState(temp_dir)
+    transfer_mode = TRANSFER_MODE
+    if resuming:
+        transfer_mode = job.get_phase('transfer_mode', TRANSFER_MODE)
+        state_counts = job.count_by_state()
+        print(f"Resuming interrupted run (scan {'completed' if job.get_phase('scan_complete') else 'incomplete'}; "
+              f"{state_counts.get(FILE_STATE_COPIED, 0)} staged, {state_counts.get(FILE_STATE_WRITTEN, 0)} written, not yet placed).")
+        if transfer_mode != TRANSFER_MODE:
+            print(f"Note: Continuing with the interrupted run's transfer mode '{transfer_mode}'.")
+    else:
+        job.set_phase('src_dir', os.path.abspath(src_dir))
+        job.set_phase('transfer_mode', transfer_mode)
+        job.set_phase('scan_complete', False)
 
-        if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
-            continue
-        
-        supported_files_found_in_src += 1
-        filename_stem = os.path.splitext(filename)[0]
-        datetime_info = extract_datetime_from_filename(filename_stem, date_patterns)
-        
-        temp_path = os.path.join(temp_dir, filename) # Use original filename in temp_dir
+    manifest = None
+    if use_run_manifest(args):
+        try:
+            manifest = open_run_manifest(dst_dir, src_dir)
+            print(f"Run manifest: {manifest.manifest_path} ({manifest.count()} files finished by earlier runs)")
+        except Exception as e:
+            print(f"Warning: Could not open the run manifest in {dst_dir}, processing every file: {e}")
 
-        if datetime_info:
-            try:
-                shutil.copy2(src_path, temp_path)
-                files_to_process_info.append({'temp_path': temp_path, 'original_filename': filename, 'datetime_info': datetime_info})
-                print(f"Copied for processing: {filename} (Matched: {datetime_info['matched_format']})")
-            except Exception as e:
-                print(f"Error copying {filename}: {e}")
-                skipped_files_log.append((filename, f"Copy error: {e}"))
-        else:
-            # File does not match date pattern, but is a supported extension.
-            # Copy to temp_dir so it can be moved to outliers_dir later.
-            try:
-                shutil.copy2(src_path, temp_path)
-                files_to_process_info.append({'temp_path': temp_path, 'original_filename': filename, 'datetime_info': None})
-                print(f"Copied (no date match, for outlier processing): {filename}")
-                skipped_files_log.append((filename, "No matching date pattern (will be moved to outliers)"))
-            except Exception as e:
-                print(f"Error copying {filename} (for outlier processing): {e}")
-                skipped_files_log.append((filename, f"Copy error (for outlier processing): {e}"))
-    
-    if not files_to_process_info: # Check if any files were actually copied
-        print("\nNo files copied to temporary directory for processing.")
-        if os.path.exists(temp_dir) and not os.listdir(temp_dir): shutil.rmtree(temp_dir)
-        if os.path.exists(dst_dir) and not os.listdir(dst_dir): os.rmdir(dst_dir)
-        if os.path.exists(outliers_dir) and not os.listdir(outliers_dir): os.rmdir(outliers_dir)
-        return
+    context = {
+        'src_dir': src_dir,
+        'dst_dir': dst_dir,
+        'outliers_dir': outliers_dir,
+        'transfer_mode': transfer_mode,
+        'manifest': manifest, # None when incremental runs are disabled
+        'skip_dir_names': _skip_dir_names(dst_dir, outliers_dir),
+        'job': job,
+        'resuming': resuming,
+        'pool': pool,
+        'metrics': metrics,
+        'lock': threading.Lock(),
+        'destination_index': DestinationNameIndex(), # Output/outlier folder names, listed once and updated as files are placed
+        'dedup_index': ContentDedupIndex(hash_eagerly=transfer_mode == "inplace"), # In place, sources are rewritten before later files are compared
+        'duplicates': [], # Records held back by the dedup stage
+        'report': report, # Per-file rows (REPORT_PATH), None if not requested
+        'notes': NoteLog(NOTES_SHOWN_IN_SUMMARY), # Files skipped before ExifTool or errors during copy/move
+        'stats': _new_stats()
+    }
 
-    print(f"\nSTEP 2: Preparing ExifTool commands...")
-    exiftool_operations = []
-    files_for_exiftool_processing_count = 0
-    for file_info in files_to_process_info:
-        if file_info['datetime_info']: # Only prepare commands for files with datetime_info
-            dt_info = file_info['datetime_info']
-            date_value = f"{dt_info['year']}:{dt_info['month']}:{dt_info['day']} {dt_info['hour']}:{dt_info['minute']}:{dt_info['second']}"
-            
-            commands = [
-                f"-DateTimeOriginal={date_value}",
-                f"-CreateDate={date_value}",
-                f"-ModifyDate={date_value}",
-                "-overwrite_original" # Operates on the copy in temp_dir
-            ]
-            exiftool_operations.append((file_info['temp_path'], commands))
-            files_for_exiftool_processing_count +=1
-    
-    successfully_updated_temp_paths = set()
-    exiftool_reported_updated_count = 0
-
-    if files_for_exiftool_processing_count > 0:
-        print(f"Prepared ExifTool commands for {files_for_exiftool_processing_count} files.")
-        print("\nSTEP 3: Updating metadata using ExifTool...")
-        successfully_updated_temp_paths = run_exiftool_batch(exiftool_operations)
-        exiftool_reported_updated_count = len(successfully_updated_temp_paths)
+    print("\nProcessing files (parse -> copy -> ExifTool write -> move, running concurrently)...")
+    print(f"Transfer mode: {transfer_mode}" + (f", duplicate content: {DEDUP_MODE}" if DEDUP_MODE else ""))
+    if EXIFTOOL_DRIVER == "asyncio":
+        exiftool_stage = AsyncExifToolWriteStage(context, batch_size=EXIFTOOL_WRITE_CHUNK_SIZE)
+        exiftool_workers_text = f"up to {EXIFTOOL_MAX_IN_FLIGHT} requests in flight"
     else:
-        print("\nSTEP 3: No files with matched dates to update metadata for.")
-    
-    print(f"\nSTEP 4: Moving processed files...")
-    moved_to_output_count = 0
-    moved_to_outliers_count = 0
-    
-    for entry in os.listdir(temp_dir): 
-        temp_file_path = os.path.join(temp_dir, entry)
-        if not os.path.isfile(temp_file_path): 
-            continue
+        exiftool_stage = PipelineStage("exiftool", functools.partial(_exiftool_write_stage, context), workers=EXIFTOOL_WRITE_WORKERS, batch_size=EXIFTOOL_WRITE_CHUNK_SIZE)
+        exiftool_workers_text = str(EXIFTOOL_WRITE_WORKERS)
+    print(f"Stage workers: parse={PARSE_WORKERS}, copy={COPY_WORKERS}, exiftool={exiftool_workers_text} (pool of {EXIFTOOL_POOL_SIZE}, {EXIFTOOL_DRIVER} driver), move={PLACE_WORKERS}")
+    stages = [
+        PipelineStage("copy", functools.partial(_copy_stage, context), workers=COPY_WORKERS),
+        exiftool_stage,
+        PipelineStage("move", functools.partial(_placement_stage, context), workers=PLACE_WORKERS, batch_size=PLACE_BATCH_SIZE)
+    ]
+    if planned_source is not None:
+        source_records = iter_planned_records(src_dir, temp_dir, planned_source[1], context)
+    else:
+        source_records = iter_source_records(src_dir, temp_dir, date_patterns, context, PARSE_WORKERS)
+    if resuming:
+        source_records = itertools.chain(iter_resumed_records(context), source_records)
+    if DEDUP_MODE:
+        # One worker, so the first file of each content is always the one processed
+        stages.insert(0, PipelineStage("dedup", functools.partial(_dedup_stage, context), workers=1))
+    try:
+        run_pipeline(source_records, stages)
+        if DEDUP_MODE:
+            _place_duplicates(context)
+    finally:
+        job.close()
+        if manifest is not None:
+            manifest_is_empty = manifest.count_all() == 0
+            manifest.close()
+            if manifest_is_empty: # Keep an untouched output folder empty
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(manifest.manifest_path + suffix):
+                        os.remove(manifest.manifest_path + suffix)
 
-        original_file_info = next((info for info in files_to_process_info if info['original_filename'] == entry), None)
-
-        if original_file_info:
-            # Check if successfully updated AND had datetime_info for renaming
-            if original_file_info['temp_path'] in successfully_updated_temp_paths and original_file_info['datetime_info']:
-                dt_info = original_file_info['datetime_info']
-                base_new_name = f"{dt_info['year']}{dt_info['month']}{dt_info['day']}"
-                _, ext = os.path.splitext(entry)
-                
-                new_name = f"{base_new_name}{ext}"
-                dst_path_final = os.path.join(dst_dir, new_name)
-                counter = 1
-                while os.path.exists(dst_path_final):
-                    new_name = f"{base_new_name}_{counter}{ext}"
-                    dst_path_final = os.path.join(dst_dir, new_name)
-                    counter += 1
-                try:
-                    shutil.move(temp_file_path, dst_path_final)
-                    moved_to_output_count += 1
-                except Exception as e:
-                    print(f"Error moving {entry} to {dst_path_final}: {e}")
-                    skipped_files_log.append((entry, f"Move error to output: {e}"))
-            else:
-                # File is an outlier: not updated by ExifTool, or had no datetime_info initially.
-                outlier_dst_path = os.path.join(outliers_dir, entry) # Keep original name
-                try:
-                    if os.path.exists(outlier_dst_path): # Handle potential name collision in outliers
-                        base, ext = os.path.splitext(entry)
-                        copy_num = 1
-                        temp_outlier_name = f"{base}_copy{copy_num}{ext}"
-                        while os.path.exists(os.path.join(outliers_dir, temp_outlier_name)):
-                            copy_num += 1
-                            temp_outlier_name = f"{base}_copy{copy_num}{ext}"
-                        outlier_dst_path = os.path.join(outliers_dir, temp_outlier_name)
-                        print(f"Warning: Outlier file {entry} already exists. Saving as {os.path.basename(outlier_dst_path)}")
-                    
-                    shutil.move(temp_file_path, outlier_dst_path)
-                    moved_to_outliers_count += 1
-                    if original_file_info['datetime_info']: # Was intended for processing but failed/not updated
-                         skipped_files_log.append((entry, "Moved to outliers (ExifTool did not update or batch error)"))
-                    # If no datetime_info, it was already logged as "No matching date pattern"
-                except Exception as e:
-                    print(f"Error moving {entry} to {outlier_dst_path}: {e}")
-                    skipped_files_log.append((entry, f"Move error to outliers: {e}"))
-        else:
-             # File in temp_dir but not in files_to_process_info (should be rare)
-             print(f"Warning: File {entry} found in temp_dir but was not in 'files_to_process_info'. Moving to outliers.")
-             outlier_dst_path = os.path.join(outliers_dir, entry)
-             try:
-                if os.path.exists(outlier_dst_path):
-                    base, ext = os.path.splitext(entry)
-                    copy_num = 1
-                    temp_outlier_name = f"{base}_copy{copy_num}{ext}"
-                    while os.path.exists(os.path.join(outliers_dir, temp_outlier_name)):
-                        copy_num += 1
-                        temp_outlier_name = f"{base}_copy{copy_num}{ext}"
-                    outlier_dst_path = os.path.join(outliers_dir, temp_outlier_name)
-                shutil.move(temp_file_path, outlier_dst_path)
-                moved_to_outliers_count += 1
-                skipped_files_log.append((entry, "Moved to outliers (unexpected file in temp_dir)"))
-             except Exception as e:
-                print(f"Error moving unexpected file {entry} to {outlier_dst_path}: {e}")
-                skipped_files_log.append((entry, f"Move error for unexpected file: {e}"))
-
-    if moved_to_output_count > 0 :
-        print(f"Moved {moved_to_output_count} successfully processed files to {dst_dir}")
-    if moved_to_outliers_count > 0:
-        print(f"Moved {moved_to_outliers_count} outlier/unprocessed files to {outliers_dir}")
-
-    print(f"\nSTEP 5: Cleaning up temporary directory: {temp_dir}")
+    stats = context['stats']
+    notes = context['notes']
+    if stats['moved_to_output'] > 0:
+        log_file_event(f"Moved {stats['moved_to_output']} successfully processed files to {dst_dir}")
+    if stats['moved_to_outliers'] > 0:
+        log_file_event(f"Moved {stats['moved_to_outliers']} outlier/unprocessed files to {outliers_dir}")
+
+    log_file_event(f"\nCleaning up temporary directory: {temp_dir}")
     try:
         if os.path.exists(temp_dir):
             shutil.rmtree(temp_dir)
-            print(f"Removed temporary directory: {temp_dir}")
+            log_file_event(f"Removed temporary directory: {temp_dir}")
         else:
-            print(f"Temporary directory {temp_dir} already removed or was not created.")
+            log_file_event(f"Temporary directory {temp_dir} already removed or was not created.")
     except OSError as e:
         print(f"Warning: Could not remove temporary directory {temp_dir}: {e}")
-    
+
+    if stats['staged_for_processing'] == 0 and stats['resumed_from_job'] == 0 and stats['moved_to_outliers'] == 0: # Nothing was processed; do not leave empty output folders behind
+        if stats['already_processed'] > 0:
+            print(f"\nNo new or changed files: {stats['already_processed']} files were already processed by earlier runs.")
+        else:
+            print("\nNo files staged for processing.")
+        if os.path.exists(dst_dir) and not os.listdir(dst_dir): os.rmdir(dst_dir)
+        if os.path.exists(outliers_dir) and not os.listdir(outliers_dir): os.rmdir(outliers_dir)
+        return stats
+
+    if args.output_format == "json":
+        return stats
+
     print("\n--- Processing Summary ---")
-    print(f"Supported files found in source: {supported_files_found_in_src}")
-    print(f"Files copied to temp for processing: {len(files_to_process_info)}")
-    print(f"Files for which ExifTool processing was attempted: {files_for_exiftool_processing_count}")
-    print(f"Files reported as updated by ExifTool: {exiftool_reported_updated_count}")
-    print(f"Files successfully moved to output ({os.path.basename(dst_dir)}): {moved_to_output_count}")
-    print(f"Files moved to outliers ({os.path.basename(outliers_dir)}): {moved_to_outliers_count}")
+    print(f"Supported files found in source: {stats['supported_files_found']}")
+    if manifest is not None:
+        print(f"Skipped (already processed by an earlier run): {stats['already_processed']}")
+    if resuming:
+        print(f"Files resumed from the interrupted run: {stats['resumed_from_job']} (plus {stats['resumed_already_placed']} found already placed)")
+    print(f"Files staged for processing ({transfer_mode} mode): {stats['staged_for_processing']}")
+    print(f"Files for which ExifTool processing was attempted: {stats['exiftool_attempted']}")
+    print(f"Files reported as updated by ExifTool: {stats['exiftool_updated']}")
+    if SKIP_IF_CORRECT:
+        print(f"Files not rewritten (date tags already correct): {stats['already_correct']}")
+    print(f"Files successfully moved to output ({os.path.basename(dst_dir)}): {stats['moved_to_output']}")
+    print(f"Files moved to outliers ({os.path.basename(outliers_dir)}): {stats['moved_to_outliers']}")
+    if DEDUP_MODE:
+        print(f"Duplicate files (same content as an earlier file, not copied or written): {stats['duplicates_found']}"
+              + (f", {stats['duplicates_linked']} hardlinked" if DEDUP_MODE == "hardlink" else ""))
     
-    if skipped_files_log:
-        print(f"\nLog of files with notes/errors ({len(skipped_files_log)}):")
-        # To make log cleaner, group reasons by filename if multiple entries exist (rare)
-        # For now, direct print is fine.
-        for filename, reason in skipped_files_log:
+    if notes.count and QUIET: # Errors were already printed as they happened
+        print(f"\nFiles with notes/errors: {notes.count}" + (" (see the report)" if report is not None else " (listed without --quiet)"))
+    elif notes.count:
+        print(f"\nLog of files with notes/errors ({notes.count}):")
+        for filename, reason in notes.kept:
             print(f"  - {filename}: {reason}")
-            
+        if notes.omitted:
+            print(f"  ... and {notes.omitted} more" + (" (see the report)" if report is not None else " (use --report to log every file)"))
+    return stats
+
+def print_timing_summary(metrics_snapshot):
+    """Prints where the run spent its time: total, count and p95 of each timed operation."""
+    timings = metrics_snapshot['timings']
+    if not timings:
+        return
+    print(f"\n--- Timings ({metrics_snapshot['elapsed_seconds']:.1f}s elapsed, {metrics_snapshot['files_placed_per_second'] or 0:,.0f} files placed/s) ---")
+    for name, timing in timings.items():
+        print(f"  {name:<20} {timing['total_seconds']:9.3f}s total  {timing['count']:>9,}x  mean {timing['mean_seconds'] * 1000:8.2f} ms  p95 <= {timing['p95_seconds'] * 1000:8.2f} ms")
+    if metrics_snapshot['counters'].get('name_collisions'):
+        print(f"  Destination name collisions resolved: {metrics_snapshot['counters']['name_collisions']:,}")
+
+def apply_plan_settings(plan_settings):
+    """Takes over the transfer and duplicate handling a plan was made with, so it is applied as planned."""
+    global TRANSFER_MODE, DEDUP_MODE
+    for setting_name, current_value in (('transfer_mode', TRANSFER_MODE), ('dedup_mode', DEDUP_MODE)):
+        if plan_settings.get(setting_name) != current_value:
+            print(f"Note: Using the plan's {setting_name.replace('_', ' ')} '{plan_settings.get(setting_name)}'.")
+    TRANSFER_MODE = plan_settings.get('transfer_mode', TRANSFER_MODE)
+    DEDUP_MODE = plan_settings.get('dedup_mode')
+
+def run(args):
+    """
+    Processes the source folders (or applies the plan) of parsed command-line arguments.
+    Returns (summary, results): the run summary for --output-format json and the stats per folder.
+    """
+    if args.apply_plan and (args.dry_run or args.sources):
+        print("Error: --apply-plan takes no source folders (the plan lists them) and cannot be combined with --dry-run or --plan.")
+        sys.exit(1)
+
+    if not args.dry_run: # A dry run never starts ExifTool, so it does not need to find it either
+        find_and_set_exiftool_path(args.exiftool)
+
+    date_patterns = None
+    if args.apply_plan: # Dates were parsed when the plan was made
+        try:
+            apply_plan_settings(read_plan_settings(args.apply_plan))
+        except PlanError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        source_dirs = []
+    else:
+        date_patterns = load_date_patterns() # Compiled once and shared by every source folder
+        if not date_patterns:
+            print("No date patterns loaded. Cannot proceed with filename parsing.")
+        source_dirs = args.sources or [input("Enter source folder PATH: ").strip()]
+
+    pool = None if args.dry_run else get_exiftool_pool() # One set of ExifTool processes for all folders
+    metrics = RunMetrics()
+    plan_writer = None
+    if PLAN_PATH:
+        try:
+            plan_writer = PlanWriter(PLAN_PATH, {'transfer_mode': TRANSFER_MODE, 'dedup_mode': DEDUP_MODE, 'date_formats_files': DATE_FORMATS_FILE_PATHS})
+        except OSError as e:
+            print(f"Error: Could not create the plan file {PLAN_PATH}: {e}")
+            sys.exit(1)
+    report = None
+    if REPORT_PATH and not args.dry_run:
+        try:
+            report = RunReport(REPORT_PATH, REPORT_FORMAT) # One report for all source folders
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not create the report file {REPORT_PATH}: {e}")
+            sys.exit(1)
+    progress = ProgressReporter(metrics, PROGRESS_COUNTERS) if SHOW_PROGRESS else None
+    if progress is not None:
+        progress.start()
+    results = {}
+    planning_finished = False
+    try:
+        for src_dir in source_dirs:
+            if len(source_dirs) > 1:
+                print(f"\n=== Source folder: {src_dir} ===")
+            results[src_dir] = process_source_folder(src_dir, date_patterns, pool, args, metrics, report, plan_writer)
+        if args.apply_plan:
+            for source_row, file_rows in iter_plan_sources(args.apply_plan):
+                print(f"\n=== Applying plan to source folder: {source_row['src_dir']} ===")
+                results[source_row['src_dir']] = process_source_folder(source_row['src_dir'], None, pool, args, metrics, report, planned_source=(source_row, file_rows))
+        planning_finished = True
+    finally:
+        if progress is not None:
+            progress.stop()
+        if report is not None:
+            report.close()
+        if plan_writer is not None and planning_finished:
+            plan_writer.close()
+            print(f"\nPlan written to {os.path.abspath(PLAN_PATH)} (apply it with --apply-plan)")
+        elif plan_writer is not None:
+            plan_writer.discard() # A partial plan would silently leave files out when applied
+            print(f"\nPlanning stopped before it finished; the incomplete plan {os.path.abspath(PLAN_PATH)} was deleted.")
+
+    if isinstance(date_patterns, DatePatternMatcher) and args.output_format == "text":
+        shape_stats = date_patterns.shape_cache_stats()
+        # With parse workers, each process has a cache of its own; hits and misses are their totals
+        cache_text = f"{shape_stats['cached_shapes']} shapes cached" if PARSE_WORKERS <= 1 else f"summed over {PARSE_WORKERS} parse workers, each with its own cache"
+        log_file_event(f"Filename shape cache: {shape_stats['hits']} hits / {shape_stats['hits'] + shape_stats['misses']} lookups ({shape_stats['hit_rate']:.1%} hit rate, {cache_text})")
+    if METRICS_JSON_PATH:
+        try:
+            metrics.write_json(METRICS_JSON_PATH, {'dry_run': args.dry_run, 'transfer_mode': TRANSFER_MODE})
+        except OSError as e:
+            print(f"Warning: Could not write the metrics file {METRICS_JSON_PATH}: {e}")
+    report_summary = {'path': os.path.abspath(REPORT_PATH), 'format': report.report_format, 'outcomes': report.outcome_counts} if report is not None else None
+    if args.output_format == "text":
+        print_timing_summary(metrics.snapshot())
+        if report_summary is not None:
+            print(f"\nPer-file report: {report_summary['path']} ({', '.join(f'{count} {outcome}' for outcome, count in sorted(report.outcome_counts.items())) or 'no files'})")
+    summary = {'dry_run': args.dry_run, 'transfer_mode': TRANSFER_MODE, 'sources': results, 'report': report_summary, 'metrics': metrics.snapshot()}
+    return summary, results
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    apply_arguments(args)
+    if args.output_format == "json":
+        # stdout carries only the JSON document; banners, per-file lines and warnings go to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            summary, results = run(args)
+        print(json.dumps(summary, indent=2))
+    else:
+        summary, results = run(args)
+    if any(stats is None for stats in results.values()):
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# --- Configuration ---
+MANIFEST_FILENAME = ".metadata_editor_manifest.sqlite"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    source_dir TEXT NOT NULL,
+    relative_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT,
+    datetime_info TEXT,
+    write_status TEXT,
+    write_message TEXT,
+    destination TEXT NOT NULL,
+    processed_at REAL NOT NULL,
+    PRIMARY KEY (source_dir, relative_path)
+)
+"""
+
+def hash_file_contents(file_path):
+    """SHA-256 of a file's contents, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file_obj:
+        for block in iter(lambda: file_obj.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class RunManifest:
+    """
+    Persistent record of every source file a previous run has finished, stored as a small
+    SQLite database (WAL journal) in the output folder.
+
+    A file is identified by its source folder and its path relative to it, plus (size, mtime_ns);
+    several source folders can share one output folder and its manifest.
+    When that key is unchanged, the file was already placed and is skipped on the next run
+    before it is parsed or copied. Optionally a content hash is stored as well, so a file whose
+    mtime changed without its content changing (e.g. re-synced from a backup) is still
+    recognised. Only finished files are recorded: a file that failed to copy or move, or whose
+    run was interrupted before it was placed, is processed again next time.
+    Safe to use from several pipeline threads.
+    """
+
+    def __init__(self, manifest_path, source_dir):
+        self.manifest_path = manifest_path
+        self.source_dir = os.path.abspath(source_dir)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(manifest_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL") # Durable across application crashes; one fsync per checkpoint
+        self._connection.execute(MANIFEST_SCHEMA)
+        self._connection.commit()
+
+    def lookup(self, relative_path):
+        """Returns the stored row for 'relative_path' as a dict, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT size, mtime_ns, content_hash, destination FROM files WHERE source_dir = ? AND relative_path = ?", (self.source_dir, relative_path)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'size': row[0], 'mtime_ns': row[1], 'content_hash': row[2], 'destination': row[3]}
+
+    def is_processed(self, relative_path, size, mtime_ns, src_path=None):
+        """
+        True if this exact file was finished by an earlier run. If only the mtime differs and a
+        content hash was stored, 'src_path' is hashed to decide.
+        """
+        stored = self.lookup(relative_path)
+        if stored is None or stored['size'] != size:
+            return False
+        if stored['mtime_ns'] == mtime_ns:
+            return True
+        if stored['content_hash'] and src_path:
+            try:
+                return hash_file_contents(src_path) == stored['content_hash']
+            except OSError:
+                return False
+        return False
+
+    def record_finished(self, entries):
+        """
+        Stores finished files in one transaction. 'entries' are dicts with the keys
+        relative_path, size, mtime_ns, content_hash, datetime_info, write_result and destination.
+        """
+        rows = [
+            (
+                self.source_dir, entry['relative_path'], entry['size'], entry['mtime_ns'], entry.get('content_hash'),
+                json.dumps(entry['datetime_info']) if entry.get('datetime_info') else None,
+                entry['write_result']['status'] if entry.get('write_result') else None,
+                entry['write_result']['message'] if entry.get('write_result') else None,
+                entry['destination'], time.time()
+            )
+            for entry in entries
+        ]
+        if not rows:
+            return
+        with self._lock:
+            with self._connection:
+                self._connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def count(self):
+        """Number of finished files recorded for this source folder."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM files WHERE source_dir = ?", (self.source_dir,)).fetchone()[0]
+
+    def count_all(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def open_run_manifest(output_dir, source_dir):
+    return RunManifest(os.path.join(output_dir, MANIFEST_FILENAME), source_dir)
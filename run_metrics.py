@@ -0,0 +1,190 @@
+import sys
+import json
+import time
+import bisect
+import threading
+import contextlib
+
+# --- Configuration ---
+# Upper bounds (seconds) of the timing histogram buckets; a final bucket catches everything slower
+HISTOGRAM_BUCKET_BOUNDS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+PROGRESS_INTERVAL_SECONDS = 1.0 # Refresh rate of the progress line on a terminal
+PROGRESS_LOG_INTERVAL_SECONDS = 30.0 # Interval between progress lines when stderr is not a terminal (log files)
+
+_console_lock = threading.Lock() # Serializes console output from the pipeline threads
+_active_progress_line = None # ProgressReporter currently drawing on the terminal, if any
+
+def console_print(message, file=None):
+    """
+    print() for use from worker threads: one message at a time, each written in a single call,
+    so lines from different threads never interleave. Clears the live progress line first.
+    """
+    with _console_lock:
+        if _active_progress_line is not None:
+            _active_progress_line.clear()
+        print(message, file=file or sys.stdout, flush=_active_progress_line is not None)
+
+class TimingHistogram:
+    """Count, total, min and max of a timing, plus counts in fixed log-spaced buckets for percentiles."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.bucket_counts = [0] * (len(HISTOGRAM_BUCKET_BOUNDS) + 1)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.bucket_counts[bisect.bisect_left(HISTOGRAM_BUCKET_BOUNDS, seconds)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations (max for the last bucket)."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(HISTOGRAM_BUCKET_BOUNDS[index], self.max) if index < len(HISTOGRAM_BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 6),
+            'mean_seconds': round(self.total / self.count, 6) if self.count else None,
+            'min_seconds': self.min,
+            'max_seconds': self.max,
+            'p50_seconds': self.percentile(0.50),
+            'p95_seconds': self.percentile(0.95),
+            'p99_seconds': self.percentile(0.99),
+            'buckets': {
+                (f"<={bound}" if index < len(HISTOGRAM_BUCKET_BOUNDS) else f">{HISTOGRAM_BUCKET_BOUNDS[-1]}"): bucket_count
+                for index, (bound, bucket_count) in enumerate(zip(HISTOGRAM_BUCKET_BOUNDS + (None,), self.bucket_counts))
+                if bucket_count
+            }
+        }
+
+class RunMetrics:
+    """
+    Counters and timing histograms of one editor run, shared by all pipeline threads.
+    Timings are per operation (one file copied, one ExifTool request, ...), so the histograms
+    show both where the time goes in total and how uneven individual operations are.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.timings = {}
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.timings.get(name)
+            if histogram is None:
+                histogram = self.timings[name] = TimingHistogram()
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def snapshot(self):
+        """All counters and timing summaries as a JSON-serializable dict."""
+        with self._lock:
+            elapsed = self.elapsed()
+            return {
+                'started_at': self.started_at,
+                'elapsed_seconds': round(elapsed, 3),
+                'counters': dict(self.counters),
+                'timings': {name: histogram.to_dict() for name, histogram in sorted(self.timings.items())},
+                'files_placed_per_second': round(self.counters.get('files_placed', 0) / elapsed, 1) if elapsed > 0 else None
+            }
+
+    def write_json(self, path, extra=None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.snapshot(), **(extra or {})), f, indent=2)
+
+class ProgressReporter:
+    """
+    Background thread showing a one-line progress/throughput summary on stderr: redrawn in
+    place on a terminal, written as a new line every PROGRESS_LOG_INTERVAL_SECONDS otherwise.
+    """
+
+    def __init__(self, metrics, counter_labels):
+        self.metrics = metrics
+        self.counter_labels = counter_labels # [(counter name, label)] in display order
+        self.is_terminal = sys.stderr.isatty()
+        self._stop = threading.Event()
+        self._thread = None
+        self._line_length = 0
+
+    def format_line(self):
+        counters = self.metrics.counters
+        elapsed = self.metrics.elapsed()
+        placed = counters.get('files_placed', 0)
+        parts = [f"{label} {counters.get(name, 0):,}" for name, label in self.counter_labels]
+        parts.append(f"{placed / elapsed if elapsed > 0 else 0:,.0f} files/s")
+        parts.append(time.strftime("%H:%M:%S", time.gmtime(elapsed)))
+        return " | ".join(parts)
+
+    def clear(self):
+        """Erases the progress line (called with the console lock held)."""
+        if self._line_length:
+            sys.stderr.write("\r" + " " * self._line_length + "\r")
+            sys.stderr.flush()
+            self._line_length = 0
+
+    def _draw(self):
+        global _active_progress_line
+        line = self.format_line()
+        with _console_lock:
+            if self.is_terminal:
+                _active_progress_line = self
+                sys.stderr.write("\r" + line.ljust(self._line_length))
+                self._line_length = len(line)
+            else:
+                sys.stderr.write(line + "\n")
+            sys.stderr.flush()
+
+    def _run(self):
+        interval = PROGRESS_INTERVAL_SECONDS if self.is_terminal else PROGRESS_LOG_INTERVAL_SECONDS
+        while not self._stop.wait(interval):
+            self._draw()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the thread and leaves the final progress line on screen."""
+        global _active_progress_line
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._draw()
+        with _console_lock:
+            if self.is_terminal:
+                sys.stderr.write("\n")
+                sys.stderr.flush()
+            _active_progress_line = None
+            self._line_length = 0
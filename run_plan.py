@@ -0,0 +1,105 @@
+import os
+import json
+import time
+
+# --- Configuration ---
+PLAN_FORMAT_VERSION = 1
+PLAN_FLUSH_ROWS = 1000 # Rows written between flushes
+
+class PlanError(Exception):
+    """Raised when a plan file cannot be read or was written by an incompatible version."""
+    pass
+
+class PlanWriter:
+    """
+    Writes a metadata_editor plan as JSON lines, one object per line with a 'type':
+      "plan"    - first line: format version, creation time and the run settings
+      "source"  - starts the rows of one source folder (src_dir, dst_dir, outliers_dir)
+      "file"    - one planned file: action, destination, ExifTool arguments or outlier reason
+      "summary" - closes a source folder: file counts and parse statistics per matched format
+    Rows are streamed, so writing a plan for millions of files needs no more memory than one.
+    """
+
+    def __init__(self, path, settings):
+        self.path = path
+        self._rows_since_flush = 0
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write_row(dict({'type': "plan", 'version': PLAN_FORMAT_VERSION, 'created_at': time.time()}, **settings))
+
+    def _write_row(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._rows_since_flush += 1
+        if self._rows_since_flush >= PLAN_FLUSH_ROWS:
+            self._file.flush()
+            self._rows_since_flush = 0
+
+    def begin_source(self, src_dir, dst_dir, outliers_dir):
+        self._write_row({'type': "source", 'src_dir': os.path.abspath(src_dir), 'dst_dir': os.path.abspath(dst_dir), 'outliers_dir': os.path.abspath(outliers_dir)})
+
+    def add_file(self, row):
+        self._write_row(dict({'type': "file"}, **row))
+
+    def end_source(self, summary):
+        self._write_row(dict({'type': "summary"}, **summary))
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        """Closes and deletes the plan, for a planning run that stopped before it finished."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+def read_plan_settings(path):
+    """Returns the "plan" row of a plan file. Raises PlanError if it is missing or of another version."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline() or "null")
+    except (OSError, ValueError) as e:
+        raise PlanError(f"Could not read the plan {path}: {e}")
+    if not isinstance(header, dict) or header.get('type') != "plan":
+        raise PlanError(f"{path} is not a metadata_editor plan file.")
+    if header.get('version') != PLAN_FORMAT_VERSION:
+        raise PlanError(f"The plan {path} has format version {header.get('version')}; this version reads version {PLAN_FORMAT_VERSION}.")
+    return header
+
+def iter_plan_sources(path):
+    """
+    Yields (source_row, file_rows) for each source folder of a plan, where 'file_rows' is a
+    generator over that folder's "file" rows. Consume each 'file_rows' before advancing;
+    the file is read line by line.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = (json.loads(line) for line in f if line.strip())
+        pending_row = None
+
+        def file_rows():
+            nonlocal pending_row
+            for row in rows:
+                if row['type'] == "file":
+                    yield row
+                elif row['type'] == "source":
+                    pending_row = row
+                    return
+
+        for row in rows:
+            while row is not None and row['type'] == "source":
+                pending_row = None
+                source_files = file_rows()
+                yield row, source_files
+                for _ in source_files: # Skip whatever the caller left unread
+                    pass
+                row = pending_row
@@ -0,0 +1,83 @@
+import os
+import csv
+import json
+import threading
+
+# --- Configuration ---
+REPORT_FORMATS = ("jsonl", "csv")
+REPORT_FIELDS = ("source", "relative_path", "outcome", "destination", "matched_format", "datetime", "write_status", "message")
+REPORT_FLUSH_ROWS = 1000 # Rows written between flushes, so an interrupted run still leaves most of its report
+
+def report_format_for_path(path):
+    """'csv' for a .csv file name, 'jsonl' otherwise."""
+    return "csv" if os.path.splitext(path)[1].lower() == ".csv" else "jsonl"
+
+class RunReport:
+    """
+    Per-file results written to a JSONL or CSV file as they happen, one row per file and
+    outcome (see REPORT_FIELDS), so a run's memory does not grow with the number of files.
+    Only the number of rows per outcome is kept. Safe to use from several pipeline threads.
+    """
+
+    def __init__(self, path, report_format=None):
+        self.path = path
+        self.report_format = report_format or report_format_for_path(path)
+        if self.report_format not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format '{self.report_format}'. Expected one of: {', '.join(REPORT_FORMATS)}")
+        self.outcome_counts = {}
+        self._lock = threading.Lock()
+        self._rows_since_flush = 0
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._csv_writer = None
+        if self.report_format == "csv":
+            self._csv_writer = csv.DictWriter(self._file, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+            self._csv_writer.writeheader()
+
+    def write(self, row):
+        """Writes one row; fields missing from 'row' are left empty."""
+        with self._lock:
+            if self._csv_writer is not None:
+                self._csv_writer.writerow(row)
+            else:
+                self._file.write(json.dumps({field: row.get(field) for field in REPORT_FIELDS}, ensure_ascii=False) + "\n")
+            self.outcome_counts[row['outcome']] = self.outcome_counts.get(row['outcome'], 0) + 1
+            self._rows_since_flush += 1
+            if self._rows_since_flush >= REPORT_FLUSH_ROWS:
+                self._file.flush()
+                self._rows_since_flush = 0
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class NoteLog:
+    """
+    Files with notes or errors for the end-of-run summary: every note is counted, but only the
+    first 'limit' are kept for listing. The full list belongs in a RunReport.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.count = 0
+        self.kept = []
+        self._lock = threading.Lock()
+
+    def add(self, filename, reason):
+        with self._lock:
+            self.count += 1
+            if len(self.kept) < self.limit:
+                self.kept.append((filename, reason))
+
+    @property
+    def omitted(self):
+        return self.count - len(self.kept)
+
+    def __len__(self):
+        return self.count
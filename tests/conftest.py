@@ -0,0 +1,59 @@
+import os
+import sys
+import stat
+
+import pytest
+
+# The modules are plain scripts next to each other in the repository root, as in benchmarks/
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+@pytest.fixture(autouse=True)
+def isolated_user_cache(tmp_path_factory, monkeypatch):
+    """Keeps the ExifTool location and pattern caches out of the user's cache folder."""
+    cache_dir = str(tmp_path_factory.mktemp("user_cache"))
+    monkeypatch.setenv("XDG_CACHE_HOME", cache_dir)
+    monkeypatch.setenv("LOCALAPPDATA", cache_dir)
+    monkeypatch.delenv("EXIFTOOL_PATH", raising=False)
+
+@pytest.fixture(scope="session")
+def fake_exiftool(tmp_path_factory):
+    """Path of an executable that runs tests/fake_exiftool.py in place of ExifTool."""
+    if os.name == "nt":
+        pytest.skip("the ExifTool stand-in is started through a POSIX shell script")
+    launcher_path = tmp_path_factory.mktemp("fake_exiftool") / "exiftool"
+    launcher_path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(TESTS_DIR, "fake_exiftool.py")}" "$@"\n')
+    launcher_path.chmod(launcher_path.stat().st_mode | stat.S_IXUSR)
+    return str(launcher_path)
+
+@pytest.fixture
+def run_editor(fake_exiftool):
+    """
+    Runs metadata_editor.main() with the ExifTool stand-in. The command line overrides module
+    settings (and argparse defaults are read from them), so they are restored afterwards.
+    """
+    import metadata_editor
+    saved_settings = {name: value for name, value in vars(metadata_editor).items() if name.isupper()}
+
+    def run(argv):
+        metadata_editor.main(list(argv) + ['--exiftool', fake_exiftool, '--quiet'])
+
+    yield run
+    for name, value in saved_settings.items():
+        setattr(metadata_editor, name, value)
+
+@pytest.fixture(scope="module")
+def matcher():
+    """The date patterns of the bundled formats file, loaded without the user's pattern cache."""
+    import metadata_editor
+    from date_matcher import DatePatternMatcher
+    use_pattern_cache = metadata_editor.USE_PATTERN_CACHE
+    metadata_editor.USE_PATTERN_CACHE = False # Never read or write the user's pattern cache
+    try:
+        loaded_matcher = metadata_editor.load_date_patterns()
+    finally:
+        metadata_editor.USE_PATTERN_CACHE = use_pattern_cache
+    assert isinstance(loaded_matcher, DatePatternMatcher) and len(loaded_matcher) > 0
+    return loaded_matcher
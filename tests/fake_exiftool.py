@@ -0,0 +1,115 @@
+"""
+Stand-in for ExifTool in tests that run the editor end to end, so they do not need ExifTool.
+It speaks the '-stay_open True -@ -' protocol (one argument per line, '-execute[N]' answered by
+'{ready[N]}') and handles the options the editor and checker send. Files are written like ExifTool
+writes them: the new file is created next to the old one and renamed over it (so it gets a new
+inode), and without -overwrite_original the old file is kept as '<name>_original'.
+Tags are stored as JSON after TAGS_TRAILER at the end of the file.
+"""
+import os
+import sys
+import json
+
+VERSION = "13.00"
+TAGS_TRAILER = b"\nFAKE-EXIFTOOL-TAGS"
+
+def read_tags(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    trailer_start = data.rfind(TAGS_TRAILER)
+    return json.loads(data[trailer_start + len(TAGS_TRAILER):]) if trailer_start >= 0 else {}
+
+def write_tags(path, tags, keep_backup):
+    with open(path, 'rb') as f:
+        data = f.read()
+    trailer_start = data.rfind(TAGS_TRAILER)
+    if trailer_start >= 0:
+        data = data[:trailer_start]
+    merged_tags = dict(read_tags(path), **tags)
+    temp_path = path + "_exiftool_tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data + TAGS_TRAILER + json.dumps(merged_tags).encode())
+    if keep_backup:
+        os.rename(path, path + "_original")
+    os.replace(temp_path, path)
+
+def run_command(args, out, err):
+    writes, reads, paths, after_lines = {}, [], [], []
+    json_output, keep_backup = False, True
+    arg_iter = iter(args)
+    for arg in arg_iter:
+        if arg in ('-echo1', '-echo2', '-echo3', '-echo4'):
+            text = next(arg_iter)
+            if arg == '-echo1':
+                out.write(text + "\n")
+            elif arg == '-echo2':
+                err.write(text + "\n")
+            else:
+                after_lines.append((out if arg == '-echo3' else err, text))
+        elif arg == '-ext':
+            next(arg_iter)
+        elif arg == '-json':
+            json_output = True
+        elif arg == '-overwrite_original':
+            keep_backup = False
+        elif arg in ('-S', '-q', '-fast2', '-r'):
+            pass
+        elif arg.startswith('-') and '=' in arg:
+            tag_name, value = arg[1:].split('=', 1)
+            writes[tag_name] = value
+        elif arg.startswith('-'):
+            reads.append(arg[1:])
+        else:
+            paths.append(arg)
+
+    if writes:
+        updated_count = 0
+        for path in paths:
+            if not os.path.isfile(path):
+                err.write(f"Error: File not found - {path}\n")
+                continue
+            write_tags(path, writes, keep_backup)
+            updated_count += 1
+        if updated_count:
+            out.write(f"    {updated_count} image files updated\n")
+        if len(paths) - updated_count:
+            out.write(f"    {len(paths) - updated_count} files weren't updated due to errors\n")
+    else:
+        records = []
+        for path in paths:
+            if not os.path.isfile(path):
+                err.write(f"Error: File not found - {path}\n")
+                continue
+            tags = read_tags(path)
+            records.append(dict({'SourceFile': path}, **{tag_name: tags[tag_name] for tag_name in reads if tag_name in tags}))
+        if json_output and records:
+            out.write("[" + ",\n".join(json.dumps(record, indent=2) for record in records) + "]\n")
+        elif not json_output:
+            for record in records:
+                out.writelines(f"{tag_name}: {value}\n" for tag_name, value in record.items() if tag_name != 'SourceFile')
+    for stream, text in after_lines:
+        stream.write(text + "\n")
+
+def main(argv):
+    if argv == ['-ver']:
+        print(VERSION)
+        return
+    if argv[:3] != ['-stay_open', 'True', '-@']:
+        run_command(argv, sys.stdout, sys.stderr)
+        return
+    args = []
+    for line in sys.stdin:
+        line = line.rstrip('\n')
+        if line.startswith('-execute'):
+            run_command(args, sys.stdout, sys.stderr)
+            sys.stdout.write(f"{{ready{line[len('-execute'):]}}}\n")
+            sys.stdout.flush()
+            sys.stderr.flush()
+            args = []
+        elif args[-1:] == ['-stay_open'] and line == 'False':
+            return
+        else:
+            args.append(line)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
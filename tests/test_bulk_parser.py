@@ -0,0 +1,66 @@
+"""parse_filename_stems_bulk must give, stem by stem, what extract_datetime_from_filename gives."""
+import pytest
+
+import metadata_editor
+from metadata_editor import BULK_RESULT_COLUMNS, extract_datetime_from_filename, parse_filename_stems_bulk
+from synthetic_names import generate_stems
+
+EDGE_CASE_STEMS = [
+    "20240229", "IMG_20240229_120000", # Leap day
+    "20230229", "IMG_20230229_120000", # Not a leap year
+    "20241301", "IMG_20241301_120000", # Month 13
+    "IMG_20240101_246000", "20240101_246000", "20240101246000", # Hour 24, minute 60
+    "IMG_20240101_235959",
+    "IMG-20240101-WA0001",
+    "DSC00042",
+    "",
+    "ünïcödé_20240101_k", # Non-ASCII stems go through the scalar parser
+    "٢٠٢٤٠١٠١", # Non-ASCII digits
+]
+
+@pytest.fixture(scope="module")
+def stems(matcher):
+    format_strings = [pattern_info["original_format"] for pattern_info in matcher]
+    return list(generate_stems(format_strings, 5000, metadata_editor.SORTED_DATE_TOKENS, seed=17)) + EDGE_CASE_STEMS
+
+def scalar_rows(stems, matcher):
+    format_indexes = {}
+    for index, pattern_info in enumerate(matcher):
+        format_indexes.setdefault(pattern_info["original_format"], index)
+    rows = []
+    for stem in stems:
+        dt_info = extract_datetime_from_filename(stem, matcher)
+        if dt_info:
+            rows.append((True, format_indexes[dt_info['matched_format']]) + tuple(int(dt_info[name]) for name in BULK_RESULT_COLUMNS))
+        else:
+            rows.append((False, -1) + (0,) * len(BULK_RESULT_COLUMNS))
+    return rows
+
+def bulk_rows(stems, matcher):
+    result = parse_filename_stems_bulk(stems, matcher)
+    columns = [result['valid'], result['format_index']] + [result[name] for name in BULK_RESULT_COLUMNS]
+    return [(bool(row[0]),) + tuple(int(value) for value in row[1:]) for row in zip(*columns)]
+
+def test_edge_cases_are_parsed_or_rejected_like_the_scalar_parser(matcher):
+    rows = dict(zip(EDGE_CASE_STEMS, scalar_rows(EDGE_CASE_STEMS, matcher)))
+    assert rows["20240229"][0] and not rows["20230229"][0]
+    assert not rows["20241301"][0]
+    hour_column = 2 + BULK_RESULT_COLUMNS.index('hour')
+    # The invalid time is dropped: only the date matches, at the default time
+    assert rows["IMG_20240101_246000"][0] and rows["IMG_20240101_246000"][hour_column] == 20
+    assert matcher[rows["IMG_20240101_246000"][1]]["original_format"] == "YYYYMMDD"
+    assert bulk_rows(EDGE_CASE_STEMS, matcher) == list(rows.values())
+
+def test_vectorized_parser_matches_scalar_parser(matcher, stems):
+    pytest.importorskip("numpy")
+    expected = scalar_rows(stems, matcher)
+    assert any(row[0] for row in expected) and not all(row[0] for row in expected)
+    result = parse_filename_stems_bulk(stems, matcher)
+    assert type(result['valid']).__module__ == "numpy"
+    assert bulk_rows(stems, matcher) == expected
+
+def test_parser_without_numpy_matches_scalar_parser(matcher, stems, monkeypatch):
+    monkeypatch.setattr(metadata_editor, "np", None)
+    result = parse_filename_stems_bulk(stems, matcher)
+    assert isinstance(result['valid'], list)
+    assert bulk_rows(stems, matcher) == scalar_rows(stems, matcher)
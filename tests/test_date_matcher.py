@@ -0,0 +1,66 @@
+"""DatePatternMatcher must pick exactly the match the plain sequential pattern scan picks."""
+import pytest
+
+import metadata_editor
+from date_matcher import DatePatternMatcher
+from synthetic_names import generate_stems
+
+EDGE_CASE_STEMS = [
+    "20240231_120000", # Invalid day: later formats must still get their turn
+    "20241301", # Invalid month
+    "IMG_20240101_250000", # Invalid hour
+    "IMG-20240101-WA0001",
+    "PXL_20230505_101010123",
+    "Screenshot_2023-12-24-18-30-00",
+    "photo 2024.02.29", # Leap day
+    "photo 2023.02.29",
+    "DSC00042",
+    "",
+    "2024",
+    "ünïcödé_20240101_k", # Non-ASCII stems skip the character prefilter
+    "\u212a20240101", # KELVIN SIGN matches 'k' case-insensitively
+    "٢٠٢٤٠١٠١", # Non-ASCII digits
+]
+
+@pytest.fixture(scope="module")
+def stems(matcher):
+    format_strings = [pattern_info["original_format"] for pattern_info in matcher]
+    return list(generate_stems(format_strings, 5000, metadata_editor.SORTED_DATE_TOKENS)) + EDGE_CASE_STEMS
+
+def sequential_results(stems, matcher):
+    sequential_patterns = list(matcher) # Same patterns, without the prefilter or the shape cache
+    return [metadata_editor.extract_datetime_from_filename(stem, sequential_patterns) for stem in stems]
+
+def test_matcher_matches_sequential_scan(matcher, stems):
+    expected = sequential_results(stems, matcher)
+    assert any(result is not None for result in expected) and any(result is None for result in expected)
+    assert [metadata_editor.extract_datetime_from_filename(stem, matcher) for stem in stems] == expected
+
+def test_shape_cache_hits_give_the_same_results(matcher, stems):
+    expected = sequential_results(stems, matcher)
+    cached_matcher = DatePatternMatcher(list(matcher), metadata_editor.DATE_COMPONENT_REGEX_MAP, shape_cache_size=64)
+    for _ in range(2): # The second pass is served from the shape cache
+        assert [metadata_editor.extract_datetime_from_filename(stem, cached_matcher) for stem in stems] == expected
+    assert cached_matcher.shape_cache_stats()['hits'] > 0
+
+def test_prefilter_without_shape_cache(matcher, stems):
+    uncached_matcher = DatePatternMatcher(list(matcher), metadata_editor.DATE_COMPONENT_REGEX_MAP, shape_cache_size=0)
+    assert [metadata_editor.extract_datetime_from_filename(stem, uncached_matcher) for stem in stems] == sequential_results(stems, matcher)
+    assert uncached_matcher.shape_cache_stats()['hits'] == 0
+
+def test_matcher_restored_from_cache_data(matcher, stems):
+    restored_matcher = DatePatternMatcher.from_cache_data(matcher.to_cache_data(), metadata_editor.DATE_COMPONENT_REGEX_MAP)
+    assert restored_matcher.requirements == matcher.requirements
+    assert [metadata_editor.extract_datetime_from_filename(stem, restored_matcher) for stem in stems] == sequential_results(stems, matcher)
+
+def test_parse_workers_report_their_shape_cache_counts(matcher, stems):
+    worker_matcher = DatePatternMatcher(list(matcher), metadata_editor.DATE_COMPONENT_REGEX_MAP)
+    parsed = list(metadata_editor.iter_parsed_filenames([stem + ".jpg" for stem in stems], worker_matcher, parse_workers=2))
+    assert [datetime_info for _, datetime_info in parsed] == sequential_results(stems, matcher)
+    serial_matcher = DatePatternMatcher(list(matcher), metadata_editor.DATE_COMPONENT_REGEX_MAP)
+    for stem in stems:
+        metadata_editor.extract_datetime_from_filename(stem, serial_matcher)
+    worker_stats, serial_stats = worker_matcher.shape_cache_stats(), serial_matcher.shape_cache_stats()
+    assert worker_stats['hits'] > 0
+    # Every lookup is counted once, in whichever worker made it
+    assert worker_stats['hits'] + worker_stats['misses'] == serial_stats['hits'] + serial_stats['misses']
@@ -0,0 +1,73 @@
+"""Duplicate content: ContentDedupIndex, and the editor's dedup stage in "report" and "hardlink" mode."""
+import os
+import json
+
+import pytest
+
+from dedup_index import SAMPLE_BLOCK_SIZE, ContentDedupIndex
+from fake_exiftool import read_tags
+
+IMAGE_BYTES = b"the same image bytes"
+
+@pytest.fixture
+def source_dir(tmp_path):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    return source_dir
+
+def run_with_metrics(run_editor, source_dir, tmp_path, argv):
+    metrics_path = tmp_path / "metrics.json"
+    run_editor([str(source_dir), '--metrics-json', str(metrics_path)] + argv)
+    with open(metrics_path, encoding='utf-8') as f:
+        return json.load(f)['counters']
+
+def output_images(source_dir):
+    return sorted((source_dir / "_output_metadata_edited").glob("*.jpg")) # Not the run manifest
+
+def test_index_needs_equal_content_not_only_equal_size(tmp_path):
+    first_path, second_path, third_path = tmp_path / "a.jpg", tmp_path / "b.jpg", tmp_path / "c.jpg"
+    # Same size, same first and last SAMPLE_BLOCK_SIZE bytes: only the full hash tells them apart
+    first_path.write_bytes(b"a" * SAMPLE_BLOCK_SIZE + b"1" + b"z" * SAMPLE_BLOCK_SIZE)
+    second_path.write_bytes(b"a" * SAMPLE_BLOCK_SIZE + b"2" + b"z" * SAMPLE_BLOCK_SIZE)
+    third_path.write_bytes(first_path.read_bytes())
+    index = ContentDedupIndex()
+    size = first_path.stat().st_size
+    assert index.find_duplicate(str(first_path), size, "a") is None
+    assert index.find_duplicate(str(second_path), size, "b") is None
+    assert index.find_duplicate(str(third_path), size, "c") == "a"
+
+def test_report_mode_writes_the_content_once(run_editor, source_dir, tmp_path):
+    for name in ("IMG-20240101-WA0001.jpg", "IMG-20240101-WA0002.jpg"):
+        (source_dir / name).write_bytes(IMAGE_BYTES)
+
+    counters = run_with_metrics(run_editor, source_dir, tmp_path, ['--dedup', 'report'])
+
+    assert counters['files_written'] == 1
+    assert counters['duplicates_found'] == 1
+    assert [path.name for path in output_images(source_dir)] == ["20240101.jpg"]
+    # The duplicate is left in the source folder
+    assert (source_dir / "IMG-20240101-WA0001.jpg").exists() and (source_dir / "IMG-20240101-WA0002.jpg").exists()
+
+def test_hardlink_mode_links_the_duplicate_to_the_written_file(run_editor, source_dir, tmp_path):
+    for name in ("IMG-20240101-WA0001.jpg", "IMG-20240101-WA0002.jpg"):
+        (source_dir / name).write_bytes(IMAGE_BYTES)
+
+    counters = run_with_metrics(run_editor, source_dir, tmp_path, ['--dedup', 'hardlink'])
+
+    assert counters['files_written'] == 1
+    written_path, linked_path = output_images(source_dir)
+    assert (written_path.name, linked_path.name) == ("20240101.jpg", "20240101_1.jpg")
+    assert written_path.stat().st_ino == linked_path.stat().st_ino
+    assert read_tags(str(linked_path))['DateTimeOriginal'] == "2024:01:01 20:00:00"
+
+def test_same_size_different_content_is_not_a_duplicate(run_editor, source_dir, tmp_path):
+    (source_dir / "IMG-20240101-WA0001.jpg").write_bytes(b"A" * len(IMAGE_BYTES))
+    (source_dir / "IMG-20240101-WA0002.jpg").write_bytes(b"B" * len(IMAGE_BYTES))
+
+    counters = run_with_metrics(run_editor, source_dir, tmp_path, ['--dedup', 'report'])
+
+    assert counters['files_written'] == 2
+    assert counters.get('duplicates_found', 0) == 0
+    written_paths = output_images(source_dir)
+    assert [path.name for path in written_paths] == ["20240101.jpg", "20240101_1.jpg"]
+    assert not os.path.samefile(*written_paths)
@@ -0,0 +1,74 @@
+"""DestinationNameIndex collision handling."""
+import os
+
+from destination_index import DestinationNameIndex
+
+def numbered(base, ext, number):
+    return f"{base}{ext}" if number == 0 else f"{base}_{number}{ext}"
+
+def copy_numbered(base, ext, number):
+    return f"{base}{ext}" if number == 0 else f"{base}_copy{number}{ext}"
+
+def test_first_free_name_and_skipped_count(tmp_path):
+    index = DestinationNameIndex()
+    target_dir = str(tmp_path)
+    assert index.reserve(target_dir, "20240101", ".jpg", numbered) == (os.path.join(target_dir, "20240101.jpg"), 0)
+    assert index.reserve(target_dir, "20240101", ".jpg", numbered) == (os.path.join(target_dir, "20240101_1.jpg"), 0)
+    assert index.reserve(target_dir, "20240102", ".jpg", numbered) == (os.path.join(target_dir, "20240102.jpg"), 0)
+
+def test_names_already_on_disk_are_skipped(tmp_path):
+    for name in ("20240101.jpg", "20240101_1.jpg", "20240101_3.jpg"):
+        (tmp_path / name).write_bytes(b"")
+    index = DestinationNameIndex()
+    target_dir = str(tmp_path)
+    assert index.reserve(target_dir, "20240101", ".jpg", numbered) == (os.path.join(target_dir, "20240101_2.jpg"), 2)
+    assert index.reserve(target_dir, "20240101", ".jpg", numbered) == (os.path.join(target_dir, "20240101_4.jpg"), 1)
+
+def test_missing_folder_is_empty(tmp_path):
+    index = DestinationNameIndex()
+    target_dir = str(tmp_path / "not_created_yet")
+    assert index.reserve(target_dir, "a", ".jpg", numbered) == (os.path.join(target_dir, "a.jpg"), 0)
+
+def test_naming_families_share_the_folder(tmp_path):
+    index = DestinationNameIndex()
+    target_dir = str(tmp_path)
+    index.reserve(target_dir, "IMG", ".jpg", numbered) # IMG.jpg
+    copy_path, skipped = index.reserve(target_dir, "IMG", ".jpg", copy_numbered)
+    assert (copy_path, skipped) == (os.path.join(target_dir, "IMG_copy1.jpg"), 1)
+
+def test_released_name_is_reused_first(tmp_path):
+    index = DestinationNameIndex()
+    target_dir = str(tmp_path)
+    paths = [index.reserve(target_dir, "a", ".jpg", numbered)[0] for _ in range(3)]
+    index.commit(paths[0])
+    index.commit(paths[2])
+    index.release(paths[1]) # Placement of a_1.jpg failed
+    assert index.reserve(target_dir, "a", ".jpg", numbered)[0] == paths[1]
+    assert index.reserve(target_dir, "a", ".jpg", numbered)[0] == os.path.join(target_dir, "a_3.jpg")
+
+def test_mark_taken_keeps_the_name_taken(tmp_path):
+    index = DestinationNameIndex()
+    target_dir = str(tmp_path)
+    path, _ = index.reserve(target_dir, "a", ".jpg", numbered)
+    index.mark_taken(path) # Appeared on disk after the folder was listed
+    assert index.reserve(target_dir, "a", ".jpg", numbered)[0] == os.path.join(target_dir, "a_1.jpg")
+
+def test_claim_exact_name(tmp_path):
+    (tmp_path / "taken.jpg").write_bytes(b"")
+    index = DestinationNameIndex()
+    target_dir = str(tmp_path)
+    assert not index.claim(os.path.join(target_dir, "taken.jpg"))
+    planned_path = os.path.join(target_dir, "20240101.jpg")
+    assert index.claim(planned_path)
+    assert not index.claim(planned_path)
+    # Families skip claimed names
+    assert index.reserve(target_dir, "20240101", ".jpg", numbered) == (os.path.join(target_dir, "20240101_1.jpg"), 1)
+
+def test_released_claim_frees_the_name(tmp_path):
+    index = DestinationNameIndex()
+    planned_path = os.path.join(str(tmp_path), "20240101.jpg")
+    assert index.claim(planned_path)
+    index.release(planned_path)
+    assert index.claim(planned_path)
+    index.commit(planned_path)
+    assert not index.claim(planned_path)
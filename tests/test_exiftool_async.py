@@ -0,0 +1,66 @@
+"""The asyncio driver's in-flight window, in iter_completed and in the editor's write stage."""
+import asyncio
+import threading
+
+from exiftool_async import AsyncExifToolPool
+from fake_exiftool import read_tags
+
+def echo_request(number):
+    return number, ['-echo1', str(number)]
+
+def test_window_is_independent_of_the_worker_count(fake_exiftool):
+    counts = {'taken': 0, 'completed': 0, 'most_outstanding': 0}
+
+    def requests():
+        for number in range(20):
+            counts['taken'] += 1
+            counts['most_outstanding'] = max(counts['most_outstanding'], counts['taken'] - counts['completed'])
+            yield echo_request(number)
+
+    async def run():
+        pool = AsyncExifToolPool(fake_exiftool, size=1, max_in_flight=4)
+        results = {}
+        async with pool:
+            async for key, result in pool.iter_completed(requests(), pull_size=1):
+                counts['completed'] += 1
+                results[key] = result
+        return results
+
+    results = asyncio.run(run())
+    assert {key: result['stdout'].strip() for key, result in results.items()} == {number: str(number) for number in range(20)}
+    assert counts['most_outstanding'] == 4 # More than the one worker, never more than the window
+
+def test_results_are_yielded_while_the_producer_waits(fake_exiftool):
+    first_result_seen = threading.Event()
+    waited_for_consumer = []
+
+    def requests():
+        yield echo_request(0)
+        # A pipeline queue that only fills up later: the first result must not wait for it
+        waited_for_consumer.append(first_result_seen.wait(timeout=10))
+        yield echo_request(1)
+
+    async def run():
+        pool = AsyncExifToolPool(fake_exiftool, size=2, max_in_flight=8)
+        keys = []
+        async with pool:
+            async for key, result in pool.iter_completed(requests(), pull_size=1):
+                keys.append(key)
+                first_result_seen.set()
+        return keys
+
+    assert asyncio.run(run()) == [0, 1]
+    assert waited_for_consumer == [True]
+
+def test_editor_writes_every_file_on_the_asyncio_driver(run_editor, tmp_path):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for day in range(1, 7):
+        (source_dir / f"IMG-202401{day:02d}-WA0001.jpg").write_bytes(b"image bytes")
+
+    run_editor([str(source_dir), '--exiftool-driver', 'asyncio', '--max-in-flight', '3', '--batch-size', '1'])
+
+    output_dir = source_dir / "_output_metadata_edited"
+    for day in range(1, 7):
+        assert read_tags(str(output_dir / f"202401{day:02d}.jpg"))['DateTimeOriginal'] == f"2024:01:{day:02d} 20:00:00"
+    assert not (source_dir / "_temp_metadata_editor").exists()
@@ -0,0 +1,41 @@
+"""iter_json_array_objects must yield the same objects as parsing the whole '-json' output at once."""
+import json
+
+from exiftool_session import iter_json_array_objects
+
+RECORDS = [
+    {"SourceFile": "/photos/a.jpg", "DateTimeOriginal": "2024:01:01 10:00:00", "CreateDate": "2024:01:01 10:00:00"},
+    {"SourceFile": "/photos/b {1}.jpg", "Comment": "braces } { and \"quotes\" in strings", "Nested": {"Key": [1, 2, {"x": "]"}]}},
+    {"SourceFile": "C:/photos/ünïcödé.jpg", "ModifyDate": "2023:12:24 18:30:00"},
+    {"SourceFile": "/photos/empty.jpg"},
+]
+
+def parse_lines(lines):
+    return list(iter_json_array_objects(lines))
+
+def test_exiftool_formatted_output():
+    output = json.dumps(RECORDS, indent=2, ensure_ascii=False)
+    assert parse_lines(output.splitlines(True)) == RECORDS
+
+def test_objects_split_at_arbitrary_points():
+    output = json.dumps(RECORDS, ensure_ascii=False)
+    for piece_size in (1, 2, 7, 64):
+        pieces = [output[i:i + piece_size] for i in range(0, len(output), piece_size)]
+        assert parse_lines(pieces) == RECORDS
+
+def test_several_objects_on_one_line():
+    assert parse_lines([json.dumps(RECORDS, ensure_ascii=False)]) == RECORDS
+
+def test_text_outside_objects_is_skipped():
+    lines = ["    1 image files read\n", "[\n", json.dumps(RECORDS[0]) + ",\n", "Warning: minor issue\n", json.dumps(RECORDS[2]) + "\n", "]\n"]
+    assert parse_lines(lines) == [RECORDS[0], RECORDS[2]]
+
+def test_empty_output():
+    assert parse_lines([]) == []
+    assert parse_lines(["[\n", "]\n"]) == []
+
+def test_objects_are_yielded_before_the_array_ends():
+    def lines():
+        yield "[" + json.dumps(RECORDS[0]) + ",\n"
+        raise AssertionError("read past the first complete object")
+    assert next(iter_json_array_objects(lines())) == RECORDS[0]
@@ -0,0 +1,107 @@
+"""Per-file outcomes of one multi-file ExifTool write request, from captured stdout/stderr."""
+import metadata_editor
+from exiftool_session import ExifToolError
+from metadata_editor import _run_exiftool_write_chunk, _split_output_by_file_marker, build_per_file_write_args, parse_exiftool_write_result
+
+FILES = [(f"/temp/{name}", ["-DateTimeOriginal=2024:01:01 12:00:00", "-overwrite_original"]) for name in ("a.jpg", "b.jpg", "c.jpg")]
+
+def marker(index):
+    return f"{metadata_editor.EXIFTOOL_FILE_MARKER_PREFIX} {index} ==="
+
+# What the worker returns for build_per_file_write_args(FILES): ExifTool answers each bare
+# '-execute' with '{ready}'; the request's own '{readyN}' sentinel is stripped by the worker.
+ALL_UPDATED_STDOUT = "".join(f"    1 image files updated\n{marker(index)}\n" + ("{ready}\n" if index < 2 else "") for index in range(3))
+ALL_UPDATED_STDERR = "".join(f"{marker(index)}\n" for index in range(3))
+
+class CapturedOutputPool:
+    """Pool stand-in that answers execute() with captured output."""
+    size = 1
+
+    def __init__(self, stdout="", stderr="", error=None):
+        self.result = {'stdout': stdout, 'stderr': stderr}
+        self.error = error
+        self.requests = []
+
+    def execute(self, args, timeout=None):
+        self.requests.append(args)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+def run_chunk(pool):
+    return _run_exiftool_write_chunk(pool, "Write Chunk 1", FILES)
+
+def test_request_writes_each_file_with_its_own_marker():
+    args = build_per_file_write_args(FILES)
+    assert args.count('-execute') == len(FILES) - 1
+    for index, (file_path, _) in enumerate(FILES):
+        assert args.count(marker(index)) == 2 # -echo3 (stdout) and -echo4 (stderr)
+        assert file_path in args
+
+def test_ready_acknowledgements_are_stripped_from_sections():
+    sections = _split_output_by_file_marker(ALL_UPDATED_STDOUT)
+    assert sections == {0: "1 image files updated", 1: "1 image files updated", 2: "1 image files updated"}
+
+def test_all_files_updated():
+    results = run_chunk(CapturedOutputPool(ALL_UPDATED_STDOUT, ALL_UPDATED_STDERR))
+    assert results == {file_path: {'status': 'updated', 'message': None} for file_path, _ in FILES}
+
+def test_one_failed_file_among_updated_files():
+    stdout = (f"    1 image files updated\n{marker(0)}\n{{ready}}\n"
+              f"    0 image files updated\n    1 files weren't updated due to errors\n{marker(1)}\n{{ready}}\n"
+              f"    1 image files updated\n{marker(2)}\n")
+    stderr = f"{marker(0)}\nError: File format error - /temp/b.jpg\n{marker(1)}\n{marker(2)}\n"
+    results = run_chunk(CapturedOutputPool(stdout, stderr))
+    assert results["/temp/a.jpg"]['status'] == 'updated'
+    assert results["/temp/b.jpg"] == {'status': 'failed', 'message': "Error: File format error - /temp/b.jpg"}
+    assert results["/temp/c.jpg"]['status'] == 'updated'
+
+def test_error_only_on_stderr():
+    # Nothing at all on stdout for the file, only its marker
+    stdout = f"    1 image files updated\n{marker(0)}\n{{ready}}\n{marker(1)}\n{{ready}}\n    1 image files updated\n{marker(2)}\n"
+    stderr = f"{marker(0)}\nError: File not found - /temp/b.jpg\n{marker(1)}\n{marker(2)}\n"
+    results = run_chunk(CapturedOutputPool(stdout, stderr))
+    assert results["/temp/b.jpg"] == {'status': 'failed', 'message': "Error: File not found - /temp/b.jpg"}
+    assert results["/temp/a.jpg"]['status'] == results["/temp/c.jpg"]['status'] == 'updated'
+
+def test_warning_without_failure():
+    stderr = (f"{marker(0)}\nWarning: [minor] Ignored empty rational value - /temp/b.jpg\n{marker(1)}\n{marker(2)}\n")
+    results = run_chunk(CapturedOutputPool(ALL_UPDATED_STDOUT, stderr))
+    assert all(result['status'] == 'updated' for result in results.values())
+
+def test_unchanged_file_keeps_its_warning():
+    result = parse_exiftool_write_result("    0 image files updated\n    1 image files unchanged", "Warning: Nothing to write - /temp/b.jpg")
+    assert result == {'status': 'unchanged', 'message': "Warning: Nothing to write - /temp/b.jpg"}
+
+def test_truncated_output_fails_only_the_unreported_files():
+    # ExifTool aborted after the first file: no markers for the others
+    stdout = f"    1 image files updated\n{marker(0)}\n{{ready}}\n"
+    stderr = f"{marker(0)}\n"
+    results = run_chunk(CapturedOutputPool(stdout, stderr))
+    assert results["/temp/a.jpg"]['status'] == 'updated'
+    for file_path in ("/temp/b.jpg", "/temp/c.jpg"):
+        assert results[file_path] == {'status': 'failed', 'message': "No per-file result marker in ExifTool output"}
+
+def test_no_result_at_all():
+    assert parse_exiftool_write_result("", "") == {'status': 'failed', 'message': "No result reported by ExifTool"}
+
+def test_worker_failure_fails_the_whole_chunk():
+    results = run_chunk(CapturedOutputPool(error=ExifToolError("ExifTool worker 0 exited unexpectedly.")))
+    assert {result['status'] for result in results.values()} == {'failed'}
+    assert all("exited unexpectedly" in result['message'] for result in results.values())
+
+def test_retries_resend_only_failed_files(monkeypatch):
+    class FailingOncePool(CapturedOutputPool):
+        def execute(self, args, timeout=None):
+            self.requests.append(args)
+            if len(self.requests) == 1: # First request: b.jpg fails
+                return {'stdout': ALL_UPDATED_STDOUT.replace(f"    1 image files updated\n{marker(1)}", marker(1)),
+                        'stderr': ALL_UPDATED_STDERR.replace(marker(1), f"Error: Temporary failure - /temp/b.jpg\n{marker(1)}")}
+            return {'stdout': f"    1 image files updated\n{marker(0)}\n", 'stderr': f"{marker(0)}\n"}
+
+    monkeypatch.setattr(metadata_editor, "QUIET", True)
+    pool = FailingOncePool()
+    results = metadata_editor.write_metadata_per_file(FILES, pool=pool, chunk_size=len(FILES), retries=1)
+    assert all(result['status'] == 'updated' for result in results.values())
+    assert len(pool.requests) == 2
+    assert "/temp/b.jpg" in pool.requests[1] and "/temp/a.jpg" not in pool.requests[1]
@@ -0,0 +1,74 @@
+"""JobState round-trips: an interrupted run's checkpoints read back by the resuming run."""
+import sqlite3
+
+from job_state import FILE_STATE_COPIED, FILE_STATE_PLACED, FILE_STATE_WRITTEN, JOB_STATE_SCHEMA, JobState
+
+def staged_entry(relative_path, **fields):
+    entry = {
+        'relative_path': relative_path, 'src_path': f"/source/{relative_path}", 'temp_path': f"/temp/{relative_path}",
+        'placement_method': "move", 'datetime_info': {'year': '2024', 'month': '01', 'day': '01'},
+        'size': 10, 'mtime_ns': 1000, 'content_hash': None
+    }
+    entry.update(fields)
+    return entry
+
+def test_phases_round_trip(tmp_path):
+    job_dir = str(tmp_path)
+    assert not JobState.exists(job_dir)
+    job = JobState(job_dir)
+    job.set_phase('src_dir', "/source")
+    job.set_phase('scan_complete', False)
+    job.set_phase('scan_complete', True)
+    job.close()
+    assert JobState.exists(job_dir)
+
+    job = JobState(job_dir)
+    assert job.get_phase('src_dir') == "/source"
+    assert job.get_phase('scan_complete') is True
+    assert job.get_phase('missing', "default") == "default"
+    job.close()
+
+def test_file_states_round_trip(tmp_path):
+    job = JobState(str(tmp_path))
+    job.mark_copied([staged_entry("a.jpg"), staged_entry("b.jpg", datetime_info=None, placement_method="rename"),
+                     staged_entry("c.jpg", write_args=["-DateTimeOriginal=2024:01:01 12:00:00"]), staged_entry("d.jpg")])
+    job.mark_written([("a.jpg", {'status': 'updated', 'message': None}), ("c.jpg", {'status': 'failed', 'message': "error"})])
+    job.mark_placing("a.jpg", "/output/20240101.jpg")
+    job.mark_placed(["d.jpg"])
+    job.close()
+
+    job = JobState(str(tmp_path))
+    unfinished = {row['relative_path']: row for row in job.iter_unfinished()}
+    assert sorted(unfinished) == ["a.jpg", "b.jpg", "c.jpg"]
+    assert unfinished["a.jpg"]['state'] == FILE_STATE_WRITTEN
+    assert unfinished["a.jpg"]['write_result'] == {'status': 'updated', 'message': None}
+    assert unfinished["a.jpg"]['destination'] == "/output/20240101.jpg"
+    assert unfinished["a.jpg"]['datetime_info'] == {'year': '2024', 'month': '01', 'day': '01'}
+    assert (unfinished["a.jpg"]['size'], unfinished["a.jpg"]['mtime_ns']) == (10, 1000)
+    assert unfinished["b.jpg"]['state'] == FILE_STATE_COPIED
+    assert unfinished["b.jpg"]['datetime_info'] is None and unfinished["b.jpg"]['placement_method'] == "rename"
+    assert unfinished["c.jpg"]['write_args'] == ["-DateTimeOriginal=2024:01:01 12:00:00"]
+    assert unfinished["b.jpg"]['write_args'] is None
+    assert job.count_by_state() == {FILE_STATE_COPIED: 1, FILE_STATE_WRITTEN: 2, FILE_STATE_PLACED: 1}
+    assert job.is_tracked("d.jpg") and not job.is_tracked("e.jpg")
+    job.forget("b.jpg")
+    assert not job.is_tracked("b.jpg")
+    job.close()
+
+def test_unfinished_files_are_read_in_pages(tmp_path):
+    job = JobState(str(tmp_path))
+    relative_paths = [f"{number:04d}.jpg" for number in range(25)]
+    job.mark_copied([staged_entry(relative_path) for relative_path in relative_paths])
+    assert [row['relative_path'] for row in job.iter_unfinished(fetch_size=4)] == relative_paths
+    job.close()
+
+def test_job_state_of_an_earlier_version_gains_write_args(tmp_path):
+    earlier_schema = JOB_STATE_SCHEMA.replace("    write_args TEXT,\n", "")
+    assert earlier_schema != JOB_STATE_SCHEMA
+    connection = sqlite3.connect(str(tmp_path / "job_state.sqlite"))
+    connection.executescript(earlier_schema)
+    connection.close()
+    job = JobState(str(tmp_path))
+    job.mark_copied([staged_entry("a.jpg", write_args=["-overwrite_original"])])
+    assert [row['write_args'] for row in job.iter_unfinished()] == [["-overwrite_original"]]
+    job.close()
@@ -0,0 +1,39 @@
+"""Pipeline stages: batching and record flow between bounded queues."""
+import time
+import threading
+
+import metadata_editor
+from metadata_editor import PipelineStage, run_pipeline
+
+def test_slow_trickle_does_not_hold_back_a_batch(monkeypatch):
+    monkeypatch.setattr(metadata_editor, "PIPELINE_BATCH_WAIT_SECONDS", 0.3)
+    stage = PipelineStage("exiftool", lambda records: records, batch_size=500)
+
+    def trickle():
+        for number in range(20):
+            stage.put(number)
+            time.sleep(0.05) # Each wait is shorter than PIPELINE_BATCH_WAIT_SECONDS
+
+    feeder = threading.Thread(target=trickle, daemon=True)
+    feeder.start()
+    started = time.monotonic()
+    batch = stage._take_batch()
+    elapsed_seconds = time.monotonic() - started
+    feeder.join()
+    # One deadline for the batch: it is handed on after ~0.3 s, not after 20 waits
+    assert elapsed_seconds < 0.8
+    assert 0 < len(batch) < 20
+
+def test_records_pass_every_stage_once():
+    seen = []
+    lock = threading.Lock()
+
+    def record_batch(records):
+        with lock:
+            seen.extend(records)
+        return records
+
+    stages = [PipelineStage("double", lambda records: [record * 2 for record in records], workers=3, batch_size=7),
+              PipelineStage("collect", record_batch, workers=2, batch_size=5)]
+    run_pipeline(range(1000), stages)
+    assert sorted(seen) == [number * 2 for number in range(1000)]
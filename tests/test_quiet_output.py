@@ -0,0 +1,27 @@
+"""--quiet keeps per-file and per-folder progress lines off the console."""
+
+def test_quiet_run_prints_no_progress_lines(run_editor, tmp_path, capsys):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for name in ("IMG-20240101-WA0001.jpg", "holiday photo.jpg"):
+        (source_dir / name).write_bytes(b"image bytes")
+
+    run_editor([str(source_dir), '--parse-workers', '2'])
+
+    output = capsys.readouterr().out
+    for line_start in ("Moved ", "Removed temporary directory", "Cleaning up temporary directory", "Filename shape cache"):
+        assert line_start not in output
+    assert (source_dir / "_output_metadata_edited" / "20240101.jpg").exists()
+
+def test_shape_cache_counts_of_parse_workers_are_reported(run_editor, fake_exiftool, tmp_path, capsys):
+    import metadata_editor
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for day in range(1, 4):
+        (source_dir / f"IMG-202401{day:02d}-WA0001.jpg").write_bytes(b"image bytes")
+
+    # Without --quiet; the run_editor fixture still restores the settings afterwards
+    metadata_editor.main([str(source_dir), '--parse-workers', '2', '--exiftool', fake_exiftool])
+
+    output = capsys.readouterr().out
+    assert "/ 3 lookups" in output and "summed over 2 parse workers" in output
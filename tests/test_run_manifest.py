@@ -0,0 +1,57 @@
+"""RunManifest round-trips: what one run records, the next run (a new connection) recognises."""
+import os
+
+from run_manifest import MANIFEST_FILENAME, hash_file_contents, open_run_manifest
+
+def finished_entry(relative_path, size, mtime_ns, content_hash=None):
+    return {
+        'relative_path': relative_path, 'size': size, 'mtime_ns': mtime_ns, 'content_hash': content_hash,
+        'datetime_info': {'year': '2024', 'month': '01', 'day': '01'},
+        'write_result': {'status': 'updated', 'message': None},
+        'destination': f"/output/{os.path.basename(relative_path)}"
+    }
+
+def test_finished_files_are_recognised_after_reopening(tmp_path):
+    output_dir, source_dir = str(tmp_path / "output"), str(tmp_path / "source")
+    os.makedirs(output_dir)
+    with open_run_manifest(output_dir, source_dir) as manifest:
+        manifest.record_finished([finished_entry("a.jpg", 10, 1000), finished_entry("sub/b.jpg", 20, 2000)])
+    assert os.path.isfile(os.path.join(output_dir, MANIFEST_FILENAME))
+
+    with open_run_manifest(output_dir, source_dir) as manifest:
+        assert manifest.count() == 2
+        assert manifest.lookup("sub/b.jpg") == {'size': 20, 'mtime_ns': 2000, 'content_hash': None, 'destination': "/output/b.jpg"}
+        assert manifest.is_processed("a.jpg", 10, 1000)
+        assert not manifest.is_processed("a.jpg", 11, 1000) # Size changed
+        assert not manifest.is_processed("a.jpg", 10, 1001) # Modified, no hash to compare
+        assert not manifest.is_processed("c.jpg", 10, 1000)
+        assert manifest.lookup("c.jpg") is None
+
+def test_source_folders_sharing_an_output_folder(tmp_path):
+    output_dir = str(tmp_path)
+    with open_run_manifest(output_dir, str(tmp_path / "first")) as manifest:
+        manifest.record_finished([finished_entry("a.jpg", 10, 1000)])
+    with open_run_manifest(output_dir, str(tmp_path / "second")) as manifest:
+        assert not manifest.is_processed("a.jpg", 10, 1000)
+        assert manifest.count() == 0
+        assert manifest.count_all() == 1
+
+def test_content_hash_recognises_touched_files(tmp_path):
+    source_file = tmp_path / "a.jpg"
+    source_file.write_bytes(b"same content")
+    with open_run_manifest(str(tmp_path), str(tmp_path)) as manifest:
+        manifest.record_finished([finished_entry("a.jpg", 12, 1000, hash_file_contents(str(source_file)))])
+    with open_run_manifest(str(tmp_path), str(tmp_path)) as manifest:
+        assert manifest.is_processed("a.jpg", 12, 5000, str(source_file)) # Only the mtime changed
+        source_file.write_bytes(b"edited bytes")
+        assert not manifest.is_processed("a.jpg", 12, 5000, str(source_file))
+        assert not manifest.is_processed("a.jpg", 12, 5000, str(tmp_path / "gone.jpg"))
+
+def test_recording_again_replaces_the_row(tmp_path):
+    with open_run_manifest(str(tmp_path), str(tmp_path)) as manifest:
+        manifest.record_finished([finished_entry("a.jpg", 10, 1000)])
+        manifest.record_finished([finished_entry("a.jpg", 30, 3000)])
+        manifest.record_finished([])
+        assert manifest.count() == 1
+        assert manifest.is_processed("a.jpg", 30, 3000)
+        assert not manifest.is_processed("a.jpg", 10, 1000)
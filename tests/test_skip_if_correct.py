@@ -0,0 +1,88 @@
+"""--skip-if-correct: which current date tag values count as already matching the filename date."""
+import json
+
+import pytest
+
+import metadata_editor
+from exif_reader import TAGS_TO_CHECK_CONFIG
+from fake_exiftool import read_tags, write_tags
+from metadata_editor import FileRecord, date_tags_match, expected_date_tag_values, parse_exif_date_value
+
+DT_INFO = {'year': "2024", 'month': "01", 'day': "01", 'hour': "20", 'minute': "00", 'second': "00"}
+EXPECTED = dict.fromkeys(TAGS_TO_CHECK_CONFIG, "2024:01:01 20:00:00")
+
+def tags(value, **overrides):
+    return dict(dict.fromkeys(TAGS_TO_CHECK_CONFIG, value), **overrides)
+
+@pytest.mark.parametrize("value", [
+    "2024:01:01 20:00:00",
+    "2024:01:01 20:00:00.123", # SubSecDateTimeOriginal style
+    "2024:01:01 20:00:00+02:00", # Offset appended by ExifTool for composite tags
+    "2024:01:01 20:00:00.5Z",
+    "2024-01-01T20:00:00", # XMP/ISO 8601
+    " 2024:01:01 20:00:00 ",
+])
+def test_sub_seconds_and_offsets_are_ignored(value):
+    assert parse_exif_date_value(value) == parse_exif_date_value("2024:01:01 20:00:00")
+    assert date_tags_match(tags(value), EXPECTED)
+
+@pytest.mark.parametrize("value", ["0000:00:00 00:00:00", "2024:02:30 20:00:00", "    :  :     :  :  ", "", None, "2024:01:01"])
+def test_placeholders_and_invalid_values_are_not_dates(value):
+    assert parse_exif_date_value(value) is None
+    assert not date_tags_match(tags(value), EXPECTED)
+
+def test_tolerance_boundary():
+    assert date_tags_match(tags("2024:01:01 20:00:01"), EXPECTED, tolerance_seconds=1)
+    assert date_tags_match(tags("2024:01:01 19:59:59"), EXPECTED, tolerance_seconds=1)
+    assert not date_tags_match(tags("2024:01:01 20:00:02"), EXPECTED, tolerance_seconds=1)
+    assert not date_tags_match(tags("2024:01:01 20:00:01"), EXPECTED, tolerance_seconds=0)
+
+def test_tolerance_defaults_to_the_date_tolerance_setting(monkeypatch):
+    monkeypatch.setattr(metadata_editor, "DATE_MATCH_TOLERANCE_SECONDS", 5)
+    assert date_tags_match(tags("2024:01:01 20:00:05"), EXPECTED)
+    assert not date_tags_match(tags("2024:01:01 20:00:06"), EXPECTED)
+
+def test_a_missing_tag_is_not_correct():
+    current_values = tags("2024:01:01 20:00:00")
+    del current_values['CreateDate']
+    assert not date_tags_match(current_values, EXPECTED)
+    assert not date_tags_match({}, EXPECTED)
+
+def test_expected_values_from_the_filename_date():
+    record = FileRecord("IMG-20240101-WA0001.jpg", "IMG-20240101-WA0001.jpg", "/src/a.jpg", "/temp/a.jpg", DT_INFO)
+    assert expected_date_tag_values(record) == EXPECTED
+
+def test_expected_values_from_plan_arguments():
+    record = FileRecord("a.jpg", "a.jpg", "/src/a.jpg", "/temp/a.jpg", DT_INFO)
+    record.write_args = [f"-{tag_key}=2023:05:06 07:08:09" for tag_key in TAGS_TO_CHECK_CONFIG] + ["-overwrite_original"]
+    assert expected_date_tag_values(record) == dict.fromkeys(TAGS_TO_CHECK_CONFIG, "2023:05:06 07:08:09")
+    # Plan arguments that write more than the date tags, or not all of them, are never skipped
+    record.write_args = record.write_args + ["-Artist=Someone"]
+    assert expected_date_tag_values(record) is None
+    record.write_args = ["-DateTimeOriginal=2023:05:06 07:08:09"]
+    assert expected_date_tag_values(record) is None
+
+def test_editor_skips_only_files_whose_tags_match(run_editor, tmp_path):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    current_tags = {
+        "IMG-20240101-WA0001.jpg": tags("2024:01:01 20:00:00"), # Correct
+        "IMG-20240102-WA0001.jpg": tags("2024:01:02 20:00:01"), # Within the default tolerance
+        "IMG-20240103-WA0001.jpg": tags("2024:01:03 20:00:00", CreateDate=None), # One tag missing
+        "IMG-20240104-WA0001.jpg": tags("0000:00:00 00:00:00"), # Placeholder
+    }
+    for name, tag_values in current_tags.items():
+        (source_dir / name).write_bytes(b"image bytes")
+        write_tags(str(source_dir / name), {tag_key: value for tag_key, value in tag_values.items() if value is not None}, keep_backup=False)
+    metrics_path = tmp_path / "metrics.json"
+
+    run_editor([str(source_dir), '--skip-if-correct', '--metrics-json', str(metrics_path)])
+
+    with open(metrics_path, encoding='utf-8') as f:
+        counters = json.load(f)['counters']
+    assert counters['files_already_correct'] == 2
+    assert counters['files_written'] == 2
+    output_dir = source_dir / "_output_metadata_edited"
+    assert read_tags(str(output_dir / "20240102.jpg"))['DateTimeOriginal'] == "2024:01:02 20:00:01" # Not rewritten
+    assert read_tags(str(output_dir / "20240103.jpg"))['CreateDate'] == "2024:01:03 20:00:00"
+    assert read_tags(str(output_dir / "20240104.jpg"))['DateTimeOriginal'] == "2024:01:04 20:00:00"
@@ -0,0 +1,103 @@
+"""Transfer modes: each file's bytes are read and written at most once, and sources are never modified outside "inplace"."""
+import os
+import errno
+import shutil
+
+import pytest
+
+import metadata_editor
+from fake_exiftool import read_tags
+
+SOURCE_BYTES = b"original image bytes"
+MATCHED_NAME = "IMG-20240101-WA0001.jpg"
+OUTLIER_NAME = "holiday photo.jpg"
+
+@pytest.fixture
+def no_copies(monkeypatch):
+    """Fails the test if any file is copied (shutil.copy2 and shutil.move both copy through copyfile)."""
+    def fail_copy(*args, **kwargs):
+        raise AssertionError(f"file copied: {args}")
+    monkeypatch.setattr(shutil, "copyfile", fail_copy)
+    monkeypatch.setattr(shutil, "copy2", fail_copy)
+
+@pytest.fixture
+def source_dir(tmp_path):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for name in (MATCHED_NAME, OUTLIER_NAME):
+        (source_dir / name).write_bytes(SOURCE_BYTES)
+    return source_dir
+
+def test_reflink_falls_back_to_copy(tmp_path, monkeypatch):
+    def unsupported(src_path, dst_path):
+        raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+    monkeypatch.setattr(metadata_editor, "reflink_file", unsupported)
+    src_path, dst_path = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    src_path.write_bytes(SOURCE_BYTES)
+    assert metadata_editor.transfer_file(str(src_path), str(dst_path), "reflink") == "copy"
+    assert dst_path.read_bytes() == SOURCE_BYTES
+    assert not os.path.samefile(src_path, dst_path)
+
+def test_failed_reflink_leaves_no_partial_file(tmp_path, monkeypatch):
+    fcntl = pytest.importorskip("fcntl")
+    def unsupported(*args):
+        raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+    monkeypatch.setattr(fcntl, "ioctl", unsupported)
+    src_path, dst_path = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    src_path.write_bytes(SOURCE_BYTES)
+    with pytest.raises(OSError):
+        metadata_editor.reflink_file(str(src_path), str(dst_path))
+    assert not dst_path.exists()
+
+def test_hardlink_falls_back_to_copy(tmp_path, monkeypatch):
+    def unsupported(src_path, dst_path):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+    monkeypatch.setattr(os, "link", unsupported)
+    src_path, dst_path = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    src_path.write_bytes(SOURCE_BYTES)
+    assert metadata_editor.transfer_file(str(src_path), str(dst_path), "hardlink") == "copy"
+    assert dst_path.read_bytes() == SOURCE_BYTES
+
+def test_place_file_never_replaces_an_existing_file(tmp_path):
+    src_path, dst_path = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    src_path.write_bytes(SOURCE_BYTES)
+    dst_path.write_bytes(b"someone else's file")
+    for method in ("move", "rename", "hardlink", "copy"):
+        with pytest.raises(FileExistsError):
+            metadata_editor.place_file(str(src_path), str(dst_path), method)
+    assert dst_path.read_bytes() == b"someone else's file"
+    assert src_path.read_bytes() == SOURCE_BYTES
+
+def test_hardlink_mode_leaves_sources_untouched(run_editor, source_dir, no_copies):
+    matched_path, outlier_path = source_dir / MATCHED_NAME, source_dir / OUTLIER_NAME
+    source_inodes = {path: path.stat().st_ino for path in (matched_path, outlier_path)}
+
+    run_editor([str(source_dir), '--transfer-mode', 'hardlink'])
+
+    for path, inode in source_inodes.items():
+        assert path.stat().st_ino == inode
+        assert path.read_bytes() == SOURCE_BYTES
+        assert read_tags(str(path)) == {}
+    # ExifTool's rewrite split the staged hardlink off into a file of its own
+    written_path = source_dir / "_output_metadata_edited" / "20240101.jpg"
+    assert written_path.stat().st_ino != source_inodes[matched_path]
+    assert read_tags(str(written_path))['DateTimeOriginal'] == "2024:01:01 20:00:00"
+    # The outlier is linked, never copied
+    assert (source_dir / "_output_outliers" / OUTLIER_NAME).stat().st_ino == source_inodes[outlier_path]
+    assert not (source_dir / "_temp_metadata_editor").exists()
+
+def test_inplace_mode_keeps_original_backup_and_renames_outliers(run_editor, source_dir, no_copies):
+    outlier_inode = (source_dir / OUTLIER_NAME).stat().st_ino
+
+    run_editor([str(source_dir), '--transfer-mode', 'inplace'])
+
+    backup_path = source_dir / (MATCHED_NAME + "_original")
+    assert backup_path.read_bytes() == SOURCE_BYTES
+    written_path = source_dir / "_output_metadata_edited" / "20240101.jpg"
+    assert read_tags(str(written_path))['DateTimeOriginal'] == "2024:01:01 20:00:00"
+    assert not (source_dir / MATCHED_NAME).exists()
+    # The outlier is moved with a rename: same inode, source name gone
+    placed_outlier = source_dir / "_output_outliers" / OUTLIER_NAME
+    assert placed_outlier.stat().st_ino == outlier_inode
+    assert placed_outlier.read_bytes() == SOURCE_BYTES
+    assert not (source_dir / OUTLIER_NAME).exists()